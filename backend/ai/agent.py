@@ -1,26 +1,32 @@
 import os
-import requests
+import re
+import time
+import httpx
 import asyncio
 from typing import TypedDict, List
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 import json
+import tempfile
+import xxhash
 from dotenv import load_dotenv
 import traceback
+from services.cache import LRUCache
 
 # Force load .env, overriding system variables to ensure local file is used
 load_dotenv(override=True)
 
-def get_local_key():
+def get_local_key(env_path: str = None):
     """
-    Manually reads .env to ensure we get the file's exact content,
-    bypassing potentially stale system environment variables.
+    Manually reads .env (backend/.env unless `env_path` is given) to ensure we
+    get the file's exact content, bypassing potentially stale system
+    environment variables. Logs only the last characters of the key.
     """
     try:
-        env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
+        env_path = env_path or os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
         print(f"   📂 [Env Config]: Looking for .env at: {env_path}")
         
         if not os.path.exists(env_path):
@@ -37,26 +43,60 @@ def get_local_key():
                     continue
                 
                 # Check for key name pattern
+                # Lines are never echoed: any of them may hold a secret
                 if "GOOGLE_API_KEY" in clean:
-                    print(f"      [Line {i+1} Match]: {clean[:20]}...")
+                    print(f"      [Line {i+1} Match]: GOOGLE_API_KEY")
                     # Naive parse: split by =
                     if "=" in clean:
                         key_part = clean.split("=", 1)[1].strip()
                         # Remove quotes
                         key = key_part.strip('"').strip("'")
-                        print(f"   📄 [Env Config]: Extracted Key: '{key}'")
+                        print(f"   📄 [Env Config]: Extracted Key: ...{key[-4:] if len(key) > 8 else ''} ({len(key)} chars)")
                         return key
                 else:
-                    print(f"      [Line {i+1} Skip]: {clean[:15]}...")
+                    print(f"      [Line {i+1} Skip]")
 
     except Exception as e:
         print(f"   ⚠️ [Key Config]: Could not read local .env: {e}")
     
     # Fallback to standard env var if file read fails
     fallback_key = os.environ.get("GOOGLE_API_KEY", "")
-    print(f"   🗺️ [Env Config]: Falling back to os.environ: ...{fallback_key[-5:] if len(fallback_key)>5 else fallback_key}")
+    print(f"   🗺️ [Env Config]: Falling back to os.environ: ...{fallback_key[-4:] if len(fallback_key) > 8 else ''} ({len(fallback_key)} chars)")
     return fallback_key
 
+# Per-call timeouts (seconds) for the primary LLM and the RapidAPI fallback, so
+# a hung request can never hold an analysis (or the event loop) indefinitely
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 30))
+LLM_FALLBACK_TIMEOUT = float(os.environ.get("LLM_FALLBACK_TIMEOUT", 30))
+LLM_MODEL = "gemini-2.5-flash"
+# Gemini request budget: LLM_RPM calls per minute with bursts of up to
+# LLM_BURST (LLM_RPM=0 disables the limit). Calls over budget wait their turn.
+LLM_RPM = float(os.environ.get("LLM_RPM", 60))
+LLM_BURST = int(os.environ.get("LLM_BURST", 10))
+# After a quota error (429) every call pauses for the server's retry hint (or
+# LLM_QUOTA_COOLDOWN seconds, at most LLM_QUOTA_MAX_WAIT) and is retried up to
+# LLM_QUOTA_RETRIES times before falling back to RapidAPI
+LLM_QUOTA_COOLDOWN = float(os.environ.get("LLM_QUOTA_COOLDOWN", 15))
+LLM_QUOTA_MAX_WAIT = float(os.environ.get("LLM_QUOTA_MAX_WAIT", 60))
+LLM_QUOTA_RETRIES = int(os.environ.get("LLM_QUOTA_RETRIES", 2))
+
+# Parsed advisories by failure signature (standard, dataset type, rounded
+# dimension scores and failed rules): audits with the same failures reuse
+# the plan without an LLM call. ADVISORY_CACHE_DIR="" keeps it in memory only.
+ADVISORY_CACHE_ENTRIES = int(os.environ.get("ADVISORY_CACHE_ENTRIES", 1024))
+ADVISORY_CACHE_TTL = int(os.environ.get("ADVISORY_CACHE_TTL", 7 * 24 * 3600))
+ADVISORY_CACHE_DIR = os.environ.get("ADVISORY_CACHE_DIR", os.path.join(tempfile.gettempdir(), "finaudit-advisory-cache"))
+ADVISORY_CACHE_DISK_MB = int(os.environ.get("ADVISORY_CACHE_DISK_MB", 64))
+
+advisory_cache = LRUCache(
+    "advisory-cache",
+    max_entries=ADVISORY_CACHE_ENTRIES,
+    max_bytes=ADVISORY_CACHE_ENTRIES * 16 * 1024,
+    ttl=ADVISORY_CACHE_TTL,
+    disk_dir=ADVISORY_CACHE_DIR,
+    disk_max_bytes=ADVISORY_CACHE_DISK_MB * 1024 * 1024
+)
+
 # Define the Agent State
 class AgentState(TypedDict):
     metadata: dict
@@ -66,10 +106,11 @@ class AgentState(TypedDict):
     insights: str
     analysis: dict
     compliance_standard: str
+    use_cache: bool
 
 # Initialize LLM with Explicit Key from File
 llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
+    model=LLM_MODEL,
     temperature=0.2,
     google_api_key=get_local_key()
 )
@@ -82,7 +123,7 @@ embeddings = GoogleGenerativeAIEmbeddings(
 
 # --- Fallback Logic ---
 
-def fallback_gemini_rapidapi(messages: List[BaseMessage]) -> str:
+async def fallback_gemini_rapidapi(messages: List[BaseMessage]) -> str:
     """
     Fallback to RapidAPI Gemini Pro if the main API fails.
     """
@@ -125,7 +166,8 @@ def fallback_gemini_rapidapi(messages: List[BaseMessage]) -> str:
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        async with httpx.AsyncClient(timeout=LLM_FALLBACK_TIMEOUT) as client:
+            response = await client.post(url, json=payload, headers=headers)
         response.raise_for_status()
         data = response.json()
         answer = data.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
@@ -140,48 +182,119 @@ def fallback_gemini_rapidapi(messages: List[BaseMessage]) -> str:
         print(f"   ❌ [Fallback]: RapidAPI also failed: {e}")
         raise e
 
-def invoke_llm_with_fallback(messages: List[BaseMessage]):
-    """Synchronous wrapper"""
-    try:
-        api_key = get_local_key()
-        print(f"   🔑 [LLM DEBUG]: Using GOOGLE_API_KEY (FULL): '{api_key}'")
-        print(f"   📨 [LLM Request Payload]: {messages}")
-        
-        response = llm.invoke(messages)
-        return response
-    except Exception as e:
-        print("   ❌ [LLM Error Traceback]:")
-        traceback.print_exc()
-        
-        err_str = str(e).lower()
-        if any(x in err_str for x in ["400", "429", "500", "resourceexhausted", "quota", "getaddrinfo"]):
-            content = fallback_gemini_rapidapi(messages)
-            return AIMessage(content=content)
-        raise e
+class RateLimiter:
+    """
+    Queues LLM calls to a per-minute budget (GCRA): each call reserves the
+    next free slot, so waiters are served in arrival order. pause() holds
+    every call back after a quota error. Keeps no asyncio primitives, so it
+    works across event loops.
+    """
+
+    def __init__(self, rpm: float, burst: int):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self.tolerance = self.interval * max(burst - 1, 0)
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+
+    def _reserve(self) -> float:
+        # Seconds until the reserved slot
+        now = time.monotonic()
+        slot = max(self.next_slot, now, self.paused_until)
+        start = max(now, self.paused_until, slot - self.tolerance)
+        self.next_slot = slot + self.interval
+        return start - now
+
+    async def acquire(self):
+        while True:
+            delay = self._reserve()
+            if delay > 0:
+                print(f"   ⏳ [LLM]: Queued for {delay:.1f}s (rate limit).")
+                await asyncio.sleep(delay)
+            # A quota pause that started while this call waited sends it back in line
+            if time.monotonic() >= self.paused_until:
+                return
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
 
-async def invoke_llm_with_fallback_async(messages: List[BaseMessage]):
-    """Async wrapper"""
-    try:
-        api_key = get_local_key()
-        print(f"   🔑 [LLM ASYNC DEBUG]: Using GOOGLE_API_KEY (FULL): '{api_key}'")
-        print(f"   📨 [LLM ASYNC Request Payload]: {messages}")
 
-        response = await llm.ainvoke(messages)
-        return response
+llm_limiter = RateLimiter(LLM_RPM, LLM_BURST)
+
+def _is_quota_error(e: Exception) -> bool:
+    err_str = str(e).lower()
+    return any(x in err_str for x in ["429", "resourceexhausted", "resource_exhausted", "quota"])
+
+def _quota_delay(e: Exception) -> float:
+    # Gemini names its wait: "Please retry in 12.3s" / "retry_delay { seconds: 12 }"
+    hint = re.search(r"retry in ([\d.]+)\s*s|seconds:\s*(\d+)", str(e), re.IGNORECASE)
+    delay = float(hint.group(1) or hint.group(2)) if hint else LLM_QUOTA_COOLDOWN
+    return min(delay, LLM_QUOTA_MAX_WAIT)
+
+async def _invoke_primary(messages: List[BaseMessage]):
+    """The primary LLM within the rate limit; quota errors requeue the call."""
+    for attempt in range(LLM_QUOTA_RETRIES + 1):
+        await llm_limiter.acquire()
+        try:
+            return await asyncio.wait_for(llm.ainvoke(messages), LLM_TIMEOUT)
+        except Exception as e:
+            if attempt == LLM_QUOTA_RETRIES or not _is_quota_error(e):
+                raise
+            delay = _quota_delay(e)
+            llm_limiter.pause(delay)
+            print(f"   ⏳ [LLM]: Quota exhausted; retrying after {delay:.1f}s (attempt {attempt + 2}/{LLM_QUOTA_RETRIES + 1}).")
+
+async def _invoke_llm_with_fallback(messages: List[BaseMessage]):
+    """The primary LLM within LLM_TIMEOUT, else the RapidAPI fallback"""
+    try:
+        # Sizes only: prompts carry chat questions and dataset context
+        print(f"   📨 [LLM]: Request of {len(messages)} messages ({sum(len(str(m.content)) for m in messages)} chars)")
+        return await _invoke_primary(messages)
+    except asyncio.TimeoutError:
+        print(f"   ⏱️ [LLM]: No response within {LLM_TIMEOUT}s.")
+        content = await fallback_gemini_rapidapi(messages)
+        return AIMessage(content=content)
     except Exception as e:
         print("   ❌ [LLM Async Error Traceback]:")
         traceback.print_exc()
         
         err_str = str(e).lower()
         if any(x in err_str for x in ["400", "429", "500", "resourceexhausted", "quota", "getaddrinfo"]):
-            loop = asyncio.get_running_loop()
-            content = await loop.run_in_executor(None, fallback_gemini_rapidapi, messages)
+            content = await fallback_gemini_rapidapi(messages)
             return AIMessage(content=content)
         raise e
 
+# In-flight LLM calls by prompt key (single-flight)
+_inflight = {}
+
+def prompt_key(messages: List[BaseMessage]) -> str:
+    return xxhash.xxh3_128_hexdigest(json.dumps([LLM_MODEL] + [[m.type, m.content] for m in messages]))
+
+def _release(key: str, call: asyncio.Future):
+    if _inflight.get(key) is call:
+        del _inflight[key]
+    # Retrieve the outcome, so a call nobody waits on any more does not log a warning
+    if not call.cancelled():
+        call.exception()
+
+async def invoke_llm_with_fallback_async(messages: List[BaseMessage]):
+    """
+    Async wrapper. Concurrent callers with the same prompt share one in-flight
+    call (and its result or error) instead of each spending quota on it.
+    """
+    key = prompt_key(messages)
+    call = _inflight.get(key)
+    if call is None or call.get_loop() is not asyncio.get_running_loop():
+        call = asyncio.ensure_future(_invoke_llm_with_fallback(messages))
+        _inflight[key] = call
+        call.add_done_callback(lambda done: _release(key, done))
+    else:
+        print("   🔗 [LLM]: Joined an identical in-flight request.")
+    # One caller giving up (e.g. a closed request) must not cancel the others
+    return await asyncio.shield(call)
+
 # --- Nodes ---
 
-def privacy_guardrail(state: AgentState):
+async def privacy_guardrail(state: AgentState):
     """
     Agent 2: Privacy Guardrail
     Checks if metadata contains explicit PII leaks before proceeding.
@@ -203,7 +316,7 @@ def privacy_guardrail(state: AgentState):
         
     return {"privacy_check": msg}
 
-def metadata_analyst(state: AgentState):
+async def metadata_analyst(state: AgentState):
     """
     Agent 3: Metadata Analyst
     Identifies the dataset context (KYC, Transactions, etc.).
@@ -223,7 +336,7 @@ def metadata_analyst(state: AgentState):
     print(f"   📊 [Metadata Analyst]: Dataset classified as '{context}'.")
     return {"dataset_type": context}
 
-def insights_agent(state: AgentState):
+async def insights_agent(state: AgentState):
     """
     Agent 5: Insights & Visualization Agent
     Interprets the scores to find key trends.
@@ -243,7 +356,22 @@ def insights_agent(state: AgentState):
     print(f"   📈 [Insights Agent]: {insight}")
     return {"insights": insight}
 
-def advisory_agent(state: AgentState):
+def advisory_signature(standard: str, dataset_type: str, scores: dict) -> str:
+    """
+    Cache key of an advisory: what its prompt is built from, normalised so
+    rule order and sub-point score differences do not split the cache.
+    """
+    signature = {
+        "model": LLM_MODEL,
+        "standard": standard,
+        "dataset_type": dataset_type,
+        "health_score": round(scores.get("health_score", 0)),
+        "dimension_scores": {dim: round(score) for dim, score in sorted(scores.get("dimension_scores", {}).items())},
+        "failed_rules": sorted(k for k, v in scores.get("rule_results", {}).items() if not v["passed"])
+    }
+    return xxhash.xxh3_128_hexdigest(json.dumps(signature, sort_keys=True))
+
+async def advisory_agent(state: AgentState):
     """
     Agent 6: Advisory Agent
     Generates the final JSON output with remediation steps.
@@ -255,6 +383,13 @@ def advisory_agent(state: AgentState):
     context = state["dataset_type"]
     insights = state["insights"]
     standard = state.get("compliance_standard", "General Transaction")
+
+    signature = advisory_signature(standard, context, scores)
+    if state.get("use_cache", True):
+        cached = advisory_cache.get(signature)
+        if cached is not None:
+            print("   ♻️ [Advisory Agent]: Reusing cached plan for this failure signature.")
+            return {"analysis": cached}
     
     system_prompt = f"""You are an Expert Financial Compliance Advisor.
     Compliance Standard: {standard}
@@ -292,10 +427,11 @@ def advisory_agent(state: AgentState):
     ]
     
     try:
-        # Use Fallback Wrapper
-        response = invoke_llm_with_fallback(messages)
+        # Use Fallback Async Wrapper
+        response = await invoke_llm_with_fallback_async(messages)
         content = response.content.replace("```json", "").replace("```", "").strip()
         analysis_json = json.loads(content)
+        advisory_cache.set(signature, analysis_json)
         print("   ✅ [Advisory Agent]: Plan generated successfully.")
         return {"analysis": analysis_json}
     except Exception as e:
@@ -316,18 +452,20 @@ workflow.add_node("metadata_analyst", metadata_analyst)
 workflow.add_node("insights_agent", insights_agent)
 workflow.add_node("advisory_agent", advisory_agent)
 
-# Define Edge flow
-workflow.set_entry_point("privacy_guardrail")
-workflow.add_edge("privacy_guardrail", "metadata_analyst")
-workflow.add_edge("metadata_analyst", "insights_agent")
+# Define Edge flow: the guardrail and the analyst run as parallel branches
+# (they write different state keys) and join before the insights
+workflow.add_edge(START, "privacy_guardrail")
+workflow.add_edge(START, "metadata_analyst")
+workflow.add_edge(["privacy_guardrail", "metadata_analyst"], "insights_agent")
 workflow.add_edge("insights_agent", "advisory_agent")
 workflow.add_edge("advisory_agent", END)
 
 app = workflow.compile()
 
-async def run_advisory_agent(scores: dict, metadata: dict, standard: str = "General Transaction") -> dict:
+async def run_advisory_agent(scores: dict, metadata: dict, standard: str = "General Transaction", use_cache: bool = True) -> dict:
     """
-    Entry point to run the multi-agent system.
+    Entry point to run the multi-agent system. use_cache=False skips the
+    advisory cache lookup (the fresh plan still replaces the cached one).
     """
     print(f"\n--- 🤖 Starting Multi-Agent Compliance Analysis ({standard}) ---")
     
@@ -338,7 +476,8 @@ async def run_advisory_agent(scores: dict, metadata: dict, standard: str = "Gene
         "dataset_type": "",
         "insights": "",
         "analysis": {},
-        "compliance_standard": standard
+        "compliance_standard": standard,
+        "use_cache": use_cache
     }
     
     result = await app.ainvoke(initial_state)
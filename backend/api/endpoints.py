@@ -1,92 +1,235 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Response
+from starlette.concurrency import run_in_threadpool
 import os
-from services.ingestion import load_data, profile_dataset
-from core.rules_engine import RulesEngine
-from services.scoring import calculate_scores
+from services.ingestion import profile_cache
+from services.analysis import compute_analysis, finish_analysis, analysis_cache_key, cached_analysis
+from core.rules_engine import RulesEngine, STANDARDS
+from services.scoring import calculate_scores, calculate_scores_by_standard
+from services.report_store import load_report, save_analysis, scores_for
+from services.schema_registry import default_lineage
 from ai.agent import run_advisory_agent
 
 router = APIRouter()
 
-from services.provenance import provenance_service
+def _analysis_options(mode: str, ingest_engine: str, columns: str, sample_rows: int, stratify_by: str) -> dict:
+    """profile_upload() options from the /analyze form fields."""
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    return {"mode": mode, "engine": ingest_engine, "columns": selected, "sample_rows": sample_rows, "stratify_by": stratify_by}
 
 @router.post("/analyze")
-async def analyze_data(file: UploadFile = File(...)):
+async def analyze_data(
+    response: Response,
+    file: UploadFile = File(...),
+    mode: str = Form("auto"),
+    ingest_engine: str = Form(None),
+    columns: str = Form(None),
+    sample_rows: int = Form(None),
+    stratify_by: str = Form(None),
+    lineage: str = Form(None),
+    defer_analysis: bool = Form(False),
+    advisory_cache: bool = Form(True)
+):
     # 1. Ingestion & Profiling (Metadata Extraction)
+    # mode: "full" loads the whole file, "stream" profiles CSV/NDJSON in chunks,
+    # "auto" streams only large uploads. ingest_engine: "pandas" or "arrow".
+    # columns: optional comma-separated list of columns to read and profile.
+    # sample_rows / stratify_by: fast first-look audit of a random sample.
+    # lineage: source system / feed whose accepted schema the file is checked
+    # against for drift (defaults to the file name without extension, copy
+    # markers or dates, see default_lineage).
+    # defer_analysis: answer as soon as the scores are ready; the AI advisory
+    # follows over GET /api/reports/{report_id}/analysis (SSE).
+    # advisory_cache: false asks the LLM even if the failure signature is cached.
+    options = _analysis_options(mode, ingest_engine, columns, sample_rows, stratify_by)
+    lineage = lineage or default_lineage(file.filename)
+
+    # Identical uploads (retries, other analysts) reuse the cached profile,
+    # rule results and scores; X-Profile-Cache reports hit or miss.
     try:
-        df = await load_data(file)
-        metadata = profile_dataset(df)
+        cache_key = await run_in_threadpool(analysis_cache_key, file, options, lineage)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    computed = cached_analysis(cache_key, lineage)
+    response.headers["X-Profile-Cache"] = "hit" if computed else "miss"
+
+    if not computed:
+        # 2. Rule Execution (Deterministic) & 3. Scoring, in a worker thread so
+        # other requests keep being served. For large files prefer
+        # POST /api/jobs/analyze, which runs this in the job process pool.
+        try:
+            computed = await run_in_threadpool(compute_analysis, file, options, lineage)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        profile_cache.set(cache_key, computed)
 
-    # 2. Rule Execution (Deterministic)
-    engine = RulesEngine(metadata)
-    rule_results = engine.run_compliance() # Default: General Transaction
+    # 4. Agent Analysis & 5. Provenance Attestation
+    return await finish_analysis(computed, file.filename, defer=defer_analysis, use_cache=advisory_cache)
 
-    # 3. Scoring
-    scores = calculate_scores(rule_results)
+from services.jobs import submit_job, job_status, job_result, cancel_job
 
-    # 4. Agent Analysis
+@router.post("/jobs/analyze", status_code=202)
+async def submit_analysis_job(
+    file: UploadFile = File(...),
+    mode: str = Form("auto"),
+    ingest_engine: str = Form(None),
+    columns: str = Form(None),
+    sample_rows: int = Form(None),
+    stratify_by: str = Form(None),
+    lineage: str = Form(None),
+    defer_analysis: bool = Form(False),
+    advisory_cache: bool = Form(True)
+):
+    # Same form fields as /analyze, but returns a job ID at once; profiling,
+    # rules and scoring run in the job process pool. Poll GET /jobs/{job_id}
+    # for per-stage progress, then fetch GET /jobs/{job_id}/result.
+    options = _analysis_options(mode, ingest_engine, columns, sample_rows, stratify_by)
     try:
-        if os.environ.get("GOOGLE_API_KEY"):
-            analysis = await run_advisory_agent(scores, metadata)
-        else:
-            analysis = {
-                "executive_summary": "AI analysis skipped (GOOGLE_API_KEY not set).",
-                "risk_assessment": "Configure the API key to enable GenAI insights.",
-                "remediation_steps": []
-            }
+        return await submit_job(file, options, lineage or default_lineage(file.filename), defer_analysis, advisory_cache)
+    except HTTPException:
+        raise
     except Exception as e:
-         # Fallback to prevent API failure
-         analysis = {
-            "executive_summary": "AI analysis failed temporarily.",
-            "risk_assessment": str(e),
-            "remediation_steps": []
-        }
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    return job_status(job_id)
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    # The /analyze response once the job is done; 409 while it is still running
+    return job_result(job_id)
+
+@router.delete("/jobs/{job_id}")
+async def cancel_analysis_job(job_id: str):
+    return cancel_job(job_id)
+
+from fastapi.responses import StreamingResponse
+from services.advisory import advisory_events
+
+@router.get("/reports/{report_id}/analysis")
+async def stream_report_analysis(report_id: str):
+    # Server-Sent Events: "pending" until the deferred advisory is ready, then
+    # one "analysis" event with it and its attestation (at once if it is done)
+    return StreamingResponse(
+        advisory_events(report_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+from services.incremental import create_profile, merge_profile
+
+def _score_profile(metadata: dict, standard: str) -> dict:
+    return calculate_scores(RulesEngine(metadata).run_compliance(standard))
+
+@router.post("/profiles")
+async def create_stored_profile(file: UploadFile = File(...), standard: str = Form("General Transaction")):
+    # Profiles a base dataset and keeps its mergeable state for later deltas;
+    # profiling and rules run in a worker thread like /analyze
+    profile_id, metadata = await run_in_threadpool(create_profile, file)
+    scores = await run_in_threadpool(_score_profile, metadata, standard)
+    return {"profile_id": profile_id, "metadata": metadata, "scores": scores}
+
+@router.post("/profiles/{profile_id}/merge")
+async def merge_profile_delta(profile_id: str, file: UploadFile = File(...), standard: str = Form("General Transaction")):
+    # Appends a delta file to a stored profile; only the delta rows are read
+    new_profile_id, metadata = await run_in_threadpool(merge_profile, profile_id, file)
+    scores = await run_in_threadpool(_score_profile, metadata, standard)
+    return {"profile_id": new_profile_id, "base_profile_id": profile_id, "metadata": metadata, "scores": scores}
+
+from services.reference_index import register_reference, list_references, delete_reference
+
+@router.post("/references")
+async def create_reference(
+    file: UploadFile = File(...),
+    name: str = Form(...),
+    key_column: str = Form(...),
+    foreign_keys: str = Form(None)
+):
+    # Registers a reference dataset (e.g. a customer master) as a key index.
+    # Later profiles check the columns named in foreign_keys (comma-separated,
+    # default: key_column) against it.
+    fk_names = foreign_keys.split(",") if foreign_keys else []
+    return await run_in_threadpool(register_reference, file, name, key_column, fk_names)
+
+@router.get("/references")
+async def get_references():
+    return {"references": list_references()}
+
+@router.delete("/references/{name}")
+async def remove_reference(name: str):
+    await run_in_threadpool(delete_reference, name)
+    return {"deleted": name}
+
+from services.ingestion import spool_upload, read_dataframe
+from core.template_rules import score_template_rows
+
+def _score_template_upload(file: UploadFile) -> dict:
+    with spool_upload(file) as buffer:
+        rows = read_dataframe(buffer, file.filename)
+    try:
+        return score_template_rows(rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # 5. Provenance Attestation
-    attestation_data = {
-        "filename": file.filename,
-        "health_score": scores["health_score"],
-        "overall_score": scores["overall_score"],
-        "metadata_hash": provenance_service.compute_fingerprint(metadata),
-        "analysis_summary_hash": provenance_service.compute_fingerprint(analysis) if analysis else None
-    }
-    provenance = provenance_service.sign_record(attestation_data)
-
-    return {
-        "filename": file.filename,
-        "metadata": metadata, # Frontend might need this for visualization
-        "scores": scores,
-        "analysis": analysis,
-        "provenance": provenance
-    }
+@router.post("/analyze/bulk")
+async def bulk_score_templates(file: UploadFile = File(...)):
+    # Scores pre-aggregated metadata template rows (one dataset per row) in one
+    # column-wise pass over the whole batch, in a worker thread
+    print(f"\n🔹 [API]: Bulk scoring template rows from {file.filename}")
+    return await run_in_threadpool(_score_template_upload, file)
 
 from pydantic import BaseModel
 from ai.agent import chat_about_dataset
 
 class ReEvaluateRequest(BaseModel):
-    metadata: dict
+    # report_id from /api/analyze; posting the full metadata still works
+    report_id: str = None
+    metadata: dict = None
     standard: str = "General Transaction"
+    # Multi-standard mode: scores for each listed standard (empty list = all), no AI analysis
+    standards: list = None
+    # False asks the LLM even if the failure signature is cached
+    advisory_cache: bool = True
 
 @router.post("/analyze/re-evaluate")
 async def re_evaluate_compliance(request: ReEvaluateRequest):
+    if request.report_id:
+        report = load_report(request.report_id)
+        metadata, metadata_hash = report["metadata"], report["metadata_hash"]
+    elif request.metadata is not None:
+        report, metadata, metadata_hash = None, request.metadata, None
+    else:
+        raise HTTPException(status_code=400, detail="Either report_id or metadata is required.")
+
+    if request.standards is not None:
+        print(f"\n🔹 [API]: Re-evaluating for standards: {request.standards or 'all'}")
+        try:
+            if report is not None:
+                standards = request.standards or STANDARDS
+                return {"standard_scores": {standard: scores_for(metadata, standard, metadata_hash) for standard in standards}}
+            standard_results = RulesEngine(metadata).run_standards(request.standards)
+            return {"standard_scores": calculate_scores_by_standard(standard_results)}
+        except Exception as e:
+            print(f"   ❌ [API Error]: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
     print(f"\n🔹 [API]: Re-evaluating for standard: {request.standard}")
     try:
-        # Re-run rule engine with new standard
-        engine = RulesEngine(request.metadata)
-        rule_results = engine.run_compliance(request.standard)
-        
-        scores = calculate_scores(rule_results)
+        # Rule results are memoized per (metadata hash, standard)
+        scores = scores_for(metadata, request.standard, metadata_hash)
         
         # Re-run AI Agent
         if os.environ.get("GOOGLE_API_KEY"):
             from ai.agent import get_local_key # Ensure key check
             if get_local_key():
-                 analysis = await run_advisory_agent(scores, request.metadata, request.standard)
+                 analysis = await run_advisory_agent(scores, metadata, request.standard, use_cache=request.advisory_cache)
             else:
                  analysis = {"executive_summary": "Skipped (No Key)", "remediation_steps": []}
         else:
             analysis = {"executive_summary": "Skipped (No Key)", "remediation_steps": []}
+
+        if report is not None:
+            save_analysis(request.report_id, report, request.standard, analysis)
             
         return {
             "scores": scores,
@@ -98,38 +241,68 @@ async def re_evaluate_compliance(request: ReEvaluateRequest):
 
 class ChatRequest(BaseModel):
     question: str
-    context: dict
-
-from fastapi import Request
+    # report_id (with the standard on screen) or the full dashboard context
+    report_id: str = None
+    standard: str = "General Transaction"
+    context: dict = None
 
 @router.post("/chat")
-async def chat(raw_request: Request):
-# ... (rest of chat endpoint)
-    print("\n🔹 [API DEBUG]: /api/chat hit")
+async def chat(request: ChatRequest):
+    # Logs no request content: questions and contexts may carry customer data
+    print(f"\n🔹 [API]: Chat question ({'report ' + request.report_id if request.report_id else 'inline context'})")
     try:
-        body = await raw_request.json()
-        print(f"   📨 [API RAW BODY]: {body}")
-        
-        # Manual Validation for Debugging
-        try:
-            request = ChatRequest(**body)
-            print("   ✅ [API Model]: Validation Successful")
-        except Exception as vals_err:
-            print(f"   ❌ [API Model]: Validation FAILED: {vals_err}")
-            raise vals_err
-
         if not os.environ.get("GOOGLE_API_KEY"):
              # Double check local read
              from ai.agent import get_local_key
              if not get_local_key():
                 print("   ❌ [API Config]: No API KEY found.")
                 return {"response": "I need a Google API Key to chat! Please configure backend/.env."}
-             
-        print("   🤖 [API Agent]: Calling chat_about_dataset...")
-        response = await chat_about_dataset(request.question, request.context)
-        print(f"   ✅ [API Agent]: Response generated (Length: {len(response)})")
+
+        if request.report_id:
+            report = load_report(request.report_id)
+            context = {
+                "metadata": report["metadata"],
+                "scores": scores_for(report["metadata"], request.standard, report["metadata_hash"]),
+                "analysis": report["analyses"].get(request.standard) or {}
+            }
+        elif request.context is not None:
+            context = request.context
+        else:
+            raise HTTPException(status_code=400, detail="Either report_id or context is required.")
+
+        response = await chat_about_dataset(request.question, context)
         return {"response": response}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"   ❌ [API Error]: {str(e)}")
-        # traceback.print_exc() # verify if traceback is imported or add it
+        print(f"   ❌ [API Error]: {type(e).__name__}")
         raise HTTPException(status_code=500, detail=str(e))
+
+from services.schema_registry import list_schemas, get_schema, accept_schema
+
+@router.get("/schemas")
+async def get_schemas():
+    return {"schemas": list_schemas()}
+
+@router.get("/schemas/{lineage}")
+async def get_lineage_schema(lineage: str):
+    # Accepted fingerprint and version history of a lineage
+    return get_schema(lineage)
+
+class AcceptSchemaRequest(BaseModel):
+    report_id: str
+
+@router.post("/schemas/{lineage}/accept")
+async def accept_lineage_schema(lineage: str, request: AcceptSchemaRequest):
+    # Accepts a drifted report's schema as the lineage's new version
+    report = load_report(request.report_id)
+    entry = accept_schema(lineage, report["metadata"], report["filename"])
+    return {"lineage": lineage, "version": entry["version"], "accepted_at": entry["accepted_at"]}
+
+from services.report_store import report_store
+from ai.agent import advisory_cache
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    # Entries, bytes and hit/miss counters of the server-side caches
+    return {"caches": [cache.stats() for cache in (profile_cache, report_store, advisory_cache)]}
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+# Add current directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# The stub below replaces the model; the client only needs some key to start
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+from langchain_core.messages import AIMessage
+import ai.agent as agent
+
+
+class StubLLM:
+    """Local stand-in for the Gemini client: answers after a fixed latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return AIMessage(content=json.dumps({
+            "executive_summary": "Stub advisory.",
+            "risk_assessment": "None.",
+            "remediation_steps": [{"issue": "Stub", "action": "None", "priority": "LOW"}]
+        }))
+
+
+SCORES = {
+    "health_score": 72.5,
+    "overall_score": 72.5,
+    "dimension_scores": {"completeness": 80.0, "validity": 45.0, "security": 100.0},
+    "rule_results": {
+        "completeness_nulls": {"passed": False, "score": 80.0, "details": "stub"},
+        "validity_dates": {"passed": False, "score": 45.0, "details": "stub"},
+        "security_pan": {"passed": True, "score": 100.0, "details": "stub"}
+    }
+}
+METADATA = {"total_rows": 1000, "total_columns": 3, "columns": {"amount": {}, "date": {}, "customer_id": {}}}
+
+
+async def watch_loop(lag: list, stop: asyncio.Event, interval: float = 0.01):
+    # Largest delay of a 10ms tick: how long the event loop was blocked
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag.append(time.perf_counter() - start - interval)
+
+
+def scores_for(i: int, identical: bool) -> dict:
+    # Distinct health scores give every analysis its own prompt
+    return SCORES if identical else {**SCORES, "health_score": round(SCORES["health_score"] + i / 1000, 3)}
+
+
+async def bench(concurrency: int, latency: float, use_cache: bool = False, identical: bool = False, rpm: float = 0, burst: int = 10):
+    stub = StubLLM(latency)
+    agent.llm = stub
+    agent.llm_limiter = agent.RateLimiter(rpm, burst)
+    lag, stop = [], asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(lag, stop))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[agent.run_advisory_agent(scores_for(i, identical), METADATA, use_cache=use_cache) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+
+    failed = sum(r.get("executive_summary") != "Stub advisory." for r in results)
+    return {
+        "analyses": concurrency,
+        "llm_calls": stub.calls,
+        "failed": failed,
+        "stub_latency_s": latency,
+        "wall_s": round(elapsed, 3),
+        "throughput_per_s": round(concurrency / elapsed, 1),
+        "max_loop_lag_ms": round(max(lag, default=0) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent run_advisory_agent() throughput against a stub LLM.")
+    parser.add_argument("-n", "--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM response time (seconds)")
+    parser.add_argument("--cached", action="store_true", help="allow advisory cache hits")
+    parser.add_argument("--identical", action="store_true", help="send the same prompt from every analysis (single-flight)")
+    parser.add_argument("--rpm", type=float, default=0, help="LLM calls per minute (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=10)
+    args = parser.parse_args()
+
+    # The agents log every step; keep the report readable
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        report = asyncio.run(bench(args.concurrency, args.latency, args.cached, args.identical, args.rpm, args.burst))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
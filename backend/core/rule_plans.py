@@ -0,0 +1,580 @@
+import os
+import re
+import json
+import operator
+from pathlib import Path
+from string import Formatter
+from datetime import datetime
+
+# Share of date values (%) that may be impossible dates before the check fails
+IMPOSSIBLE_DATE_TOLERANCE_PCT = 1.0
+
+# Custom rule packs (*.json) in this directory are loaded once, at startup
+RULE_PACKS_DIR = os.environ.get("RULE_PACKS_DIR", str(Path(__file__).resolve().parent.parent / "rule_packs"))
+
+# --- Plan format ---
+#
+# A rule plan is a list of rules. Each rule declares its key, a scorer over
+# named features, a weight, a pass threshold and its details text:
+#
+#   {"key": "validity_date_format",
+#    "score": {"fn": "value", "of": <feature>, "default": 100},
+#    "weight": 4,
+#    "pass": {"op": ">", "value": 90},             # on the score unless "on": <feature>
+#    "details": "ISO Date format check"}           # may use {feature} placeholders
+#
+# Features are computed from the metadata and the engine's column index:
+#
+#   {"op": "mean", "of": "datetime_columns", "stat": "iso_date_match_percentage"}
+#
+# where "of" names a feature in FEATURES or is an inline feature spec. The
+# compiler gives every feature a canonical key, so identical features are
+# computed once per engine no matter which rules or standards use them.
+
+COMPARATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq, "!=": operator.ne}
+
+
+def _columns(engine, spec, _):
+    cols = [col for role in spec.get("roles", []) for col in engine.column_index[role]]
+    if spec.get("pattern"):
+        cols.extend(engine._get_columns_by_pattern(spec["pattern"]))
+    return cols
+
+
+def _all_columns(engine, spec, _):
+    return list(engine.columns)
+
+
+def _present(engine, spec, _):
+    return sum(bool(engine.column_index[role]) for role in spec["roles"])
+
+
+def _stat_test(engine, spec):
+    stat, default = spec["stat"], spec.get("default", 0)
+    if "op" not in spec.get("test", {}):
+        return lambda col: bool(engine.columns[col].get(stat, default))
+    compare, value = COMPARATORS[spec["test"]["op"]], spec["test"]["value"]
+    return lambda col: compare(engine.columns[col].get(stat, default), value)
+
+
+def _filter(engine, spec, cols):
+    test = _stat_test(engine, spec)
+    return [col for col in cols if test(col)]
+
+
+def _count(engine, spec, cols):
+    return len(cols)
+
+
+def _count_where(engine, spec, cols):
+    if not cols:
+        return None
+    test = _stat_test(engine, spec)
+    return sum(1 for col in cols if test(col))
+
+
+def _mean(engine, spec, cols):
+    if not cols:
+        return None
+    stat, default = spec["stat"], spec.get("default", 0)
+    if spec.get("complement"):
+        return sum(100 - engine.columns[col].get(stat, default) for col in cols) / len(cols)
+    return sum(engine.columns[col].get(stat, default) for col in cols) / len(cols)
+
+
+def _name_contains(engine, spec, cols):
+    if not cols:
+        return None
+    return sum(1 for col in cols if spec["text"] in col)
+
+
+def _fully_unique(engine, spec, cols):
+    if not cols:
+        return None
+    return sum(1 for col in cols if engine._is_fully_unique(col))
+
+
+def _key_column(engine, spec, _):
+    """The first column of the first role (in `roles` order) that has one, as a one-column list."""
+    for role in spec["roles"]:
+        if engine.column_index[role]:
+            return engine.column_index[role][:1]
+    return []
+
+
+def _uniqueness(engine, spec, cols):
+    """
+    Uniqueness score (0-100) of a key column (the first of `cols`). A column
+    counted exactly as a single-column candidate key uses that count; others
+    use unique_count.
+    """
+    if not cols:
+        return None
+    col = cols[0]
+    keys = (engine.metadata.get("row_uniqueness") or {}).get("candidate_keys", [])
+    exact = {key["columns"][0]: key["uniqueness_pct"] for key in keys if len(key["columns"]) == 1}
+    if col in exact:
+        return exact[col]
+    if engine._is_fully_unique(col):
+        return 100
+    # Sketch estimates can overshoot the row count; cap at 100
+    return min(100, engine.columns[col].get("unique_count", 0) / engine.total_rows * 100)
+
+
+def _row_uniqueness(engine, spec, _):
+    """% of rows that are not a repeat of an earlier row, from profiling (None if not profiled)."""
+    rows = engine.metadata.get("row_uniqueness")
+    if not rows or not rows.get("rows"):
+        return None
+    return round(100 - rows["duplicate_row_pct"], 2)
+
+
+def _reference_hit_rate(engine, spec, _):
+    """% of foreign key values found in their registered reference dataset, or None if none was checked."""
+    references = engine.metadata.get("referential_integrity")
+    if not references:
+        return None
+    return references["hit_pct"]
+
+
+def _schema_drift(engine, spec, _):
+    """Columns drifted from the lineage's accepted schema (0 for a new baseline), or None if not checked."""
+    drift = engine.metadata.get("schema_drift")
+    if not drift:
+        return None
+    return drift["drifted_columns"]
+
+
+def _status_mismatch_rate(engine, spec, _):
+    """% of status values whose code the accepted schema never had, or None."""
+    return (engine.metadata.get("schema_drift") or {}).get("status_mismatch_pct")
+
+
+def _impossible_date_rate(engine, spec, _):
+    """Impossible dates as a % (2dp) of all date values, counted at ingestion."""
+    date_values = sum(stats.get("date_value_count", 0) for stats in engine.columns.values())
+    impossible = sum(stats.get("impossible_date_count", 0) for stats in engine.columns.values())
+    return round(impossible / date_values * 100, 2) if date_values else 0
+
+
+def _dataset_age(engine, spec, _):
+    """Days since the most recent max_date, and its score against an SLA in days."""
+    sla_days = spec.get("sla_days", 30)
+    date_cols = [c for c, stats in engine.columns.items() if "max_date" in stats]
+    score, days_old = 100, 0
+    if date_cols:
+        most_recent_str = max(engine.columns[c]["max_date"] for c in date_cols)
+        try:
+            most_recent = datetime.fromisoformat(most_recent_str)
+            days_old = (datetime.now() - most_recent).days
+            score = 100 if days_old <= sla_days else max(0, 100 - (days_old - sla_days))
+        except:
+            score = 0
+    return {"days": days_old, "score": score}
+
+
+# op -> fn(engine, spec, value of spec["of"] or None)
+FEATURE_OPS = {
+    "columns": _columns,
+    "all_columns": _all_columns,
+    "present": _present,
+    "filter": _filter,
+    "count": _count,
+    "count_where": _count_where,
+    "mean": _mean,
+    "name_contains": _name_contains,
+    "fully_unique": _fully_unique,
+    "key_column": _key_column,
+    "uniqueness": _uniqueness,
+    "row_uniqueness": _row_uniqueness,
+    "reference_hit_rate": _reference_hit_rate,
+    "schema_drift": _schema_drift,
+    "status_mismatch_rate": _status_mismatch_rate,
+    "impossible_date_rate": _impossible_date_rate,
+    "dataset_age": _dataset_age
+}
+
+
+def _score_value(spec, value, total):
+    if value is None:
+        return spec.get("default", 0)
+    return value[spec["field"]] if "field" in spec else value
+
+
+def _score_if(spec, value, total):
+    if value is None:
+        return spec["default"]
+    return spec["then"] if value >= spec.get("min", 1) else spec["else"]
+
+
+def _score_ratio(spec, value, total):
+    return (value / spec["total"]) * 100
+
+
+def _score_complement(spec, value, total):
+    return spec["default"] if value is None else max(0, 100 - value)
+
+
+def _score_penalty(spec, value, total):
+    return spec["default"] if value is None else max(0, 100 - (value * spec["per"]))
+
+
+def _score_share_ok(spec, value, total):
+    return ((total - value) / total * 100) if total else spec["default"]
+
+
+# fn -> scorer(spec, value of "of", value of "total")
+SCORERS = {
+    "constant": lambda spec, value, total: spec["value"],
+    "value": _score_value,
+    "if": _score_if,
+    "ratio": _score_ratio,
+    "complement": _score_complement,
+    "penalty": _score_penalty,
+    "share_ok": _score_share_ok
+}
+
+# Features shared by several rules or standards
+FEATURES = {
+    "pii_columns": {"op": "columns", "roles": ["pii"]},
+    "datetime_columns": {"op": "columns", "roles": ["datetime"]},
+    "mandatory_columns": {"op": "columns", "roles": ["id", "amount", "datetime"]},
+    # The transaction ID column if one is named so, else the first identifier column
+    "transaction_id_uniqueness": {"op": "uniqueness", "of": {"op": "key_column", "roles": ["transaction_id", "identifier"]}},
+    # The declared primary key (id, pk, primary_key) if any, else the first identifier column
+    "primary_key_uniqueness": {"op": "uniqueness", "of": {"op": "key_column", "roles": ["primary_key", "identifier"]}},
+    "row_uniqueness": {"op": "row_uniqueness"},
+    "reference_hit_rate": {"op": "reference_hit_rate"},
+    "schema_drift": {"op": "schema_drift"},
+    "status_mismatch_rate": {"op": "status_mismatch_rate"},
+    "numeric_amount_columns": {"op": "filter", "of": {"op": "columns", "roles": ["amount_like"]}, "stat": "is_numeric"},
+    "impossible_date_rate": {"op": "impossible_date_rate"},
+    "dataset_age": {"op": "dataset_age", "sla_days": 30}
+}
+
+
+def _if_present(role, then, otherwise):
+    return {"fn": "if", "of": {"op": "present", "roles": [role]}, "then": then, "else": otherwise}
+
+
+def _constant(value):
+    return {"fn": "constant", "value": value}
+
+
+def _rule(key, score, weight, passed, details):
+    return {"key": key, "score": score, "weight": weight, "pass": passed, "details": details}
+
+
+def _above(value):
+    return {"op": ">", "value": value}
+
+
+def _equals(value):
+    return {"op": "==", "value": value}
+
+
+ALWAYS = None
+
+RULE_PLANS = {
+    "completeness": [
+        _rule("completeness_mandatory_columns", {"fn": "ratio", "of": {"op": "present", "roles": ["id", "amount", "datetime"]}, "total": 3}, 4, _equals(100), "Mandatory columns check"),
+        _rule("completeness_mandatory_nulls", {"fn": "value", "of": {"op": "mean", "of": "mandatory_columns", "stat": "null_percentage", "complement": True}, "default": 0}, 4, _above(95), "Critical fields non-null check"),
+        _rule("completeness_address", {"fn": "value", "of": {"op": "mean", "of": {"op": "columns", "roles": ["address"]}, "stat": "null_percentage", "complement": True}, "default": 0}, 3, _above(90), "Address fields presence"),
+        _rule("completeness_kyc_id", _if_present("kyc", 100, 0), 5, _equals(100), "KYC Identifier presence"),
+        _rule("completeness_source_of_funds", _if_present("source_of_funds", 100, 0), 3, _equals(100), "Source of funds check"),
+        _rule("completeness_audit_trail", _if_present("audit_trail", 100, 0), 2, _equals(100), "Audit trail columns check"),
+        _rule("completeness_enhanced_data", _if_present("enhanced", 100, 0), 1, _equals(100), "Enhanced data fields check")
+    ],
+    "validity": [
+        _rule("validity_date_format", {"fn": "value", "of": {"op": "mean", "of": "datetime_columns", "stat": "iso_date_match_percentage"}, "default": 100}, 4, _above(90), "ISO Date format check"),
+        _rule("validity_currency_code", {"fn": "value", "of": {"op": "mean", "of": {"op": "columns", "roles": ["currency_code"]}, "stat": "currency_code_match_percentage"}, "default": 100}, 3, _above(95), "ISO Currency code check"),
+        _rule("validity_country_code", {"fn": "value", "of": {"op": "mean", "of": {"op": "columns", "roles": ["country"]}, "stat": "country_code_match_percentage"}, "default": 100}, 3, _above(95), "ISO Country code check"),
+        # Would need regex profiling of name values at ingestion
+        _rule("validity_name_pattern", _constant(100), 3, ALWAYS, "Name naming convention check"),
+        _rule("validity_field_length", _constant(100), 2, ALWAYS, "Field length truncation check"),
+        _rule("validity_regex_conformity", {"fn": "value", "of": {"op": "mean", "of": {"op": "columns", "roles": ["email"]}, "stat": "email_match_percentage"}, "default": 100}, 2, _above(90), "Regex pattern conformity"),
+        _rule("validity_schema_type", _constant(100), 1, ALWAYS, "Schema type consistency")
+    ],
+    "accuracy": [
+        _rule("accuracy_impossible_date", {"fn": "complement", "of": "impossible_date_rate", "default": 100}, 4,
+              {"on": "impossible_date_rate", "op": "<=", "value": IMPOSSIBLE_DATE_TOLERANCE_PCT}, "Impossible dates: {impossible_date_rate}% of date values"),
+        _rule("accuracy_negative_amounts", {"fn": "share_ok", "of": {"op": "count_where", "of": "numeric_amount_columns", "stat": "min", "test": {"op": "<=", "value": 0}},
+                                            "total": {"op": "count", "of": "numeric_amount_columns"}, "default": 100}, 5, _equals(100), "Zero/Negative amount check"),
+        _rule("accuracy_arithmetic", _constant(100), 4, ALWAYS, "Arithmetic calculations match"),
+        _rule("accuracy_null_clusters", {"fn": "penalty", "of": {"op": "count_where", "of": {"op": "all_columns"}, "stat": "null_percentage", "test": {"op": ">", "value": 90}},
+                                         "per": 10, "default": 100}, 2, _above(80), "Systemic null clusters check")
+    ],
+    "uniqueness": [
+        _rule("uniqueness_transaction_id", {"fn": "value", "of": "transaction_id_uniqueness", "default": 0}, 5, _above(99), "Transaction ID uniqueness"),
+        # Profiles without row hashes (sampled, incremental) pass by default;
+        # run_compliance() marks them inconclusive via metadata["unmeasured"]
+        _rule("uniqueness_composite_key", {"fn": "value", "of": "row_uniqueness", "default": 100}, 3, _above(99), "Row-level uniqueness"),
+        # Candidate keys from profiling are reported in metadata only: they are
+        # chosen for being unique, so scoring them would pass by construction
+        _rule("uniqueness_primary_key", {"fn": "value", "of": "primary_key_uniqueness", "default": 0}, 2, _above(99), "Entity uniqueness")
+    ],
+    "consistency": [
+        # Both compare against the lineage's accepted schema (see services.schema_registry)
+        _rule("consistency_status_mismatch", {"fn": "complement", "of": "status_mismatch_rate", "default": 100}, 4, _above(95), "Consistent statuses check"),
+        _rule("consistency_currency_country", _constant(100), 3, ALWAYS, "Currency-Country alignment"),
+        _rule("consistency_schema_drift", {"fn": "if", "of": "schema_drift", "then": 0, "else": 100, "default": 100}, 3, _equals(100), "Schema structural consistency")
+    ],
+    "timeliness": [
+        _rule("timeliness_dataset_age", {"fn": "value", "of": "dataset_age", "field": "score"}, 4, _above(80), "Data age: {dataset_age[days]} days (SLA: 30)"),
+        _rule("timeliness_late_ingestion", {"fn": "value", "of": "dataset_age", "field": "score"}, 2, _above(80), "No delayed ingestion")
+    ],
+    "integrity": [
+        # Measured against registered reference datasets when a column matched
+        # one; otherwise FK columns should at least be mostly filled in
+        _rule("integrity_referential", {"fn": "value", "of": "reference_hit_rate", "default": {
+                  "fn": "penalty", "of": {"op": "count_where", "of": {"op": "columns", "roles": ["foreign_key"]}, "stat": "null_percentage", "test": {"op": ">", "value": 20}},
+                  "per": 20, "default": 100}}, 7, _above(80), "Foreign key relationships check")
+    ],
+    "security": [
+        _rule("security_pan_storage", _if_present("pan", 0, 100), 5, _equals(100), "No PAN stored check"),
+        _rule("security_cvv_storage", _if_present("cvv", 0, 100), 5, _equals(100), "No CVV stored check"),
+        _rule("security_metadata_only", _constant(100), 2, ALWAYS, "Metadata-only enforcement")
+    ],
+    "gdpr": [
+        # Purposes are assumed declared in the upstream catalog (simulated pass)
+        _rule("gdpr_purpose_limitation", _constant(100), 5, _above(90), "PII fields have declared purpose"),
+        _rule("gdpr_data_minimization", {"fn": "penalty", "of": {"op": "count_where", "of": "pii_columns", "stat": "null_percentage", "test": {"op": ">", "value": 80}},
+                                         "per": 20, "default": 100}, 5, _above(80), "No unused/high-null PII fields"),
+        # Passes with a lawful basis column, or when there is no PII at all
+        _rule("gdpr_lawful_basis", {"fn": "if", "of": {"op": "present", "roles": ["lawful_basis"]}, "then": 100,
+                                    "else": {"fn": "if", "of": {"op": "count", "of": "pii_columns"}, "then": 50, "else": 100}}, 5, _above(80), "Lawful basis reference found"),
+        _rule("gdpr_storage_limitation", _if_present("retention", 100, 0), 4, _above(0), "Data retention attributes found"),
+        _rule("gdpr_access_restriction", _if_present("access_log", 100, 20), 4, _above(50), "Processing/Access logs exist"),
+        _rule("gdpr_metadata_analytics", _if_present("credential", 0, 100), 5, _equals(100), "No raw credentials in analytic scope")
+    ],
+    "visa_cedp": [
+        # Classification needs catalog tags; assumed classified
+        _rule("visa_data_classification", _constant(100), 5, ALWAYS, "Card data fields classified"),
+        _rule("visa_secure_handling", _constant(100), 4, ALWAYS, "Transaction attributes conform to format"),
+        _rule("visa_no_unauthorized_storage", _if_present("visa_pan", 0, 100), 5, _equals(100), "No raw PAN storage outside permitted systems"),
+        _rule("visa_transaction_completeness", {"fn": "ratio", "of": {"op": "present", "roles": ["amount", "currency", "date"]}, "total": 3}, 5, _equals(100), "Mandatory Visa fields present"),
+        _rule("visa_fraud_readiness", _if_present("fraud_signal", 100, 50), 3, _above(80), "Fraud monitoring attributes available"),
+        _rule("visa_cross_system_consistency", _if_present("trace_id", 100, 0), 4, _equals(100), "Transaction identifiers consistent")
+    ],
+    "aml_fatf": [
+        _rule("aml_kyc_identifier", _if_present("aml_kyc", 100, 0), 5, _equals(100), "Valid customer identity reference exists"),
+        _rule("aml_address_completeness", {"fn": "if", "of": {"op": "count", "of": {"op": "columns", "roles": ["aml_address"]}}, "min": 2, "then": 100, "else": 0},
+              5, _equals(100), "Jurisdictional address fields present"),
+        _rule("aml_source_of_funds", _if_present("aml_source_of_funds", 100, 0), 5, _equals(100), "Origin of funds attribute populated"),
+        _rule("aml_traceability", _if_present("party_link", 100, 0), 5, _equals(100), "Transaction links to customer/entity"),
+        # Volume analysis needs both an amount and a date
+        _rule("aml_suspicious_patterns", {"fn": "if", "of": {"op": "present", "roles": ["monetary", "datetime"]}, "min": 2, "then": 100, "else": 0},
+              4, _equals(100), "Data supports volume/frequency analysis"),
+        _rule("aml_audit_trail", _if_present("aml_audit", 100, 0), 3, _equals(100), "Transaction history is traceable")
+    ],
+    "pci_dss": [
+        _rule("pci_no_cvv", _if_present("pci_cvv", 0, 100), 5, _equals(100), "CVV must never be stored"),
+        # No sample data here, so PAN columns are assumed masked unless named raw
+        _rule("pci_pan_masking", {"fn": "if", "of": {"op": "name_contains", "of": {"op": "columns", "roles": ["pci_pan"]}, "text": "raw"}, "then": 0, "else": 100, "default": 100},
+              5, _equals(100), "PAN is masked/tokenized"),
+        _rule("pci_restricted_access", _if_present("tokenization", 100, 50), 3, _above(60), "Card data access controls inferred"),
+        _rule("pci_secure_transmission", _constant(100), 3, ALWAYS, "Secure channel flags check (inferred)"),
+        _rule("pci_data_lifecycle", _if_present("purge", 100, 25), 4, _above(50), "lifecycle/deletion attributes found"),
+        _rule("pci_metadata_processing", _if_present("track_data", 0, 100), 5, _equals(100), "No raw track data inspection")
+    ],
+    "basel": [
+        _rule("basel_amount_accuracy", {"fn": "if", "of": {"op": "count_where", "of": {"op": "columns", "roles": ["exposure"]}, "stat": "min", "test": {"op": "<", "value": 0}},
+                                        "then": 0, "else": 100, "default": 100}, 5, _equals(100), "Amounts positive & within bounds"),
+        # Placeholder for reconciliation
+        _rule("basel_arithmetic_consistency", _constant(100), 4, ALWAYS, "Derived fields reconcile"),
+        _rule("basel_referential_integrity", {"fn": "value", "of": "reference_hit_rate", "default": {
+                  "fn": "complement", "of": {"op": "mean", "of": {"op": "columns", "roles": ["id_suffix"]}, "stat": "null_percentage"}, "default": 100}},
+              5, _above(90), "Entities referenced validly"),
+        _rule("basel_duplicate_prevention", {"fn": "if", "of": {"op": "fully_unique", "of": {"op": "columns", "roles": ["id_end"]}}, "then": 100, "else": 50, "default": 100},
+              5, _above(90), "No duplicated exposure transactions"),
+        _rule("basel_cross_ledger", _if_present("ledger", 100, 50), 3, _above(80), "Ledger alignment attributes"),
+        # Assumed within SLA (see timeliness_dataset_age for the measured age)
+        _rule("basel_timeliness", _constant(100), 4, ALWAYS, "Data available within risk SLAs")
+    ]
+}
+
+# Plans run for each standard, in order. Rule packs add standards here.
+STANDARD_PLANS = {
+    "General Transaction": ["completeness", "validity", "accuracy", "uniqueness", "consistency", "timeliness", "integrity", "security"],
+    "GDPR": ["gdpr"],
+    "Visa CEDP": ["visa_cedp"],
+    "AML / FATF": ["aml_fatf"],
+    "PCI DSS": ["pci_dss"],
+    "Basel II / III": ["basel"]
+}
+# Rule keys dropped from a standard's plans (set by rule packs)
+STANDARD_SKIPS = {}
+
+
+def _format_fields(details: str) -> list:
+    return [field.split("[")[0].split(".")[0] for _, field, _, _ in Formatter().parse(details) if field]
+
+
+class CompiledPlan:
+    """
+    Rule plans compiled to one deduplicated feature list, in dependency
+    order, and the rules that read from it.
+    """
+
+    def __init__(self, plan_names, skip=()):
+        self.features = []  # (key, spec, key of "of")
+        self._keys = {}
+        self.rules = []
+        seen = set()
+        for plan_name in plan_names:
+            if plan_name not in RULE_PLANS:
+                raise ValueError(f"Unknown rule plan '{plan_name}'")
+            for rule in RULE_PLANS[plan_name]:
+                if rule["key"] in skip:
+                    continue
+                if rule["key"] in seen:
+                    raise ValueError(f"Duplicate rule '{rule['key']}' in plans {list(plan_names)}")
+                seen.add(rule["key"])
+                self.rules.append(self._compile_rule(rule))
+
+    def _feature(self, ref) -> str:
+        """Canonical key of a feature (by name or inline spec), adding it and its inputs once."""
+        if isinstance(ref, str):
+            if ref not in FEATURES:
+                raise ValueError(f"Unknown feature '{ref}'")
+            ref = FEATURES[ref]
+        if ref.get("op") not in FEATURE_OPS:
+            raise ValueError(f"Unknown feature op '{ref.get('op')}'")
+        dep = self._feature(ref["of"]) if "of" in ref else None
+        spec = {**ref, "of": dep} if dep else ref
+        key = json.dumps(spec, sort_keys=True)
+        if key not in self._keys:
+            self._keys[key] = len(self.features)
+            self.features.append((key, spec, dep))
+        return key
+
+    def _compile_score(self, score) -> tuple:
+        if score.get("fn") not in SCORERS:
+            raise ValueError(f"Unknown scorer '{score.get('fn')}'")
+        of = self._feature(score["of"]) if "of" in score else None
+        total = self._feature(score["total"]) if isinstance(score.get("total"), (str, dict)) else None
+        # A nested scorer as "else" covers rules with two conditions, and as
+        # "default" a fallback when the input is missing
+        otherwise = self._compile_score(score["else"]) if isinstance(score.get("else"), dict) else None
+        fallback = self._compile_score(score["default"]) if isinstance(score.get("default"), dict) else None
+        return score, of, total, otherwise, fallback
+
+    def _compile_rule(self, rule) -> dict:
+        passed = rule.get("pass")
+        if passed is not None and passed["op"] not in COMPARATORS:
+            raise ValueError(f"Unknown comparison '{passed['op']}' in rule '{rule['key']}'")
+        details = rule.get("details", "")
+        return {
+            "key": rule["key"],
+            "score": self._compile_score(rule["score"]),
+            "weight": rule["weight"],
+            "pass": passed,
+            "on": self._feature(passed["on"]) if passed and "on" in passed else None,
+            "details": details,
+            "details_fields": {name: self._feature(name) for name in _format_fields(details)}
+        }
+
+    def _score(self, compiled, values):
+        score, of, total, otherwise, fallback = compiled
+        value = values[of] if of else None
+        if fallback is not None and value is None:
+            return self._score(fallback, values)
+        if otherwise is not None and value is not None and value < score.get("min", 1):
+            return self._score(otherwise, values)
+        return SCORERS[score["fn"]](score, value, values[total] if total else score.get("total"))
+
+    def evaluate(self, engine) -> dict:
+        """
+        Computes the features not yet cached on the engine, then every rule.
+        Returns {rule_key: {"score", "weight", "passed", "details"}}.
+        """
+        values = engine.feature_values
+        for key, spec, dep in self.features:
+            if key not in values:
+                values[key] = FEATURE_OPS[spec["op"]](engine, spec, values[dep] if dep else None)
+
+        results = {}
+        for rule in self.rules:
+            score = self._score(rule["score"], values)
+            passed = rule["pass"]
+            if passed is None:
+                ok = True
+            else:
+                subject = values[rule["on"]] if rule["on"] else score
+                ok = COMPARATORS[passed["op"]](subject, passed["value"])
+            details = rule["details"]
+            if rule["details_fields"]:
+                details = details.format(**{name: values[key] for name, key in rule["details_fields"].items()})
+            results[rule["key"]] = {"score": score, "weight": rule["weight"], "passed": ok, "details": details}
+        return results
+
+
+_compiled = {}
+
+
+def compile_plans(plan_names, skip=()) -> CompiledPlan:
+    """Compiled plan for a list of plan names; compiled once and reused."""
+    cache_key = (tuple(plan_names), frozenset(skip))
+    if cache_key not in _compiled:
+        _compiled[cache_key] = CompiledPlan(plan_names, skip)
+    return _compiled[cache_key]
+
+
+def compile_standard(standard: str) -> CompiledPlan:
+    return compile_plans(STANDARD_PLANS[standard], STANDARD_SKIPS.get(standard, ()))
+
+
+def _add_pack(pack: dict, column_roles: dict) -> str:
+    standard = pack["standard"]
+    if standard in STANDARD_PLANS:
+        raise ValueError(f"standard '{standard}' already exists")
+    for role, pattern in pack.get("roles", {}).items():
+        re.compile(pattern)
+        if column_roles.get(role, pattern) != pattern:
+            raise ValueError(f"role '{role}' is already defined with another pattern")
+    for name, spec in pack.get("features", {}).items():
+        if FEATURES.get(name, spec) != spec:
+            raise ValueError(f"feature '{name}' is already defined")
+
+    plans = list(pack.get("include", []))
+    if pack.get("rules"):
+        plans.append(standard)
+    roles = set(column_roles) | set(pack.get("roles", {}))
+
+    FEATURES.update(pack.get("features", {}))
+    RULE_PLANS[standard] = pack.get("rules", [])
+    try:
+        compiled = CompiledPlan(plans, set(pack.get("skip", [])))
+        unknown = {role for _, spec, _ in compiled.features for role in spec.get("roles", [])} - roles
+        if unknown:
+            raise ValueError(f"unknown roles {sorted(unknown)}")
+    except Exception:
+        del RULE_PLANS[standard]
+        for name in pack.get("features", {}):
+            FEATURES.pop(name, None)
+        raise
+
+    column_roles.update(pack.get("roles", {}))
+    STANDARD_PLANS[standard] = plans
+    STANDARD_SKIPS[standard] = set(pack.get("skip", []))
+    return standard
+
+
+def load_rule_packs(column_roles: dict, directory: str = RULE_PACKS_DIR) -> list:
+    """
+    Loads the *.json rule packs in `directory`. A pack defines a new standard:
+    built-in plans to include, rule keys to skip, and its own roles (added to
+    `column_roles`), features and rules. Invalid packs are skipped. Returns
+    the names of the standards added.
+    """
+    if not directory or not os.path.isdir(directory):
+        return []
+    standards = []
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            with open(path) as f:
+                standards.append(_add_pack(json.load(f), column_roles))
+            print(f"📦 [Rule Packs]: Loaded '{standards[-1]}' from {path.name}")
+        except Exception as e:
+            print(f"⚠️ [Rule Packs]: Skipping {path.name}: {e}")
+    return standards
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+from core.rule_plans import COMPARATORS, RULE_PLANS, STANDARD_PLANS
+from services.scoring import calculate_scores_batch
+
+# Datasets described by pre-aggregated metric rows
+# (metadata_only_payment_template_with_row.csv) are scored against the
+# General Transaction rules. Rule keys, weights, pass thresholds and details
+# come from RULE_PLANS; this module only says which template metric stands
+# in for each rule.
+
+
+def _as_score(metric):
+    return metric
+
+
+def _inverse(rate):
+    return 100 - rate
+
+
+def _flag_set(flag):
+    return flag * 100
+
+
+def _flag_clear(flag):
+    return (1 - flag) * 100
+
+
+def _age_score(hours):
+    # Same curve as check_timeliness: full marks up to 30 days, -1 per day after
+    days = np.floor(hours / 24)
+    return np.where(days <= 30, 100, np.maximum(0, 100 - (days - 30)))
+
+
+# rule key -> (template metric, metric -> score). A rule whose pass test is
+# "on" a feature compares the raw metric instead of the score.
+TEMPLATE_METRICS = {
+    "completeness_mandatory_columns": ("mandatory_columns_present_pct", _as_score),
+    "completeness_mandatory_nulls": ("mandatory_fields_non_null_pct", _as_score),
+    "completeness_address": ("address_completeness_pct", _as_score),
+    "completeness_kyc_id": ("kyc_identifier_presence_pct", _as_score),
+    "completeness_source_of_funds": ("source_of_funds_presence_pct", _as_score),
+    "completeness_audit_trail": ("audit_columns_present_flag", _flag_set),
+    "completeness_enhanced_data": ("enhanced_data_available_flag", _flag_set),
+
+    "validity_date_format": ("date_format_compliance_pct", _as_score),
+    "validity_currency_code": ("currency_code_format_pct", _as_score),
+    "validity_country_code": ("country_code_format_pct", _as_score),
+    "validity_name_pattern": ("name_pattern_compliance_pct", _as_score),
+    "validity_field_length": ("field_length_bounds_pct", _as_score),
+    "validity_regex_conformity": ("regex_conformity_pct", _as_score),
+    "validity_schema_type": ("schema_type_correctness_pct", _as_score),
+
+    "accuracy_impossible_date": ("impossible_date_rate_pct", _inverse),
+    "accuracy_negative_amounts": ("zero_negative_amount_rate_pct", _inverse),
+    "accuracy_arithmetic": ("arithmetic_consistency_pct", _as_score),
+    "accuracy_null_clusters": ("suspicious_null_cluster_pct", _inverse),
+
+    "uniqueness_transaction_id": ("transaction_id_uniqueness_pct", _as_score),
+    "uniqueness_composite_key": ("composite_key_uniqueness_pct", _as_score),
+    "uniqueness_primary_key": ("primary_key_duplication_rate_pct", _inverse),
+
+    "consistency_status_mismatch": ("cross_dataset_status_mismatch_pct", _inverse),
+    "consistency_currency_country": ("currency_country_mismatch_pct", _inverse),
+    "consistency_schema_drift": ("schema_drift_detected_flag", _flag_clear),
+
+    "timeliness_dataset_age": ("dataset_age_hours", _age_score),
+    "timeliness_late_ingestion": ("late_ingestion_rate_pct", _inverse),
+
+    "integrity_referential": ("referential_integrity_hit_pct", _as_score),
+
+    "security_pan_storage": ("pan_storage_violation_flag", _flag_clear),
+    "security_cvv_storage": ("cvv_storage_violation_flag", _flag_clear),
+    "security_metadata_only": ("metadata_only_enforced_flag", _flag_set),
+}
+
+# Pass tests where the template measures what the profile cannot: presence
+# checks that are all-or-nothing on a profile (KYC, source of funds) are
+# coverage percentages here, and rules a profile always passes have a metric.
+TEMPLATE_PASS = {
+    "completeness_kyc_id": {"op": ">", "value": 95},
+    "completeness_source_of_funds": {"op": ">", "value": 95},
+    "validity_name_pattern": {"op": ">", "value": 90},
+    "validity_field_length": {"op": ">", "value": 90},
+    "validity_schema_type": {"op": ">", "value": 90},
+    "accuracy_arithmetic": {"op": ">", "value": 95},
+    "consistency_currency_country": {"op": ">", "value": 95},
+    "security_metadata_only": {"op": "==", "value": 100},
+}
+
+# Details that quote profile features have no per-row template equivalent
+TEMPLATE_DETAILS = {
+    "accuracy_impossible_date": "Logical dates only",
+    "timeliness_dataset_age": "Data age (SLA: 30 days)",
+}
+
+
+def _template_rules() -> list:
+    """(rule key, metric, score fn, pass spec, weight, details) for every General Transaction rule, in plan order."""
+    rules = []
+    for plan in STANDARD_PLANS["General Transaction"]:
+        for rule in RULE_PLANS[plan]:
+            if rule["key"] not in TEMPLATE_METRICS:
+                raise KeyError(f"No template metric for rule '{rule['key']}'")
+            metric, score_fn = TEMPLATE_METRICS[rule["key"]]
+            passed = TEMPLATE_PASS.get(rule["key"], rule["pass"])
+            details = TEMPLATE_DETAILS.get(rule["key"], rule["details"])
+            rules.append((rule["key"], metric, score_fn, passed, rule["weight"], details))
+    return rules
+
+
+TEMPLATE_RULES = _template_rules()
+
+
+def evaluate_template_rows(rows: pd.DataFrame) -> dict:
+    """
+    Evaluates every template rule over all rows at once. Returns
+    {rule_key: {"score": array, "passed": bool array, "weight", "details"}}
+    with one array entry per row. Missing or non-numeric metric values
+    score 0 and fail.
+    """
+    missing = [metric for _, metric, *_ in TEMPLATE_RULES if metric not in rows.columns]
+    if missing:
+        raise ValueError(f"Template is missing metric columns: {', '.join(missing)}")
+
+    results = {}
+    for key, metric, score_fn, passed, weight, details in TEMPLATE_RULES:
+        values = pd.to_numeric(rows[metric], errors="coerce").to_numpy(dtype=np.float64)
+        score = np.clip(score_fn(values), 0, 100)
+        if passed is None:
+            ok = np.ones(len(score), dtype=bool)
+        else:
+            ok = COMPARATORS[passed["op"]](values if "on" in passed else score, passed["value"])
+        results[key] = {
+            "score": np.nan_to_num(score, nan=0.0),
+            "passed": ok & ~np.isnan(score),
+            "weight": weight,
+            "details": details
+        }
+    return results
+
+
+def score_template_rows(rows: pd.DataFrame) -> dict:
+    """
+    Per-dataset compliance scores for a batch of template rows, plus
+    estate-wide averages and per-rule pass rates.
+    """
+    results = evaluate_template_rows(rows)
+    scores = calculate_scores_batch(results)
+
+    keys = list(results)
+    passed = np.vstack([results[key]["passed"] for key in keys]) if keys else np.empty((0, len(rows)), dtype=bool)
+    ids = rows["dataset_id"].astype(str).tolist() if "dataset_id" in rows.columns else [str(i) for i in range(len(rows))]
+    sources = rows["source_system"].astype(str).tolist() if "source_system" in rows.columns else [None] * len(rows)
+    overall = scores["overall_score"].tolist()
+    dimensions = {dim: values.tolist() for dim, values in scores["dimension_scores"].items()}
+
+    datasets = []
+    for i in range(len(rows)):
+        datasets.append({
+            "dataset_id": ids[i],
+            "source_system": sources[i],
+            "overall_score": overall[i],
+            "health_score": overall[i],
+            "dimension_scores": {dim: values[i] for dim, values in dimensions.items()},
+            "failed_rules": [keys[r] for r in np.flatnonzero(~passed[:, i])]
+        })
+
+    return {
+        "total_datasets": len(rows),
+        "average_overall_score": round(float(scores["overall_score"].mean()), 2) if len(rows) else None,
+        "rule_pass_rates": {key: round(float(results[key]["passed"].mean() * 100), 2) if len(rows) else None for key in keys},
+        "datasets": datasets
+    }
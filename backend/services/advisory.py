@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import asyncio
+from services.provenance import provenance_service
+from services.report_store import report_store, load_report
+
+# Deferred AI advisories. With defer_analysis, /api/analyze answers with the
+# deterministic scores as soon as the rules engine is done; the advisory runs
+# in the background and reaches the client over GET /api/reports/{id}/analysis
+# (Server-Sent Events), together with a second attestation that chains the
+# analysis to the first one.
+ADVISORY_KEEPALIVE = float(os.environ.get("ADVISORY_KEEPALIVE", 15))
+# A stream gives up (with an "error" event) if the advisory takes longer than this
+ADVISORY_STREAM_TIMEOUT = float(os.environ.get("ADVISORY_STREAM_TIMEOUT", 300))
+# How often a stream re-reads the report store when no advisory runs in this process
+ADVISORY_POLL_SECONDS = float(os.environ.get("ADVISORY_POLL_SECONDS", 1))
+
+_finished = {}
+_tasks = set()
+
+
+async def run_advisory(scores: dict, metadata: dict, use_cache: bool = True) -> dict:
+    """The AI advisory for a report, or a placeholder when it is unavailable."""
+    from ai.agent import run_advisory_agent
+
+    try:
+        if os.environ.get("GOOGLE_API_KEY"):
+            return await run_advisory_agent(scores, metadata, use_cache=use_cache)
+        return {
+            "executive_summary": "AI analysis skipped (GOOGLE_API_KEY not set).",
+            "risk_assessment": "Configure the API key to enable GenAI insights.",
+            "remediation_steps": []
+        }
+    except Exception as e:
+         # Fallback to prevent API failure
+         return {
+            "executive_summary": "AI analysis failed temporarily.",
+            "risk_assessment": str(e),
+            "remediation_steps": []
+        }
+
+
+def attest_advisory(report_id: str, provenance: dict, analysis: dict) -> dict:
+    """
+    Signs a deferred advisory. The record names the report and carries the
+    fingerprint and signature of its deterministic attestation, so the two
+    verify as a chain.
+    """
+    return provenance_service.sign_record({
+        "report_id": report_id,
+        "analysis_summary_hash": provenance_service.compute_fingerprint(analysis),
+        "previous_fingerprint": provenance["fingerprint"],
+        "previous_signature": provenance["signature"]
+    })
+
+
+def _store_advisory(report_id: str, analysis: dict, advisory: dict):
+    # Re-read: a re-evaluation may have stored other standards meanwhile
+    report = report_store.get(report_id)
+    if report is not None:
+        if analysis is not None:
+            report["analyses"]["General Transaction"] = analysis
+        report["advisory"] = advisory
+        report_store.set(report_id, report)
+
+
+async def _complete(report_id: str, scores: dict, metadata: dict, provenance: dict, use_cache: bool):
+    started = time.time()
+    analysis, advisory = None, {"status": "failed", "provenance": None}
+    try:
+        analysis = await run_advisory(scores, metadata, use_cache)
+        advisory = {"status": "done", "provenance": attest_advisory(report_id, provenance, analysis)}
+        print(f"✅ [Advisory]: {report_id} analysis ready after {time.time() - started:.2f}s")
+    except Exception as e:
+        analysis = None
+        print(f"❌ [Advisory]: {report_id} analysis failed: {e}")
+    finally:
+        # Streams waiting on the event must wake up whatever happened
+        try:
+            _store_advisory(report_id, analysis, advisory)
+        finally:
+            _finished.pop(report_id).set()
+
+
+def defer_advisory(report_id: str, scores: dict, metadata: dict, provenance: dict, use_cache: bool = True):
+    """Runs the advisory of a saved report in the background."""
+    _finished[report_id] = asyncio.Event()
+    task = asyncio.create_task(_complete(report_id, scores, metadata, provenance, use_cache))
+    # The loop only keeps weak references to tasks
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def advisory_events(report_id: str):
+    """
+    SSE stream of a report's advisory: "pending" events until it is ready,
+    then one "analysis" event with the analysis and its attestation, or an
+    "error" event if it failed. Raises 404 before streaming if the report
+    does not exist.
+    """
+    load_report(report_id)
+
+    async def events():
+        deadline = time.time() + ADVISORY_STREAM_TIMEOUT
+        # Runs in this process: the report is read once, when the event is set
+        finished = _finished.get(report_id)
+        while True:
+            if finished is None or finished.is_set():
+                report = report_store.get(report_id)
+                if report is None:
+                    yield _event("error", {"report_id": report_id, "detail": "Report expired."})
+                    return
+                advisory = report.get("advisory") or {"status": "done", "provenance": None}
+                if advisory["status"] == "done":
+                    yield _event("analysis", {
+                        "report_id": report_id,
+                        "analysis": report["analyses"].get("General Transaction"),
+                        "provenance": advisory["provenance"]
+                    })
+                    return
+                if advisory["status"] == "failed":
+                    yield _event("error", {"report_id": report_id, "detail": "Analysis failed."})
+                    return
+            if time.time() > deadline:
+                yield _event("error", {"report_id": report_id, "detail": "Analysis timed out."})
+                return
+            try:
+                if finished is not None:
+                    await asyncio.wait_for(finished.wait(), min(ADVISORY_KEEPALIVE, max(deadline - time.time(), 0)))
+                    continue
+                # Started by another process: poll the shared report store
+                await asyncio.sleep(ADVISORY_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            yield _event("pending", {"report_id": report_id})
+
+    return events()
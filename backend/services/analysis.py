@@ -0,0 +1,108 @@
+from fastapi import UploadFile
+from services.ingestion import profile_cache, profile_upload, upload_digest
+from services.schema_registry import check_schema, schema_version
+from services.scoring import calculate_scores_by_standard
+from services.provenance import provenance_service
+from services.report_store import save_report
+from services.advisory import run_advisory, defer_advisory
+from core.rules_engine import RulesEngine
+
+# Stages of an analysis and their share (%) of its progress. The first three
+# are CPU-bound and run off the event loop (worker thread or job process).
+ANALYSIS_STAGES = {"profiling": 60, "rules": 15, "scoring": 5, "analysis": 15, "signing": 5}
+
+
+def _no_progress(stage: str, rows: int = None):
+    pass
+
+
+def analysis_cache_key(file: UploadFile, options: dict, lineage: str) -> str:
+    """
+    profile_cache key: the upload's content plus everything that shapes its
+    analysis. The lineage's schema version is checked on lookup instead (see
+    cached_analysis), since analysing the first file of a lineage creates it.
+    """
+    return upload_digest(
+        file, mode=options["mode"], ingest_engine=options["engine"], columns=options["columns"],
+        sample_rows=options["sample_rows"], stratify_by=options["stratify_by"], lineage=lineage
+    )
+
+
+def cached_analysis(cache_key: str, lineage: str) -> dict:
+    """The cached compute_analysis() entry, unless the lineage's accepted schema changed since."""
+    computed = profile_cache.get(cache_key)
+    if computed is not None and computed.get("schema_version") != schema_version(lineage):
+        return None
+    return computed
+
+
+def compute_analysis(file: UploadFile, options: dict, lineage: str, progress=_no_progress) -> dict:
+    """
+    Profiling, schema drift check, rules for every standard and scoring: the
+    CPU-bound part of /api/analyze. `progress(stage, rows=None)` is called as
+    each stage starts (and per streamed chunk, with the rows profiled so far)
+    and may raise to abort. Returns the entry cached in profile_cache.
+    """
+    progress("profiling")
+    metadata = profile_upload(file, **options, on_chunk=lambda rows: progress("profiling", rows))
+    drift = check_schema(metadata, lineage, file.filename, options["columns"])
+
+    # Every standard in one pass, so the dashboard can switch without a round-trip
+    progress("rules")
+    standard_results = RulesEngine(metadata).run_standards()
+
+    progress("scoring")
+    standard_scores = calculate_scores_by_standard(standard_results)
+    return {
+        "metadata": metadata,
+        "rule_results": standard_results["General Transaction"],
+        "scores": standard_scores["General Transaction"],
+        "standard_scores": standard_scores,
+        "metadata_hash": provenance_service.compute_fingerprint(metadata),
+        # The accepted schema the drift check ran against (or created)
+        "schema_version": drift["baseline_version"]
+    }
+
+
+async def finish_analysis(computed: dict, filename: str, progress=_no_progress, defer: bool = False,
+                          use_cache: bool = True) -> dict:
+    """
+    AI advisory, provenance attestation and report storage; returns the
+    /api/analyze response. With `defer`, the response carries only the
+    deterministic attestation and the advisory follows over
+    GET /api/reports/{report_id}/analysis. use_cache=False bypasses the
+    advisory cache.
+    """
+    metadata, scores = computed["metadata"], computed["scores"]
+    progress("analysis")
+    analysis = None if defer else await run_advisory(scores, metadata, use_cache)
+
+    progress("signing")
+    metadata_hash = computed.get("metadata_hash") or provenance_service.compute_fingerprint(metadata)
+    attestation_data = {
+        "filename": filename,
+        "health_score": scores["health_score"],
+        "overall_score": scores["overall_score"],
+        "metadata_hash": metadata_hash,
+        "analysis_summary_hash": provenance_service.compute_fingerprint(analysis) if analysis else None
+    }
+    provenance = provenance_service.sign_record(attestation_data)
+
+    # Follow-up calls (re-evaluate, chat) reference the report by ID
+    report_id = save_report(metadata, metadata_hash, computed["standard_scores"], analysis, filename,
+                            advisory={"status": "pending", "provenance": None} if defer else None)
+
+    response = {
+        "report_id": report_id,
+        "filename": filename,
+        "metadata": metadata, # Frontend might need this for visualization
+        "scores": scores,
+        "standard_scores": computed["standard_scores"],
+        "analysis": analysis,
+        "provenance": provenance
+    }
+    if defer:
+        defer_advisory(report_id, scores, metadata, provenance, use_cache)
+        response["analysis_status"] = "pending"
+        response["analysis_stream"] = f"/api/reports/{report_id}/analysis"
+    return response
@@ -0,0 +1,233 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.json as pajson
+import pyarrow.parquet as pq
+from fastapi import HTTPException
+import numpy as np
+from services.column_stats import (PATTERNS, QUANTILES, DEDUPE_MAX_DISTINCT_RATIO, HLL_PRECISION, date_stats, hash_values, percentage,
+                                   quantile_stats, sketch_stats, top_values, use_exact_distinct)
+from services.sketches import HyperLogLog
+from services.date_profiling import DATE_SAMPLE_ROWS, ISO_DATE_FORMAT, is_date_column, looks_like_dates, plausible_range, schema_key
+from services.row_keys import profile_arrow_rows
+from services.reference_index import profile_arrow_references
+
+ARROW_EXTENSIONS = ('.csv', '.parquet', '.ndjson', '.jsonl')
+
+# RE2 searches anywhere in the value; anchor at the start to keep re.match semantics
+_ARROW_PATTERNS = {name: regex if regex.startswith("^") else f"^{regex}" for name, regex in PATTERNS.items()}
+
+
+def supports_arrow(filename: str) -> bool:
+    return filename.lower().endswith(ARROW_EXTENSIONS)
+
+
+def _read_csv(buffer, columns: list = None, encoding: str = "utf8") -> pa.Table:
+    convert_options = pacsv.ConvertOptions(
+        include_columns=columns or [],
+        # Low-cardinality text stays dictionary-encoded; blanks are nulls as in pandas
+        auto_dict_encode=True,
+        strings_can_be_null=True
+    )
+    read_options = pacsv.ReadOptions(encoding=encoding)
+    return pacsv.read_csv(pa.BufferReader(pa.py_buffer(buffer)), read_options=read_options, convert_options=convert_options)
+
+
+def read_arrow_table(buffer, filename: str, columns: list = None) -> pa.Table:
+    """
+    Parses a spooled upload into a typed Arrow table: numerics, booleans,
+    dates and timestamps keep native types and low-cardinality strings are
+    dictionary-encoded. `columns` projects the read; Parquet skips the other
+    column chunks entirely and CSV skips converting them.
+    """
+    filename = filename.lower()
+    try:
+        if filename.endswith('.csv'):
+            table = _read_csv(buffer, columns)
+            # Arrow reads non-UTF8 text as binary; retry as latin1 like load_data
+            if any(pa.types.is_binary(field.type) for field in table.schema):
+                table = _read_csv(buffer, columns, encoding="latin1")
+        elif filename.endswith('.parquet'):
+            table = pq.read_table(pa.BufferReader(pa.py_buffer(buffer)), columns=columns)
+        elif filename.endswith(('.ndjson', '.jsonl')):
+            table = pajson.read_json(pa.BufferReader(pa.py_buffer(buffer)))
+            if columns:
+                table = table.select(columns)
+        else:
+            raise HTTPException(status_code=400, detail="Arrow ingestion supports CSV, NDJSON and Parquet files only.")
+        return table
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+
+
+def _is_numeric(data_type) -> bool:
+    # Booleans count as numeric, as they do for pandas; so do all-null columns,
+    # which pandas reads as float64
+    return pa.types.is_null(data_type) or pa.types.is_integer(data_type) or pa.types.is_floating(data_type) or pa.types.is_boolean(data_type) or pa.types.is_decimal(data_type)
+
+
+def _is_text(data_type) -> bool:
+    if pa.types.is_dictionary(data_type):
+        data_type = data_type.value_type
+    return pa.types.is_string(data_type) or pa.types.is_large_string(data_type)
+
+
+def _numeric_stats(column: pa.ChunkedArray) -> dict:
+    if pa.types.is_boolean(column.type):
+        column = pc.cast(column, pa.int8())
+    bounds = pc.min_max(column)
+    total = pc.sum(column).as_py()
+    # Same exact quantile definition as the pandas path
+    values = pc.drop_null(column).to_numpy().astype(np.float64)
+    return {
+        "min": float(bounds["min"].as_py()),
+        "max": float(bounds["max"].as_py()),
+        "mean": float(pc.mean(column).as_py()),
+        "negative_count": int(pc.sum(pc.less(column, 0)).as_py() or 0),
+        "zero_count": int(pc.sum(pc.equal(column, 0)).as_py() or 0),
+        "sum": float(total),
+        "variance": float(pc.variance(column, ddof=1, min_count=2).as_py() or 0.0),
+        "quantiles": quantile_stats(np.quantile(values, QUANTILES, method="inverted_cdf").tolist())
+    }
+
+
+def _pattern_counts(column: pa.ChunkedArray, value_counts, total_valid: int) -> dict:
+    """Regex kernels over the distinct values (weighted by their counts), or the raw column when mostly distinct."""
+    if len(value_counts) <= DEDUPE_MAX_DISTINCT_RATIO * total_valid:
+        values = _decoded(value_counts.field("values"))
+        weights = value_counts.field("counts")
+        return {
+            name: int(pc.sum(pc.if_else(pc.match_substring_regex(values, regex), weights, 0)).as_py() or 0)
+            for name, regex in _ARROW_PATTERNS.items()
+        }
+
+    column = _decoded(column)
+    return {
+        name: int(pc.sum(pc.match_substring_regex(column, regex)).as_py() or 0)
+        for name, regex in _ARROW_PATTERNS.items()
+    }
+
+
+def _distinct_stats(column: pa.ChunkedArray, total_rows: int, distinct_values: pd.Series = None) -> dict:
+    """
+    unique_count fields as column_stats.distinct_stats() gives them: exact up
+    to DISTINCT_EXACT_LIMIT rows (per DISTINCT_MODE), otherwise a HyperLogLog
+    estimate over the same value hashes. Text columns pass their distinct
+    values, which they have from value_counts() anyway.
+    """
+    if distinct_values is None:
+        if use_exact_distinct(total_rows):
+            return {"unique_count": int(pc.count_distinct(column, mode="only_valid").as_py())}
+        distinct_values = pd.Series(pc.drop_null(column).to_numpy())
+    if use_exact_distinct(total_rows):
+        return {"unique_count": len(distinct_values)}
+    sketch = HyperLogLog(HLL_PRECISION)
+    sketch.add_hashes(hash_values(distinct_values))
+    return sketch_stats(sketch, total_rows - column.null_count)
+
+
+def profile_arrow_column(column: pa.ChunkedArray, total_rows: int, date_cache_key: str = None) -> dict:
+    """Arrow-kernel counterpart of ingestion.profile_column()."""
+    data_type = column.type
+    null_count = column.null_count
+    total_valid = total_rows - null_count
+
+    stats = {
+        "dtype": str(data_type),
+        "null_count": int(null_count),
+        "null_percentage": percentage(null_count, total_rows),
+        "unique_count": 0,
+        "is_numeric": _is_numeric(data_type)
+    }
+    if pa.types.is_null(data_type) or not total_valid:
+        # Nothing to count, but flagged like the pandas path in approximate mode
+        stats.update(_distinct_stats(column, total_rows, pd.Series([], dtype=object)))
+        return stats
+
+    if _is_text(data_type):
+        value_counts = pc.value_counts(column)
+        value_counts = value_counts.filter(value_counts.field("values").is_valid())
+        counts = _pattern_counts(column, value_counts, total_valid)
+        top = value_counts.field("counts").to_numpy()
+        top_candidates = _decoded(value_counts.field("values")).to_pandas()
+        stats.update(_distinct_stats(column, total_rows, top_candidates))
+    else:
+        stats.update(_distinct_stats(column, total_rows))
+        if stats["is_numeric"]:
+            stats.update(_numeric_stats(column))
+            return stats
+        # Native dates are ISO dates by construction; other types match no pattern
+        counts = dict.fromkeys(PATTERNS, 0)
+        if pa.types.is_date(data_type):
+            counts["iso_date"] = total_valid
+
+    for pat_name, match_count in counts.items():
+        stats[f"{pat_name}_match_count"] = int(match_count)
+        stats[f"{pat_name}_match_percentage"] = percentage(match_count, total_rows)
+
+    if _is_text(data_type):
+        stats["top_values"] = top_values(top_candidates, top, total_rows)
+
+    if pa.types.is_date(data_type):
+        _date_stats(stats, pc.cast(column, pa.timestamp("s")), ISO_DATE_FORMAT)
+    elif pa.types.is_timestamp(data_type):
+        _date_stats(stats, column, "%Y-%m-%d %H:%M:%S")
+    elif _is_text(data_type):
+        valid = pc.drop_null(column) if column.null_count else column
+        head = _decoded(valid.slice(0, DATE_SAMPLE_ROWS)).to_pandas()
+        if is_date_column(stats.get("iso_date_match_percentage", 0), looks_like_dates(head)):
+            # Parsed over the distinct values, weighted by their counts
+            value_counts = pd.Series(top, index=top_candidates.to_numpy())
+            stats.update(date_stats(None, value_counts, date_cache_key))
+
+    return stats
+
+
+def _date_stats(stats: dict, dates: pa.ChunkedArray, date_format: str):
+    """Date fields of a native date/timestamp column; out-of-range dates are impossible."""
+    dates = pc.drop_null(dates)
+    date_value_count = len(dates)
+    low, high = plausible_range()
+    dates = dates.filter(pc.and_(pc.greater_equal(dates, pa.scalar(low, dates.type)), pc.less_equal(dates, pa.scalar(high, dates.type))))
+    stats.update({
+        "date_format": date_format,
+        "date_value_count": date_value_count,
+        "non_iso_date_count": 0,
+        "impossible_date_count": date_value_count - len(dates)
+    })
+    if not len(dates):
+        return
+    bounds = pc.min_max(dates)
+    stats["min_date"] = bounds["min"].as_py().isoformat()
+    stats["max_date"] = bounds["max"].as_py().isoformat()
+    values = dates.to_numpy().astype("datetime64[ns]").astype(np.int64)
+    points = np.quantile(values, QUANTILES, method="inverted_cdf")
+    stats["date_quantiles"] = quantile_stats([pd.Timestamp(int(p)).isoformat() for p in points])
+
+
+def _decoded(column):
+    return pc.cast(column, column.type.value_type) if pa.types.is_dictionary(column.type) else column
+
+
+def profile_table(table: pa.Table) -> dict:
+    """
+    Extracts the profile_dataset() metadata shape from an Arrow table using
+    Arrow compute kernels, without converting columns to pandas objects.
+    """
+    schema = schema_key(table.column_names)
+    profile = {
+        "total_rows": table.num_rows,
+        "total_columns": table.num_columns,
+        "columns": {
+            name: profile_arrow_column(table.column(pos), table.num_rows, f"{schema}:{pos}")
+            for pos, name in enumerate(table.column_names)
+        },
+        "row_uniqueness": profile_arrow_rows(table)
+    }
+    referential_integrity = profile_arrow_references(table)
+    if referential_integrity:
+        profile["referential_integrity"] = referential_integrity
+    return profile
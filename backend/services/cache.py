@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import threading
+import tempfile
+from collections import OrderedDict
+import xxhash
+
+# Disk eviction trims the directory to this share of disk_max_bytes, so the
+# next few writes do not each trigger another scan
+DISK_EVICT_TARGET = 0.9
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache for JSON-serialisable values, with an
+    optional disk tier.
+
+    Values are stored serialised, so every get() returns a fresh copy and the
+    memory tier is limited by both entry count and total bytes. Entries evicted
+    from memory stay on disk (when `disk_dir` is set) until the directory
+    outgrows `disk_max_bytes` (tracked in memory, rescanned only when
+    exceeded); disk hits are promoted back into memory.
+    Entries older than `ttl` seconds are treated as missing. Hits and misses
+    are counted for stats().
+    """
+
+    def __init__(self, name: str, max_entries: int = 128, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = None, disk_dir: str = None, disk_max_bytes: int = 512 * 1024 * 1024):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl or None
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()  # key -> (stored_at, payload)
+        self._bytes = 0
+        # Bytes on disk as this process knows them; None until the first scan
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{xxhash.xxh3_128_hexdigest(key)}.json")
+
+    def get(self, key: str):
+        """Returns the cached value, or None on a miss."""
+        value = self._lookup(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
+
+    def _lookup(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, payload = entry
+                if not self._expired(stored_at):
+                    self._entries.move_to_end(key)
+                    return json.loads(payload)
+                self._discard(key)
+
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if self._expired(stored_at):
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._count_disk(-size)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                payload = f.read()
+            # Bump the access time so disk eviction is least-recently-used too
+            os.utime(path, (time.time(), stored_at))
+        except OSError:
+            return None
+
+        with self._lock:
+            self._store(key, stored_at, payload)
+        return json.loads(payload)
+
+    def set(self, key: str, value):
+        payload = json.dumps(value, default=str)
+        stored_at = time.time()
+        with self._lock:
+            self._store(key, stored_at, payload)
+        if self.disk_dir:
+            self._write_disk(key, payload)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._disk_bytes = None
+        if self.disk_dir:
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith(".json"):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+    def _store(self, key: str, stored_at: float, payload: str):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (stored_at, payload)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def _count_disk(self, delta: int) -> bool:
+        """Adds to the tracked disk size; True if the directory needs a scan."""
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += delta
+            return self._disk_bytes is None or self._disk_bytes > self.disk_max_bytes
+
+    def _write_disk(self, key: str, payload: str):
+        try:
+            path = self._disk_path(key)
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+                size = f.tell()
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            if self._count_disk(size - replaced):
+                self._evict_disk()
+        except OSError as e:
+            print(f"⚠️ [Cache:{self.name}] Disk write failed: {e}")
+
+    def _evict_disk(self):
+        # Also picks up what other processes sharing the directory wrote
+        files = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            stat = entry.stat()
+            files.append((stat.st_atime, stat.st_size, entry.path))
+            total += stat.st_size
+        # Oldest access first
+        if total > self.disk_max_bytes:
+            for _, size, path in sorted(files):
+                if total <= self.disk_max_bytes * DISK_EVICT_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+        with self._lock:
+            self._disk_bytes = total
@@ -0,0 +1,788 @@
+import os
+import tempfile
+import re
+import hmac
+import base64
+import hashlib
+import warnings
+import numpy as np
+import pandas as pd
+from services.sketches import HyperLogLog, KLLSketch, HeavyHitters
+from services.date_profiling import DATE_SAMPLE_ROWS, ISO_DATE_FORMAT, ISO_DATE_REGEX, is_date_column, looks_like_dates, profile_dates, weighted_quantiles
+
+# Common Patterns (simplified)
+PATTERNS = {
+    "email": r"[^@]+@[^@]+\.[^@]+",
+    "phone": r"^\+?1?\d{9,15}$",
+    "iso_date": ISO_DATE_REGEX,
+    "currency_code": r"^[A-Z]{3}$",
+    "country_code": r"^[A-Z]{2,3}$"
+}
+
+# Above this distinct/total ratio de-duplicating values costs more than it saves
+DEDUPE_MAX_DISTINCT_RATIO = 0.5
+
+# Distinct counting: "exact" (hash table), "approx" (HyperLogLog) or "auto",
+# which counts exactly up to DISTINCT_EXACT_LIMIT values and sketches beyond.
+DISTINCT_MODE = os.environ.get("DISTINCT_MODE", "auto").lower()
+DISTINCT_EXACT_LIMIT = int(os.environ.get("DISTINCT_EXACT_LIMIT", 100_000))
+HLL_PRECISION = int(os.environ.get("HLL_PRECISION", 14))
+
+# Distribution stats: quantiles of numeric and date columns (exact in memory,
+# KLL sketches when streamed) and the TOP_K most frequent string values,
+# reported by hash only (Misra-Gries summaries when streamed).
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+KLL_K = int(os.environ.get("KLL_K", 200))
+TOP_K = int(os.environ.get("TOP_K", 10))
+HEAVY_HITTER_CAPACITY = int(os.environ.get("HEAVY_HITTER_CAPACITY", 64))
+
+# Value hashes that leave the server (top_values, schema fingerprints) are
+# HMAC-SHA256 of the internal hash under a server-side key, so short codes
+# cannot be recovered by hashing candidate values. VALUE_HASH_KEY (hex)
+# overrides the key generated in VALUE_HASH_KEY_PATH, which defaults to a
+# file in SCHEMA_REGISTRY_DIR: accepted schemas hold status code hashes, so
+# the key has to persist (and be deployed) together with the registry.
+VALUE_HASH_KEY_PATH = os.environ.get("VALUE_HASH_KEY_PATH")
+_value_hash_key = None
+
+
+def _compile_patterns(patterns: dict):
+    compiled = [(name, re.compile(regex).match) for name, regex in patterns.items()]
+    # One alternation that matches iff at least one pattern does; most values
+    # of a typical text column match nothing and are rejected in a single call.
+    any_match = re.compile("|".join(f"(?:{regex})" for regex in patterns.values())).match
+    return compiled, any_match
+
+
+_COMPILED_PATTERNS, _ANY_PATTERN = _compile_patterns(PATTERNS)
+
+
+def as_strings(clean_series: pd.Series) -> pd.Series:
+    """Returns the series as str values, skipping the astype copy when it already holds only strings."""
+    if clean_series.dtype == object and pd.api.types.infer_dtype(clean_series, skipna=False) == "string":
+        return clean_series
+    return clean_series.astype(str)
+
+
+def count_pattern_matches(clean_series: pd.Series, distinct_count: int = None, value_counts: pd.Series = None) -> dict:
+    """
+    Counts how many values of a null-free string series match each of the
+    common PATTERNS, returning {pattern_name: count}.
+
+    Every value is visited once and tested against the whole pattern set, with
+    repeated values collapsed first unless the column is mostly distinct
+    (pass `distinct_count` when it is already known, and `value_counts` if
+    already computed). Adding a pattern to PATTERNS does not add another pass
+    over the column.
+    """
+    totals = dict.fromkeys(PATTERNS, 0)
+    if clean_series.empty:
+        return totals
+
+    if distinct_count is None or distinct_count <= DEDUPE_MAX_DISTINCT_RATIO * len(clean_series):
+        if value_counts is None:
+            value_counts = clean_series.value_counts(sort=False)
+        pairs = zip(value_counts.index, value_counts.to_numpy().tolist())
+    else:
+        pairs = ((value, 1) for value in clean_series.to_numpy())
+
+    for value, weight in pairs:
+        if not _ANY_PATTERN(value):
+            continue
+        for name, match in _COMPILED_PATTERNS:
+            if match(value):
+                totals[name] += weight
+    return totals
+
+
+def numeric_values(frame) -> np.ndarray:
+    """
+    Numeric column(s) as a float64 array with NaN for missing values (2-D,
+    rows x columns, for a DataFrame). Columns that are already float64 come
+    back as a view of the DataFrame block.
+    """
+    return frame.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def quantile_stats(values: list) -> dict:
+    return {f"p{round(q * 100)}": value for q, value in zip(QUANTILES, values)}
+
+
+def numeric_block_stats(values: np.ndarray) -> list:
+    """
+    Numeric stats for every column of a 2-D float64 array (rows x columns,
+    NaN = missing). Each stat is one NumPy reduction over the whole block,
+    so profiling N numeric columns costs a handful of passes, not N of each.
+    Quantiles are exact ("inverted_cdf", i.e. always an observed value).
+    Returns one dict per column; all-missing columns get {}.
+    """
+    rows = values.shape[0]
+    valid = rows - np.isnan(values).sum(axis=0)
+    with warnings.catch_warnings():
+        # All-NaN columns warn in nanmin/nanmax/nanvar; they are dropped below
+        warnings.simplefilter("ignore", RuntimeWarning)
+        sums = np.nansum(values, axis=0)
+        mins = np.nanmin(values, axis=0)
+        maxs = np.nanmax(values, axis=0)
+        variances = np.nanvar(values, axis=0)
+        quantiles = np.nanquantile(values, QUANTILES, axis=0, method="inverted_cdf") if values.size else None
+    negatives = (values < 0).sum(axis=0)
+    zeros = (values == 0).sum(axis=0)
+
+    stats = []
+    for i in range(values.shape[1]):
+        count = int(valid[i])
+        if not count:
+            stats.append({})
+            continue
+        stats.append({
+            "min": float(mins[i]),
+            "max": float(maxs[i]),
+            "mean": float(sums[i] / count),
+            "negative_count": int(negatives[i]),
+            "zero_count": int(zeros[i]),
+            "sum": float(sums[i]),
+            # Sample variance (ddof=1), as pandas reports it
+            "variance": float(variances[i] * count / (count - 1)) if count > 1 else 0.0,
+            "quantiles": quantile_stats(quantiles[:, i].tolist())
+        })
+    return stats
+
+
+def date_stats(clean_series: pd.Series, value_counts: pd.Series = None, cache_key: str = None) -> dict:
+    """
+    Date fields of a string column that looks like dates: bounds and exact
+    quantiles of the valid dates, the inferred format, and date-value,
+    non-ISO and impossible-date counts (see date_profiling.profile_dates).
+    """
+    result = profile_dates(clean_series, value_counts, cache_key=cache_key)
+    stats = {}
+    if len(result["dates"]):
+        values = result["dates"].astype("datetime64[ns]").astype(np.int64)
+        points = weighted_quantiles(values, result["weights"], QUANTILES)
+        stats["min_date"] = pd.Timestamp(int(values.min())).isoformat()
+        stats["max_date"] = pd.Timestamp(int(values.max())).isoformat()
+        stats["date_quantiles"] = quantile_stats([pd.Timestamp(int(p)).isoformat() for p in points])
+    for key in ("date_format", "date_value_count", "non_iso_date_count", "impossible_date_count"):
+        stats[key] = result[key]
+    return stats
+
+
+def value_hash_key() -> bytes:
+    """
+    The server's value hashing key, created on first use (shared by every
+    worker process). Raises if it is missing while the schema registry has
+    accepted schemas: a new key would make every stored status code unknown.
+    """
+    global _value_hash_key
+    if _value_hash_key is None:
+        if os.environ.get("VALUE_HASH_KEY"):
+            _value_hash_key = bytes.fromhex(os.environ["VALUE_HASH_KEY"])
+        else:
+            from services.schema_registry import SCHEMA_REGISTRY_DIR, list_schemas
+            path = VALUE_HASH_KEY_PATH or os.path.join(SCHEMA_REGISTRY_DIR, ".value_hash.key")
+            if not os.path.exists(path):
+                if list_schemas():
+                    raise RuntimeError(
+                        f"Value hash key {path} is missing but {SCHEMA_REGISTRY_DIR} has accepted schemas; "
+                        "restore the key (or set VALUE_HASH_KEY / VALUE_HASH_KEY_PATH) or clear the registry."
+                    )
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                fd, staging = tempfile.mkstemp(prefix=".value_hash-", dir=os.path.dirname(path) or ".")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(os.urandom(32))
+                try:
+                    # Atomic create-if-absent: concurrent workers all end up with one key
+                    os.link(staging, path)
+                except FileExistsError:
+                    pass
+                finally:
+                    os.remove(staging)
+            with open(path, "rb") as f:
+                _value_hash_key = f.read()
+    return _value_hash_key
+
+
+def report_hash(value_hash: int) -> str:
+    """Keyed, reportable form of an internal value hash (see hash_values)."""
+    digest = hmac.new(value_hash_key(), int(value_hash).to_bytes(8, "little"), hashlib.sha256).hexdigest()
+    return digest[:16]
+
+
+def format_top_values(hashes: np.ndarray, counts: np.ndarray, total_rows: int) -> list:
+    """TOP_K entries by count as {hash, count, percentage}; raw values never leave, hashes are keyed."""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    counts = np.asarray(counts, dtype=np.int64)
+    order = np.lexsort((hashes, -counts))[:TOP_K]
+    return [
+        {"hash": report_hash(hashes[i]), "count": int(counts[i]), "percentage": percentage(counts[i], total_rows)}
+        for i in order
+    ]
+
+
+def top_values(values: pd.Series, counts: np.ndarray, total_rows: int) -> list:
+    """
+    Most frequent values from exact (value, count) pairs, e.g. value_counts().
+    Only the candidates at or above the TOP_K-th count are hashed.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    values = pd.Series(values)
+    if len(counts) > TOP_K:
+        threshold = np.partition(counts, len(counts) - TOP_K)[len(counts) - TOP_K]
+        keep = counts >= threshold
+        values, counts = values[keep], counts[keep]
+    return format_top_values(hash_values(values), counts, total_rows)
+
+
+def hash_values(clean_series: pd.Series) -> np.ndarray:
+    """
+    Stable 64-bit hashes of non-null values, used for distinct counting and
+    top values. Unkeyed: internal only, reported through report_hash().
+    Numerics are normalised to float64 so int and float chunks of the same
+    column hash identically.
+    """
+    values = clean_series.to_numpy()
+    if pd.api.types.is_numeric_dtype(clean_series) and not pd.api.types.is_bool_dtype(clean_series):
+        values = values.astype("float64")
+    return pd.util.hash_array(values)
+
+
+def use_exact_distinct(row_count: int) -> bool:
+    if DISTINCT_MODE == "exact":
+        return True
+    if DISTINCT_MODE == "approx":
+        return False
+    return row_count <= DISTINCT_EXACT_LIMIT
+
+
+def sketch_stats(sketch: HyperLogLog, non_null_count: int) -> dict:
+    """unique_count fields for a sketched column, flagged so rules can apply a tolerance."""
+    return {
+        "unique_count": min(sketch.count(), non_null_count),
+        "unique_count_approx": True,
+        "unique_count_error": round(sketch.relative_error, 6)
+    }
+
+
+def distinct_stats(col_series: pd.Series) -> dict:
+    """
+    unique_count for a column: exact nunique() for small columns, otherwise a
+    HyperLogLog estimate with its relative standard error.
+    """
+    if use_exact_distinct(len(col_series)):
+        return {"unique_count": int(col_series.nunique())}
+
+    clean_series = col_series.dropna()
+    sketch = HyperLogLog(HLL_PRECISION)
+    sketch.add_hashes(hash_values(clean_series))
+    return sketch_stats(sketch, len(clean_series))
+
+
+class ColumnAccumulator:
+    """
+    Mergeable running statistics for a single column.
+
+    The accumulator is fed one chunk (Series) at a time and only keeps
+    counters, bounds and distinct-value hashes (switching to a HyperLogLog
+    sketch past DISTINCT_EXACT_LIMIT), so its footprint does not grow with the
+    number of rows read. Two accumulators built over disjoint row sets
+    can be merged, and finalize() renders the same stats dict that
+    profile_dataset() emits for a fully loaded column.
+    """
+
+    def __init__(self, date_cache_key: str = None):
+        self.rows = 0
+        self.null_count = 0
+        self.first_dtype = None
+        self.dtypes = set()
+
+        # Distinct values: exact hashes compacted lazily, or a sketch
+        self._hashes = []
+        self._pending = 0
+        self._compacted = 0
+        self._sketch = HyperLogLog(HLL_PRECISION) if DISTINCT_MODE == "approx" else None
+        # Distinct values of numeric chunks while counting exactly, so that a
+        # column that turns out text counts them by their strings instead
+        self._floats = []
+        self._ints = []
+
+        # Numeric stats
+        self.num_count = 0
+        self.num_sum = 0.0
+        self.num_m2 = 0.0  # sum of squared deviations from the mean
+        self.num_min = None
+        self.num_max = None
+        self.negative_count = 0
+        self.zero_count = 0
+        self.quantile_sketch = KLLSketch(KLL_K)
+
+        # String stats
+        self.str_count = 0
+        self.pattern_counts = {name: 0 for name in PATTERNS}
+        self.min_date = None
+        self.max_date = None
+        self.date_sketch = KLLSketch(KLL_K)  # epoch seconds
+        self.date_format = None  # inferred format of the non-ISO dates
+        self.date_cache_key = date_cache_key
+        self.date_value_count = 0
+        self.non_iso_date_count = 0
+        self.impossible_date_count = 0
+        # First DATE_SAMPLE_ROWS values, until looks_like_dates() has judged them
+        self._date_head = []
+        self._date_head_rows = 0
+        self.head_looks_dated = None
+        self.top_sketch = HeavyHitters(HEAVY_HITTER_CAPACITY)
+        # Float chunks' values, counted by their float64 bits until the column's
+        # overall type is known (see _update_floats)
+        self.float_count = 0
+        self.float_top = HeavyHitters(HEAVY_HITTER_CAPACITY)
+
+    def update(self, col_series: pd.Series):
+        """Folds one chunk of the column into the running stats."""
+        self.rows += len(col_series)
+        if self.first_dtype is None:
+            self.first_dtype = str(col_series.dtype)
+
+        clean_series = col_series.dropna()
+        self.null_count += len(col_series) - len(clean_series)
+        if clean_series.empty:
+            # All-null chunks carry no type information
+            return
+
+        self.dtypes.add(str(col_series.dtype))
+        self._add_hashes(hash_values(clean_series))
+
+        if pd.api.types.is_numeric_dtype(col_series):
+            values = clean_series.to_numpy(dtype="float64")
+            chunk_sum = float(values.sum())
+            self._merge_moments(len(values), chunk_sum, float(((values - chunk_sum / len(values)) ** 2).sum()))
+            self.num_min = _min(self.num_min, float(values.min()))
+            self.num_max = _max(self.num_max, float(values.max()))
+            self.negative_count += int((values < 0).sum())
+            self.zero_count += int((values == 0).sum())
+            self.quantile_sketch.add(values)
+            if pd.api.types.is_float_dtype(col_series):
+                self._update_floats(values)
+            if not pd.api.types.is_integer_dtype(col_series):
+                return
+            if self._sketch is None and pd.api.types.is_signed_integer_dtype(col_series):
+                self._ints.append(np.unique(clean_series.to_numpy(dtype="int64")))
+            # Integer chunks of a column that is text elsewhere in the file
+            # (e.g. phone numbers) must still count towards the pattern stats.
+
+        self._update_strings(as_strings(clean_series))
+
+    def _merge_moments(self, count: int, total: float, m2: float):
+        """Chan et al. pairwise update of count, sum and squared deviations."""
+        if count and self.num_count:
+            delta = total / count - self.num_sum / self.num_count
+            self.num_m2 += m2 + delta * delta * self.num_count * count / (self.num_count + count)
+        else:
+            self.num_m2 += m2
+        self.num_count += count
+        self.num_sum += total
+
+    def _update_strings(self, clean_series: pd.Series):
+        self.str_count += len(clean_series)
+        if self.head_looks_dated is None:
+            self._date_head.append(clean_series.iloc[:DATE_SAMPLE_ROWS - self._date_head_rows])
+            self._date_head_rows += len(self._date_head[-1])
+            if self._date_head_rows >= DATE_SAMPLE_ROWS:
+                self._judge_date_head()
+        counts = count_pattern_matches(clean_series)
+        for name, count in counts.items():
+            self.pattern_counts[name] += count
+        self.top_sketch.add_hashes(hash_values(clean_series))
+
+        if counts.get("iso_date") or self.date_value_count or looks_like_dates(clean_series):
+            # The non-ISO format is inferred once, from the first chunk that has such dates
+            result = profile_dates(clean_series, date_format=self.date_format, cache_key=self.date_cache_key)
+            self.date_format = self.date_format or result["non_iso_format"]
+            self.date_value_count += result["date_value_count"]
+            self.non_iso_date_count += result["non_iso_date_count"]
+            self.impossible_date_count += result["impossible_date_count"]
+            if len(result["dates"]):
+                dates = result["dates"]
+                self.min_date = _min(self.min_date, pd.Timestamp(dates.min()))
+                self.max_date = _max(self.max_date, pd.Timestamp(dates.max()))
+                seconds = dates.astype("datetime64[s]").astype(np.int64)
+                self.date_sketch.add(np.repeat(seconds, result["weights"]))
+
+    def _update_floats(self, values: np.ndarray):
+        """
+        String stats of a float chunk, in case other chunks make the column
+        text (pandas then reads these values as strings too). Converting
+        every float to a string is costly, so only what the string stats need
+        is kept: the count, the date head and a frequent-items summary keyed
+        by the float64 bits, converted by string_top_sketch(). No float
+        renders as a PATTERNS match ("1.5", "1e+20", "inf"), so pattern
+        counts are unaffected.
+        """
+        self.float_count += len(values)
+        if self._sketch is None:
+            self._floats.append(np.unique(values))
+        self.float_top.add_hashes(np.ascontiguousarray(values).view(np.uint64))
+        if self.head_looks_dated is None:
+            self._date_head.append(as_strings(pd.Series(values[:DATE_SAMPLE_ROWS - self._date_head_rows])))
+            self._date_head_rows += len(self._date_head[-1])
+            if self._date_head_rows >= DATE_SAMPLE_ROWS:
+                self._judge_date_head()
+
+    def string_top_sketch(self) -> HeavyHitters:
+        """top_sketch with the float chunks' values counted as their strings."""
+        if not self.float_count:
+            return self.top_sketch
+        floats = HeavyHitters(self.float_top.capacity)
+        floats.n, floats.error = self.float_top.n, self.float_top.error
+        floats.hashes = hash_values(as_strings(pd.Series(self.float_top.hashes.view(np.float64))))
+        floats.counts = self.float_top.counts
+        sketch = HeavyHitters(self.top_sketch.capacity)
+        return sketch.merge(self.top_sketch).merge(floats)
+
+    def _judge_date_head(self):
+        # A column with fewer values than DATE_SAMPLE_ROWS is judged on what it has
+        if self.head_looks_dated is None:
+            self.head_looks_dated = bool(self._date_head) and looks_like_dates(pd.concat(self._date_head))
+            self._date_head = []
+
+    def _add_hashes(self, hashes: np.ndarray):
+        if self._sketch is not None:
+            self._sketch.add_hashes(hashes)
+            return
+        self._hashes.append(np.unique(hashes))
+        self._pending += len(hashes)
+        # Amortised compaction: only re-sort once the backlog outgrows the
+        # already de-duplicated set.
+        if self._pending > max(self._compacted, 65536):
+            self._compact()
+
+    def _compact(self):
+        if self._sketch is not None:
+            return
+        if len(self._hashes) > 1:
+            self._hashes = [np.unique(np.concatenate(self._hashes))]
+        if len(self._floats) > 1:
+            self._floats = [np.unique(np.concatenate(self._floats))]
+        if len(self._ints) > 1:
+            self._ints = [np.unique(np.concatenate(self._ints))]
+        self._compacted = len(self._hashes[0]) if self._hashes else 0
+        self._pending = 0
+        if DISTINCT_MODE != "exact" and self._compacted > DISTINCT_EXACT_LIMIT:
+            self._to_sketch()
+
+    def _to_sketch(self):
+        self._sketch = HyperLogLog(HLL_PRECISION)
+        for hashes in self._hashes:
+            self._sketch.add_hashes(hashes)
+        self._hashes = []
+        self._floats = []
+        self._ints = []
+        self._pending = 0
+        self._compacted = 0
+
+    def distinct_stats(self, non_null_count: int, as_text: bool = False) -> dict:
+        """
+        unique_count fields. With `as_text`, values of numeric chunks count by
+        their strings, as when pandas reads the whole column as text.
+        """
+        self._compact()
+        if self._sketch is not None:
+            return sketch_stats(self._sketch, non_null_count)
+        if not as_text or not (self._floats or self._ints):
+            return {"unique_count": self._compacted}
+        numbers = [pd.Series(values) for values in self._floats + self._ints]
+        number_hashes = np.concatenate([hash_values(values) for values in numbers])
+        text_hashes = np.concatenate([hash_values(as_strings(values)) for values in numbers])
+        hashes = np.setdiff1d(self._hashes[0], number_hashes, assume_unique=True)
+        return {"unique_count": len(np.union1d(hashes, text_hashes))}
+
+    def merge(self, other: "ColumnAccumulator") -> "ColumnAccumulator":
+        """Combines the stats of another accumulator built over different rows."""
+        self.rows += other.rows
+        self.null_count += other.null_count
+        if self.first_dtype is None:
+            self.first_dtype = other.first_dtype
+        self.dtypes |= other.dtypes
+
+        if self._sketch is not None or other._sketch is not None:
+            if self._sketch is None:
+                self._to_sketch()
+            for hashes in other._hashes:
+                self._sketch.add_hashes(hashes)
+            if other._sketch is not None:
+                self._sketch.merge(other._sketch)
+        else:
+            self._hashes.extend(other._hashes)
+            self._floats.extend(other._floats)
+            self._ints.extend(other._ints)
+            self._pending += other._pending + other._compacted
+            self._compact()
+
+        self._merge_moments(other.num_count, other.num_sum, other.num_m2)
+        self.num_min = _min(self.num_min, other.num_min)
+        self.num_max = _max(self.num_max, other.num_max)
+        self.negative_count += other.negative_count
+        self.zero_count += other.zero_count
+        self.quantile_sketch.merge(other.quantile_sketch)
+
+        self.str_count += other.str_count
+        for name, count in other.pattern_counts.items():
+            self.pattern_counts[name] = self.pattern_counts.get(name, 0) + count
+        self.min_date = _min(self.min_date, other.min_date)
+        self.max_date = _max(self.max_date, other.max_date)
+        self.date_sketch.merge(other.date_sketch)
+        self.date_format = self.date_format or other.date_format
+        self.date_value_count += other.date_value_count
+        self.non_iso_date_count += other.non_iso_date_count
+        self.impossible_date_count += other.impossible_date_count
+        if self.head_looks_dated is None:
+            # `other` holds the rows after ours: its head continues our head
+            if other.head_looks_dated is not None and not self._date_head:
+                self.head_looks_dated = other.head_looks_dated
+            else:
+                for head in other._date_head:
+                    self._date_head.append(head.iloc[:DATE_SAMPLE_ROWS - self._date_head_rows])
+                    self._date_head_rows += len(self._date_head[-1])
+                self._judge_date_head()
+        self.top_sketch.merge(other.top_sketch)
+        self.float_count += other.float_count
+        self.float_top.merge(other.float_top)
+        return self
+
+    def to_state(self) -> dict:
+        """
+        JSON-serialisable snapshot of the accumulator, from which from_state()
+        rebuilds an equivalent accumulator that can keep merging new rows.
+        """
+        self._compact()
+        # Raw values are never stored; the head is judged on what was seen so far
+        self._judge_date_head()
+        if self._sketch is not None:
+            distinct = {"sketch": _encode_array(self._sketch.registers), "precision": self._sketch.precision}
+        else:
+            distinct = {"hashes": _encode_array(self._hashes[0] if self._hashes else np.empty(0, dtype=np.uint64))}
+            if self._floats:
+                distinct["floats"] = _encode_array(self._floats[0])
+            if self._ints:
+                distinct["ints"] = _encode_array(self._ints[0])
+        return {
+            "rows": self.rows,
+            "null_count": self.null_count,
+            "first_dtype": self.first_dtype,
+            "dtypes": sorted(self.dtypes),
+            "distinct": distinct,
+            "num_count": self.num_count,
+            "num_sum": self.num_sum,
+            "num_m2": self.num_m2,
+            "num_min": self.num_min,
+            "num_max": self.num_max,
+            "negative_count": self.negative_count,
+            "zero_count": self.zero_count,
+            "str_count": self.str_count,
+            "pattern_counts": dict(self.pattern_counts),
+            "min_date": self.min_date.isoformat() if self.min_date is not None else None,
+            "max_date": self.max_date.isoformat() if self.max_date is not None else None,
+            "quantile_sketch": _kll_state(self.quantile_sketch),
+            "date_sketch": _kll_state(self.date_sketch),
+            "date_format": self.date_format,
+            "date_value_count": self.date_value_count,
+            "non_iso_date_count": self.non_iso_date_count,
+            "impossible_date_count": self.impossible_date_count,
+            "head_looks_dated": self.head_looks_dated,
+            "top_sketch": _heavy_hitters_state(self.top_sketch),
+            "float_count": self.float_count,
+            "float_top": _heavy_hitters_state(self.float_top)
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ColumnAccumulator":
+        acc = cls()
+        acc.rows = state["rows"]
+        acc.null_count = state["null_count"]
+        acc.first_dtype = state["first_dtype"]
+        acc.dtypes = set(state["dtypes"])
+
+        distinct = state["distinct"]
+        if "sketch" in distinct:
+            acc._sketch = HyperLogLog(distinct["precision"])
+            acc._sketch.registers = _decode_array(distinct["sketch"], np.uint8).copy()
+            acc._hashes = []
+        else:
+            hashes = _decode_array(distinct["hashes"], np.uint64)
+            if acc._sketch is not None:
+                acc._sketch.add_hashes(hashes)
+            else:
+                acc._hashes = [hashes] if len(hashes) else []
+                acc._compacted = len(hashes)
+                if "floats" in distinct:
+                    acc._floats = [_decode_array(distinct["floats"], np.float64).copy()]
+                if "ints" in distinct:
+                    acc._ints = [_decode_array(distinct["ints"], np.int64).copy()]
+
+        acc.num_count = state["num_count"]
+        acc.num_sum = state["num_sum"]
+        # States stored before variance/zero tracking lack these
+        acc.num_m2 = state.get("num_m2", 0.0)
+        acc.num_min = state["num_min"]
+        acc.num_max = state["num_max"]
+        acc.negative_count = state["negative_count"]
+        acc.zero_count = state.get("zero_count", 0)
+
+        acc.str_count = state["str_count"]
+        acc.pattern_counts.update(state["pattern_counts"])
+        acc.min_date = pd.Timestamp(state["min_date"]) if state["min_date"] else None
+        acc.max_date = pd.Timestamp(state["max_date"]) if state["max_date"] else None
+        if "quantile_sketch" in state:
+            _load_kll(acc.quantile_sketch, state["quantile_sketch"])
+            _load_kll(acc.date_sketch, state["date_sketch"])
+            _load_heavy_hitters(acc.top_sketch, state["top_sketch"])
+        # States stored before float chunks were tracked apart lack these
+        acc.float_count = state.get("float_count", 0)
+        if "float_top" in state:
+            _load_heavy_hitters(acc.float_top, state["float_top"])
+        acc.date_format = state.get("date_format")
+        acc.date_value_count = state.get("date_value_count", 0)
+        acc.non_iso_date_count = state.get("non_iso_date_count", 0)
+        acc.impossible_date_count = state.get("impossible_date_count", 0)
+        # States stored before the shared date criterion: majority of values were dates
+        acc.head_looks_dated = state.get("head_looks_dated", acc.date_value_count * 2 > acc.str_count)
+        return acc
+
+    def resolve_dtype(self, null_count: int = None) -> str:
+        """
+        Reproduces the dtype pandas would have inferred for the whole column
+        from the dtypes seen chunk by chunk.
+        """
+        if not self.dtypes:
+            return self.first_dtype or "float64"
+        if len(self.dtypes) == 1:
+            dtype = next(iter(self.dtypes))
+        else:
+            try:
+                parsed = [np.dtype(d) for d in self.dtypes]
+            except TypeError:
+                return "object"
+            if not all(d.kind in "iuf" for d in parsed):
+                return "object"
+            dtype = str(np.result_type(*parsed))
+
+        if null_count is None:
+            null_count = self.null_count
+        if null_count:
+            if dtype.startswith(("int", "uint")):
+                return "float64"
+            if dtype == "bool":
+                return "object"
+        return dtype
+
+    def finalize(self, total_rows: int) -> dict:
+        """Renders the accumulated state in the profile_dataset() format."""
+        # Rows where the column never appeared (e.g. sparse NDJSON keys) are nulls
+        null_count = self.null_count + (total_rows - self.rows)
+        dtype = self.resolve_dtype(null_count)
+        try:
+            is_numeric = pd.api.types.is_numeric_dtype(np.dtype(dtype))
+        except TypeError:
+            is_numeric = False
+
+        stats = {
+            "dtype": dtype,
+            "null_count": int(null_count),
+            "null_percentage": percentage(null_count, total_rows),
+            **self.distinct_stats(total_rows - null_count, as_text=not is_numeric),
+            "is_numeric": is_numeric
+        }
+
+        if is_numeric:
+            if self.num_count:
+                stats.update({
+                    "min": self.num_min,
+                    "max": self.num_max,
+                    "mean": self.num_sum / self.num_count,
+                    "negative_count": self.negative_count,
+                    "zero_count": self.zero_count,
+                    "sum": self.num_sum,
+                    "variance": self.num_m2 / (self.num_count - 1) if self.num_count > 1 else 0.0,
+                    "quantiles": quantile_stats(self.quantile_sketch.quantiles(QUANTILES))
+                })
+                if not self.quantile_sketch.exact:
+                    stats["quantiles_approx"] = True
+        elif self.str_count or self.float_count:
+            for pat_name, match_count in self.pattern_counts.items():
+                stats[f"{pat_name}_match_count"] = int(match_count)
+                stats[f"{pat_name}_match_percentage"] = percentage(match_count, total_rows)
+
+            self._judge_date_head()
+            if is_date_column(stats.get("iso_date_match_percentage", 0), self.head_looks_dated) and self.date_value_count:
+                if self.min_date is not None:
+                    stats["min_date"] = self.min_date.isoformat()
+                    stats["max_date"] = self.max_date.isoformat()
+                    stats["date_quantiles"] = quantile_stats([
+                        pd.Timestamp(int(seconds), unit="s").isoformat() for seconds in self.date_sketch.quantiles(QUANTILES)
+                    ])
+                    if not self.date_sketch.exact:
+                        stats["date_quantiles_approx"] = True
+                iso_count = self.pattern_counts.get("iso_date", 0)
+                stats["date_format"] = ISO_DATE_FORMAT if iso_count >= self.non_iso_date_count or not self.date_format else self.date_format
+                stats["date_value_count"] = int(self.date_value_count)
+                stats["non_iso_date_count"] = int(self.non_iso_date_count)
+                stats["impossible_date_count"] = int(self.impossible_date_count)
+
+            top_sketch = self.string_top_sketch()
+            stats["top_values"] = format_top_values(top_sketch.hashes, top_sketch.counts, total_rows)
+            if top_sketch.error:
+                stats["top_values_approx"] = True
+                stats["top_values_error"] = top_sketch.error
+
+        return stats
+
+
+def percentage(count: int, total_rows: int) -> float:
+    """Share of total_rows as a 2dp percentage (numpy rounding, as pandas reductions give)."""
+    if not total_rows:
+        return 0.0
+    return float(round(np.float64(count) / total_rows * 100, 2))
+
+
+def _kll_state(sketch: KLLSketch) -> dict:
+    return {"n": sketch.n, "levels": [_encode_array(level) for level in sketch.levels]}
+
+
+def _load_kll(sketch: KLLSketch, state: dict):
+    sketch.n = state["n"]
+    sketch.levels = [_decode_array(level, np.float64).copy() for level in state["levels"]]
+
+
+def _heavy_hitters_state(sketch: HeavyHitters) -> dict:
+    return {"n": sketch.n, "error": sketch.error, "hashes": _encode_array(sketch.hashes), "counts": _encode_array(sketch.counts)}
+
+
+def _load_heavy_hitters(sketch: HeavyHitters, state: dict):
+    sketch.n = state["n"]
+    sketch.error = state["error"]
+    sketch.hashes = _decode_array(state["hashes"], np.uint64).copy()
+    sketch.counts = _decode_array(state["counts"], np.int64).copy()
+
+
+def _encode_array(values: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii")
+
+
+def _decode_array(encoded: str, dtype) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype=dtype)
+
+
+def _min(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def _max(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
@@ -0,0 +1,149 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import xxhash
+from services.cache import LRUCache
+
+ISO_DATE_FORMAT = "%Y-%m-%d"
+ISO_DATE_REGEX = r"^\d{4}-\d{2}-\d{2}$"
+
+# Anything shaped like a calendar date (numeric or month-name), optionally
+# followed by a time of day. Only used to decide what counts as a date value.
+DATE_SHAPE_REGEX = (
+    r"^(\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}|\d{1,2} [A-Za-z]{3,9},? \d{4}|[A-Za-z]{3,9} \d{1,2},? \d{4})"
+    r"([ T]\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?$"
+)
+
+# Candidate formats for the non-ISO values of a date column, in order of
+# preference when several parse equally well (e.g. 01/02/2024).
+DATE_FORMATS = (
+    "%Y/%m/%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y", "%d.%m.%Y", "%Y.%m.%d",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%m/%d/%Y %H:%M:%S",
+    "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%b %d %Y"
+)
+
+# Format inference looks at the first DATE_SAMPLE_ROWS values only. Dates
+# before DATE_MIN_YEAR or more than DATE_MAX_FUTURE_DAYS ahead are impossible.
+DATE_SAMPLE_ROWS = int(os.environ.get("DATE_SAMPLE_ROWS", 256))
+DATE_MIN_YEAR = int(os.environ.get("DATE_MIN_YEAR", 1900))
+DATE_MAX_FUTURE_DAYS = int(os.environ.get("DATE_MAX_FUTURE_DAYS", 366))
+
+# Inferred formats per (source schema, column); re-validated on every use
+_format_cache = LRUCache("date-formats", max_entries=4096, max_bytes=1024 * 1024)
+
+
+def schema_key(columns) -> str:
+    """Identifies a source schema by its column names."""
+    return xxhash.xxh3_64_hexdigest("\x1f".join(map(str, columns)))
+
+
+def looks_like_dates(clean_series: pd.Series) -> bool:
+    """True if most of the first DATE_SAMPLE_ROWS values are shaped like dates."""
+    sample = clean_series.iloc[:DATE_SAMPLE_ROWS]
+    return len(sample) > 0 and sample.str.match(DATE_SHAPE_REGEX).mean() > 0.5
+
+
+def is_date_column(iso_date_percentage: float, head_looks_dated: bool) -> bool:
+    """
+    Whether a text column gets date stats: more than half ISO dates, or
+    looks_like_dates() over its first DATE_SAMPLE_ROWS non-null values.
+    Shared by every profiling path so they agree on the same file.
+    """
+    return iso_date_percentage > 50 or head_looks_dated
+
+
+def _parse_count(sample: pd.Series, date_format: str) -> int:
+    return int(pd.to_datetime(sample, format=date_format, errors="coerce").notna().sum())
+
+
+def infer_date_format(values: pd.Series, cache_key: str = None):
+    """
+    Fixed format for the non-ISO date values of a column, inferred from a
+    sample: the candidate that parses the most values (at least half), or
+    None. A format cached for the same schema and column is reused while it
+    still parses at least half of the sample.
+    """
+    sample = values.iloc[:DATE_SAMPLE_ROWS]
+    if sample.empty:
+        return None
+
+    cached = _format_cache.get(cache_key) if cache_key else None
+    if cached and _parse_count(sample, cached) * 2 >= len(sample):
+        return cached
+
+    best, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = _parse_count(sample, date_format)
+        if count > best_count:
+            best, best_count = date_format, count
+            if count == len(sample):
+                break
+    if best_count * 2 < len(sample):
+        return None
+    if cache_key:
+        _format_cache.set(cache_key, best)
+    return best
+
+
+def plausible_range() -> tuple:
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return pd.Timestamp(DATE_MIN_YEAR, 1, 1), pd.Timestamp(today + timedelta(days=DATE_MAX_FUTURE_DAYS))
+
+
+def profile_dates(clean_series: pd.Series, value_counts: pd.Series = None, date_format: str = None, cache_key: str = None) -> dict:
+    """
+    Date stage for a null-free string series. Works on the distinct values
+    (pass `value_counts` if already computed), parsing ISO values and the
+    remaining date-shaped values each with one fixed format in a vectorised
+    pass. `date_format` skips inference for the non-ISO values.
+
+    Returns the format used, counts of date-shaped values, non-ISO values and
+    impossible dates (not a calendar date under the column's format, or
+    outside the plausible range), and the valid dates with their weights.
+    """
+    if value_counts is None:
+        value_counts = clean_series.value_counts(sort=False)
+    values = pd.Series(value_counts.index.astype(str), dtype=object)
+    weights = value_counts.to_numpy().astype(np.int64)
+
+    iso = values.str.match(ISO_DATE_REGEX).to_numpy()
+    shaped = iso | values.str.match(DATE_SHAPE_REGEX).to_numpy()
+    other = shaped & ~iso
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    if iso.any():
+        parsed[iso] = pd.to_datetime(values[iso], format=ISO_DATE_FORMAT, errors="coerce")
+    if other.any():
+        if date_format is None:
+            # Infer from the most common non-ISO values
+            candidates = values[other].iloc[np.argsort(-weights[other], kind="stable")]
+            date_format = infer_date_format(candidates, cache_key)
+        if date_format is not None:
+            parsed[other] = pd.to_datetime(values[other], format=date_format, errors="coerce")
+
+    low, high = plausible_range()
+    valid = (parsed.notna() & (parsed >= low) & (parsed <= high)).to_numpy()
+    impossible = shaped & ~valid
+
+    iso_weight = int(weights[iso].sum())
+    other_weight = int(weights[other].sum())
+    return {
+        "date_format": ISO_DATE_FORMAT if iso_weight >= other_weight or date_format is None else date_format,
+        "non_iso_format": date_format,
+        "date_value_count": int(weights[shaped].sum()),
+        "non_iso_date_count": other_weight,
+        "impossible_date_count": int(weights[impossible].sum()),
+        "dates": parsed[valid].to_numpy(),
+        "weights": weights[valid]
+    }
+
+
+def weighted_quantiles(values: np.ndarray, weights: np.ndarray, qs) -> list:
+    """Inverted-CDF quantiles of values repeated `weights` times, without expanding them."""
+    order = np.argsort(values, kind="stable")
+    values, cumulative = values[order], np.cumsum(weights[order])
+    targets = np.asarray(qs, dtype=np.float64) * cumulative[-1]
+    positions = np.minimum(np.searchsorted(cumulative, targets, side="left"), len(values) - 1)
+    return [values[p] for p in positions]
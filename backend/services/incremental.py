@@ -0,0 +1,90 @@
+import os
+import uuid
+import tempfile
+from fastapi import UploadFile, HTTPException
+from services.cache import LRUCache
+from services.column_stats import ColumnAccumulator
+from services.ingestion import spool_upload, accumulate_upload, finalize_profile
+from services.reference_index import ReferenceAccumulator
+
+# Stored profile states for incremental (append-only) audits. Each merge
+# writes a new profile ID, so earlier snapshots stay reproducible.
+PROFILE_STORE_DIR = os.environ.get("PROFILE_STORE_DIR", os.path.join(tempfile.gettempdir(), "finaudit-profile-store"))
+PROFILE_STORE_ENTRIES = int(os.environ.get("PROFILE_STORE_ENTRIES", 32))
+PROFILE_STORE_DISK_MB = int(os.environ.get("PROFILE_STORE_DISK_MB", 2048))
+PROFILE_STORE_TTL = int(os.environ.get("PROFILE_STORE_TTL", 30 * 24 * 3600))
+
+profile_store = LRUCache(
+    "profile-store",
+    max_entries=PROFILE_STORE_ENTRIES,
+    max_bytes=256 * 1024 * 1024,
+    ttl=PROFILE_STORE_TTL,
+    disk_dir=PROFILE_STORE_DIR,
+    disk_max_bytes=PROFILE_STORE_DISK_MB * 1024 * 1024
+)
+
+
+def save_profile_state(accumulators: dict, total_rows: int, references: ReferenceAccumulator = None) -> str:
+    """
+    Stores mergeable state under a new profile ID. `references` is None once
+    the foreign key counts can no longer be merged (references changed).
+    """
+    profile_id = uuid.uuid4().hex
+    profile_store.set(profile_id, {
+        "total_rows": total_rows,
+        "columns": {col: acc.to_state() for col, acc in accumulators.items()},
+        "references": references.to_state() if references is not None else None
+    })
+    return profile_id
+
+
+def load_profile_state(profile_id: str) -> tuple:
+    """Returns (accumulators, total_rows, reference state) for a stored profile."""
+    state = profile_store.get(profile_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found or expired.")
+    accumulators = {col: ColumnAccumulator.from_state(col_state) for col, col_state in state["columns"].items()}
+    return accumulators, state["total_rows"], state.get("references")
+
+
+def _finalize(accumulators: dict, total_rows: int, references: ReferenceAccumulator = None) -> dict:
+    # Row hashes are not kept between merges, so duplicate rows and composite
+    # keys are never measured; foreign keys only while references stay put.
+    profile = finalize_profile(accumulators, total_rows, references=references)
+    profile["unmeasured"] = ["row_uniqueness"] + (["referential_integrity"] if references is None else [])
+    return profile
+
+
+def create_profile(file: UploadFile) -> tuple:
+    """
+    Profiles an upload and stores its mergeable state. Blocking; the
+    endpoints run it in the threadpool.
+    Returns (profile_id, metadata).
+    """
+    references = ReferenceAccumulator()
+    with spool_upload(file) as buffer:
+        accumulators, total_rows = accumulate_upload(buffer, file.filename, references=references)
+    return save_profile_state(accumulators, total_rows, references), _finalize(accumulators, total_rows, references)
+
+
+def merge_profile(profile_id: str, delta: UploadFile) -> tuple:
+    """
+    Folds a delta file (new rows only) into a stored profile. Only the delta
+    is read; the history is represented by its stored accumulator state.
+    Blocking; the endpoints run it in the threadpool.
+    Returns (new_profile_id, merged metadata).
+    """
+    accumulators, total_rows, reference_state = load_profile_state(profile_id)
+    references = ReferenceAccumulator()
+    with spool_upload(delta) as buffer:
+        delta_accumulators, delta_rows = accumulate_upload(buffer, delta.filename, references=references)
+    if reference_state is None or not references.merge_state(reference_state):
+        references = None
+
+    for col, acc in delta_accumulators.items():
+        if col in accumulators:
+            accumulators[col].merge(acc)
+        else:
+            accumulators[col] = acc
+    total_rows += delta_rows
+    return save_profile_state(accumulators, total_rows, references), _finalize(accumulators, total_rows, references)
@@ -1,39 +1,271 @@
 import pandas as pd
+import numpy as np
 import io
+import os
+import gc
+import mmap
+import json
+import tempfile
+import weakref
+from contextlib import contextmanager
+import xxhash
 from fastapi import UploadFile, HTTPException
+from services.cache import LRUCache
+from services.column_stats import (
+    ColumnAccumulator, as_strings, count_pattern_matches, date_stats, distinct_stats, numeric_block_stats,
+    numeric_values, percentage, top_values
+)
+from services.date_profiling import is_date_column, looks_like_dates, schema_key
+from services.row_keys import RowKeyAccumulator, profile_rows
+from services.reference_index import ReferenceAccumulator, profile_references, references_version
 
-async def load_data(file: UploadFile) -> pd.DataFrame:
+# Streaming profiler settings: rows per chunk, and the upload size above which
+# "auto" mode switches from a full in-memory load to chunked profiling.
+PROFILE_CHUNK_ROWS = int(os.environ.get("PROFILE_CHUNK_ROWS", 100_000))
+STREAM_THRESHOLD_BYTES = int(os.environ.get("PROFILE_STREAM_THRESHOLD_MB", 100)) * 1024 * 1024
+STREAMABLE_EXTENSIONS = ('.csv', '.ndjson', '.jsonl')
+# Default reader for profile_upload: "pandas" or "arrow" (typed Arrow tables
+# profiled with Arrow compute kernels; CSV, NDJSON and Parquet only)
+INGEST_ENGINE = os.environ.get("INGEST_ENGINE", "pandas").lower()
+SPOOL_COPY_BYTES = 1024 * 1024
+# Content-addressed cache of analysis results for identical uploads.
+# PROFILE_CACHE_DIR="" keeps the cache in memory only.
+PROFILE_CACHE_ENTRIES = int(os.environ.get("PROFILE_CACHE_ENTRIES", 64))
+PROFILE_CACHE_MAX_MB = int(os.environ.get("PROFILE_CACHE_MAX_MB", 64))
+PROFILE_CACHE_DISK_MB = int(os.environ.get("PROFILE_CACHE_DISK_MB", 512))
+PROFILE_CACHE_TTL = int(os.environ.get("PROFILE_CACHE_TTL", 24 * 3600))
+PROFILE_CACHE_DIR = os.environ.get("PROFILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "finaudit-profile-cache"))
+# Part of every cache key; bump when the profile fields change so cached
+# results from an older build are not served.
+PROFILE_FORMAT_VERSION = 9
+
+profile_cache = LRUCache(
+    "profile",
+    max_entries=PROFILE_CACHE_ENTRIES,
+    max_bytes=PROFILE_CACHE_MAX_MB * 1024 * 1024,
+    ttl=PROFILE_CACHE_TTL,
+    disk_dir=PROFILE_CACHE_DIR,
+    disk_max_bytes=PROFILE_CACHE_DISK_MB * 1024 * 1024
+)
+
+class ProfilingCancelled(Exception):
+    """Raised by an on_chunk callback to stop profiling; passed on as is, never as a 400."""
+
+class MappedUpload(mmap.mmap):
     """
-    Reads an uploaded file into a Pandas DataFrame.
-    Supports CSV, JSON, and Excel.
+    Read-only memory map that passes as a binary file object, so pandas wraps
+    it with the requested text encoding and the Excel readers can seek in it.
+    """
+    mode = "rb"
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return False
+
+    def seekable(self):
+        return True
+
+# Content hashes of uploads whose bytes already went through copy_upload()
+# or upload_digest(), so no later step hashes them again
+_content_hashes = weakref.WeakKeyDictionary()
+
+def copy_upload(file: UploadFile, target):
+    """Copies an upload into the writable `target` in bounded chunks, hashing them on the way (see upload_digest)."""
+    hasher = xxhash.xxh3_128()
+    source = file.file
+    source.seek(0)
+    while chunk := source.read(SPOOL_COPY_BYTES):
+        target.write(chunk)
+        hasher.update(chunk)
+    _content_hashes[file] = hasher.hexdigest()
+
+@contextmanager
+def spool_upload(file: UploadFile):
+    """
+    Yields a read-only memory-mapped view of an uploaded file.
+
+    Starlette already spools multipart bodies to a SpooledTemporaryFile as they
+    arrive (only the first MB is kept in memory); fileno() rolls that remainder
+    over to disk, so parsers read from the page cache instead of a heap copy.
+    Upload objects without a file descriptor are copied (and hashed) to a
+    temp file in bounded chunks first.
+    """
+    source = file.file
+    spooled = None
+    try:
+        try:
+            fd = source.fileno()
+            source.flush()
+        except (AttributeError, io.UnsupportedOperation):
+            spooled = tempfile.TemporaryFile()
+            copy_upload(file, spooled)
+            spooled.flush()
+            fd = spooled.fileno()
+
+        if os.fstat(fd).st_size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+
+        buffer = MappedUpload(fd, 0, access=mmap.ACCESS_READ)
+        try:
+            yield buffer
+        finally:
+            _close_mapping(buffer)
+    finally:
+        if spooled is not None:
+            spooled.close()
+
+def _close_mapping(buffer: MappedUpload):
+    try:
+        buffer.close()
+    except BufferError:
+        # Zero-copy Arrow buffers (see arrow_ingestion) can still pin the
+        # mapping until they are collected; if something holds on to them
+        # beyond that, the map is released with its last reference instead.
+        gc.collect()
+        try:
+            buffer.close()
+        except BufferError:
+            pass
+
+def upload_digest(file: UploadFile, **options) -> str:
+    """
+    Content address of an upload: xxh3-128 of its bytes, combined with the
+    profiling options that shape the result (mode, columns, sampling, ...)
+    and the set of registered reference datasets. The bytes are hashed once
+    per upload: while copy_upload() writes them, or else (Starlette wrote the
+    spool itself) straight from the memory-mapped spool file.
+    """
+    content_hash = _content_hashes.get(file)
+    if content_hash is None:
+        with spool_upload(file) as buffer:
+            content_hash = _content_hashes.get(file) or xxhash.xxh3_128_hexdigest(buffer)
+        _content_hashes[file] = content_hash
+    options = {**options, "profile_format": PROFILE_FORMAT_VERSION, "references": references_version()}
+    options_hash = xxhash.xxh3_64_hexdigest(json.dumps(options, sort_keys=True, default=str))
+    return f"{content_hash}-{options_hash}"
+
+def read_dataframe(buffer, filename: str, columns: list = None) -> pd.DataFrame:
+    """
+    Parses a spooled upload (see spool_upload) into a Pandas DataFrame.
+    Supports CSV, JSON/NDJSON, Excel, and Parquet. `columns` limits the
+    columns that are read.
     """
-    content = await file.read()
-    filename = file.filename.lower()
+    filename = filename.lower()
     
     try:
         if filename.endswith('.csv'):
-            # Attempt to read with utf-8, fallback to latin1 if needed
+            # Attempt to read with utf-8, fallback to latin1 if needed.
+            # The retry re-reads the same mapping; no second copy is made.
             try:
-                df = pd.read_csv(io.BytesIO(content))
+                df = pd.read_csv(buffer, usecols=columns)
             except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(content), encoding='latin1')
+                buffer.seek(0)
+                df = pd.read_csv(buffer, encoding='latin1', usecols=columns)
         elif filename.endswith('.json'):
-            df = pd.read_json(io.BytesIO(content))
+            df = pd.read_json(buffer)
+        elif filename.endswith(('.ndjson', '.jsonl')):
+            df = pd.read_json(buffer, lines=True)
         elif filename.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(io.BytesIO(content))
+            df = pd.read_excel(buffer, usecols=columns)
         elif filename.endswith('.parquet'):
-             df = pd.read_parquet(io.BytesIO(content))
+             df = pd.read_parquet(buffer, columns=columns)
         else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload CSV, JSON, Excel, or Parquet.")
+            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload CSV, JSON/NDJSON, Excel, or Parquet.")
         
+        if columns and filename.endswith(('.json', '.ndjson', '.jsonl')):
+            df = df[columns]
         return df
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
 
+async def load_data(file: UploadFile) -> pd.DataFrame:
+    """
+    Reads an uploaded file into a Pandas DataFrame.
+    Supports CSV, JSON/NDJSON, Excel, and Parquet.
+    """
+    with spool_upload(file) as buffer:
+        return read_dataframe(buffer, file.filename)
+
+def _is_block_numeric(dtype) -> bool:
+    # Complex numbers have no float64 view (nor an order for min/max)
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_complex_dtype(dtype)
+
+def _column_header(col_series: pd.Series, null_count: int) -> dict:
+    return {
+        "dtype": str(col_series.dtype),
+        "null_count": int(null_count),
+        "null_percentage": percentage(null_count, len(col_series)),
+        **distinct_stats(col_series),
+        "is_numeric": pd.api.types.is_numeric_dtype(col_series)
+    }
+
+def profile_numeric_columns(df: pd.DataFrame, positions: list) -> dict:
+    """
+    Profiles the numeric columns at `positions` together: the float64 block is
+    reduced once per stat across all of them (see numeric_block_stats) instead
+    of per column. Returns {position: stats}.
+    """
+    if not positions:
+        return {}
+    values = numeric_values(df.iloc[:, positions])
+    null_counts = np.isnan(values).sum(axis=0)
+    profiles = {}
+    for i, (pos, numeric_stats) in enumerate(zip(positions, numeric_block_stats(values))):
+        profiles[pos] = {**_column_header(df.iloc[:, pos], null_counts[i]), **numeric_stats}
+    return profiles
+
+def profile_column(col_series: pd.Series, date_cache_key: str = None) -> dict:
+    """
+    Stats for a single column: type, nulls, distinct count, numeric bounds
+    or string pattern matches. Percentages are relative to len(col_series).
+    `date_cache_key` identifies the column across uploads with the same
+    schema, so its inferred date format is reused.
+    """
+    if _is_block_numeric(col_series.dtype):
+        return profile_numeric_columns(col_series.to_frame(), [0])[0]
+
+    stats = _column_header(col_series, col_series.isnull().sum())
+
+    if pd.api.types.is_numeric_dtype(col_series):
+        clean_series = col_series.dropna()
+        if not clean_series.empty:
+            stats.update({
+                "min": float(clean_series.min()),
+                "max": float(clean_series.max()),
+                "mean": float(clean_series.mean()),
+                "negative_count": int((clean_series < 0).sum())
+            })
+    else:
+        # String checks (single pass over the values for all patterns)
+        clean_series = as_strings(col_series.dropna())
+        if not clean_series.empty:
+            # One value_counts() feeds both the pattern matcher and the top values
+            value_counts = clean_series.value_counts(sort=False)
+            for pat_name, match_count in count_pattern_matches(clean_series, stats["unique_count"], value_counts).items():
+                stats[f"{pat_name}_match_count"] = int(match_count)
+                stats[f"{pat_name}_match_percentage"] = percentage(match_count, len(col_series))
+            stats["top_values"] = top_values(value_counts.index, value_counts.to_numpy(), len(col_series))
+
+            # Attempt Date Parsing for min/max
+            # Only if it looks like a date (to avoid parsing random strings)
+            if is_date_column(stats.get("iso_date_match_percentage", 0), looks_like_dates(clean_series)):
+                try:
+                    stats.update(date_stats(clean_series, value_counts, date_cache_key))
+                except:
+                    pass
+
+    return stats
+
 def profile_dataset(df: pd.DataFrame) -> dict:
     """
     Extracts metadata from the dataframe.
-    Returns column stats, null counts, types, etc.
+    Returns column stats, null counts, types, etc., plus whole-row duplicate
+    and candidate key counts (row_uniqueness) and foreign key hit rates
+    against registered reference datasets (referential_integrity).
     Ensures NO raw PII is stored/returned in the output, only stats.
     """
     profile = {
@@ -42,59 +274,211 @@ def profile_dataset(df: pd.DataFrame) -> dict:
         "columns": {}
     }
     
+    # Numeric columns are reduced together in one pass over their values
+    numeric_positions = [pos for pos, dtype in enumerate(df.dtypes) if _is_block_numeric(dtype)]
+    numeric_profiles = profile_numeric_columns(df, numeric_positions)
+
     columns_profile = {}
-    
-    # Common Patterns (simplified)
-    patterns = {
-        "email": r"[^@]+@[^@]+\.[^@]+",
-        "phone": r"^\+?1?\d{9,15}$",
-        "iso_date": r"^\d{4}-\d{2}-\d{2}$",
-        "currency_code": r"^[A-Z]{3}$",
-        "country_code": r"^[A-Z]{2,3}$"
-    }
+    schema = schema_key(df.columns)
 
-    for col in df.columns:
-        col_series = df[col]
-        col_type = str(col_series.dtype)
-        
-        stats = {
-            "dtype": col_type,
-            "null_count": int(col_series.isnull().sum()),
-            "null_percentage": float(round(col_series.isnull().mean() * 100, 2)),
-            "unique_count": int(col_series.nunique()),
-            "is_numeric": pd.api.types.is_numeric_dtype(col_series)
-        }
-        
-        if pd.api.types.is_numeric_dtype(col_series):
-            clean_series = col_series.dropna()
-            if not clean_series.empty:
-                stats.update({
-                    "min": float(clean_series.min()),
-                    "max": float(clean_series.max()),
-                    "mean": float(clean_series.mean()),
-                    "negative_count": int((clean_series < 0).sum())
-                })
+    for pos, col in enumerate(df.columns):
+        if pos in numeric_profiles:
+            columns_profile[col] = numeric_profiles[pos]
         else:
-            # String checks
-            clean_series = col_series.dropna().astype(str)
-            if not clean_series.empty:
-                for pat_name, pat_regex in patterns.items():
-                    match_count = clean_series.str.match(pat_regex).sum()
-                    stats[f"{pat_name}_match_count"] = int(match_count)
-                    stats[f"{pat_name}_match_percentage"] = float(round((match_count / len(df)) * 100, 2))
-                
-                # Attempt Date Parsing for min/max
-                # Only if it looks like a date (to avoid parsing random strings)
-                if stats.get("iso_date_match_percentage", 0) > 50:
-                    try:
-                        date_series = pd.to_datetime(clean_series, errors='coerce').dropna()
-                        if not date_series.empty:
-                            stats["min_date"] = date_series.min().isoformat()
-                            stats["max_date"] = date_series.max().isoformat()
-                    except:
-                        pass
-
-        columns_profile[col] = stats
+            columns_profile[col] = profile_column(df.iloc[:, pos], f"{schema}:{pos}")
         
     profile["columns"] = columns_profile
+    profile["row_uniqueness"] = profile_rows(df)
+    references = profile_references(df)
+    if references:
+        profile["referential_integrity"] = references
+    return profile
+
+def _read_chunks(source, filename: str, chunk_rows: int, encoding=None, columns: list = None):
+    if filename.endswith('.csv'):
+        return pd.read_csv(source, chunksize=chunk_rows, encoding=encoding, usecols=columns)
+    chunks = pd.read_json(source, lines=True, chunksize=chunk_rows)
+    if columns:
+        return (chunk.reindex(columns=columns) for chunk in chunks)
+    return chunks
+
+def accumulate_chunks(chunks, accumulators: dict = None, row_keys: RowKeyAccumulator = None,
+                      references: ReferenceAccumulator = None, on_chunk=None) -> tuple:
+    """
+    Folds DataFrame chunks into per-column accumulators (and whole rows into
+    `row_keys`, foreign keys into `references`, if given); returns
+    (accumulators, rows read). `on_chunk(rows read so far)` is called after
+    each chunk and may raise to stop.
+    """
+    accumulators = {} if accumulators is None else accumulators
+    total_rows = 0
+    for chunk in chunks:
+        total_rows += len(chunk)
+        if row_keys is not None:
+            row_keys.update(chunk)
+        if references is not None:
+            references.update(chunk)
+        schema = schema_key(chunk.columns)
+        for pos, col in enumerate(chunk.columns):
+            if col not in accumulators:
+                accumulators[col] = ColumnAccumulator(f"{schema}:{pos}")
+            accumulators[col].update(chunk[col])
+        if on_chunk is not None:
+            on_chunk(total_rows)
+    return accumulators, total_rows
+
+def finalize_profile(accumulators: dict, total_rows: int, row_keys: RowKeyAccumulator = None,
+                     references: ReferenceAccumulator = None) -> dict:
+    """Renders accumulators in the profile_dataset() format."""
+    profile = {
+        "total_rows": total_rows,
+        "total_columns": len(accumulators),
+        "columns": {col: acc.finalize(total_rows) for col, acc in accumulators.items()}
+    }
+    if row_keys is not None:
+        profile["row_uniqueness"] = row_keys.finalize()
+    referential_integrity = references.finalize() if references is not None else None
+    if referential_integrity:
+        profile["referential_integrity"] = referential_integrity
+    return profile
+
+def _profile_chunks(chunks, on_chunk=None) -> dict:
+    row_keys = RowKeyAccumulator()
+    references = ReferenceAccumulator()
+    try:
+        accumulators, total_rows = accumulate_chunks(chunks, row_keys=row_keys, references=references, on_chunk=on_chunk)
+    except Exception:
+        row_keys.close()
+        raise
+    return finalize_profile(accumulators, total_rows, row_keys, references)
+
+def accumulate_upload(buffer, filename: str, columns: list = None, references: ReferenceAccumulator = None) -> tuple:
+    """
+    Per-column accumulators for a whole spooled upload: CSV/NDJSON are read in
+    PROFILE_CHUNK_ROWS chunks, other formats in one piece. Foreign keys are
+    counted into `references`, if given.
+    Returns (accumulators, total_rows).
+    """
+    lower = filename.lower()
+    try:
+        if not lower.endswith(STREAMABLE_EXTENSIONS):
+            return accumulate_chunks([read_dataframe(buffer, filename, columns)], references=references)
+        try:
+            return accumulate_chunks(_read_chunks(buffer, lower, PROFILE_CHUNK_ROWS, columns=columns), references=references)
+        except UnicodeDecodeError:
+            buffer.seek(0)
+            if references is not None:
+                references.counts.clear()
+            return accumulate_chunks(_read_chunks(buffer, lower, PROFILE_CHUNK_ROWS, encoding='latin1', columns=columns), references=references)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+
+def profile_stream(source, filename: str, chunk_rows: int = PROFILE_CHUNK_ROWS, columns: list = None, on_chunk=None) -> dict:
+    """
+    Streaming counterpart of load_data + profile_dataset for CSV/NDJSON.
+    Reads `chunk_rows` rows at a time into mergeable per-column accumulators,
+    so peak memory depends on the chunk size instead of the file size.
+    Returns a metadata dict with the same shape as profile_dataset().
+    """
+    filename = filename.lower()
+    if not filename.endswith(STREAMABLE_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Streaming profiling supports CSV and NDJSON files only.")
+
+    try:
+        try:
+            return _profile_chunks(_read_chunks(source, filename, chunk_rows, columns=columns), on_chunk)
+        except UnicodeDecodeError:
+            # Same latin1 fallback as load_data, restarting from the top
+            source.seek(0)
+            return _profile_chunks(_read_chunks(source, filename, chunk_rows, encoding='latin1', columns=columns), on_chunk)
+    except (HTTPException, ProfilingCancelled):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+
+def sample_upload(buffer, filename: str, sample_rows: int, stratify_by: str = None, columns: list = None) -> dict:
+    """
+    Profiles a random sample of the upload (see services.sampling) instead of
+    every row: CSV/NDJSON are sampled chunk by chunk in bounded memory, other
+    formats are loaded and then sampled.
+    """
+    from services.sampling import profile_sample
+
+    read_columns = columns
+    if columns and stratify_by and stratify_by not in columns:
+        read_columns = columns + [stratify_by]
+
+    lower = filename.lower()
+    try:
+        if lower.endswith(STREAMABLE_EXTENSIONS):
+            try:
+                chunks = _read_chunks(buffer, lower, PROFILE_CHUNK_ROWS, columns=read_columns)
+                profile = profile_sample(chunks, sample_rows, stratify_by)
+            except UnicodeDecodeError:
+                buffer.seek(0)
+                chunks = _read_chunks(buffer, lower, PROFILE_CHUNK_ROWS, encoding='latin1', columns=read_columns)
+                profile = profile_sample(chunks, sample_rows, stratify_by)
+        else:
+            profile = profile_sample([read_dataframe(buffer, filename, read_columns)], sample_rows, stratify_by)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+
+    if read_columns is not columns:
+        # The stratification column was only read to drive the sample
+        del profile["columns"][stratify_by]
+        profile["total_columns"] -= 1
     return profile
+
+def should_stream(filename: str, size: int, mode: str = "auto") -> bool:
+    """Decides between full in-memory profiling and chunked streaming."""
+    if mode == "stream":
+        return True
+    if mode != "auto" or not filename.lower().endswith(STREAMABLE_EXTENSIONS):
+        return False
+    return size > STREAM_THRESHOLD_BYTES
+
+def profile_upload(
+    file: UploadFile,
+    mode: str = "auto",
+    engine: str = None,
+    columns: list = None,
+    sample_rows: int = None,
+    stratify_by: str = None,
+    on_chunk=None
+) -> dict:
+    """
+    Profiles an uploaded file, either fully in memory or streamed in chunks.
+    `mode` is "full", "stream" or "auto" (stream above PROFILE_STREAM_THRESHOLD_MB).
+    `engine` "arrow" profiles CSV/NDJSON/Parquet as typed Arrow tables instead
+    (defaults to INGEST_ENGINE), and `columns` restricts profiling to a subset.
+    `sample_rows` profiles a random sample of that many rows (stratified on
+    `stratify_by` if given) and reports confidence intervals.
+    All paths parse from the memory-mapped spool file; wide in-memory tables
+    are profiled column-parallel across the process pool.
+    CPU-bound: callers on the event loop run it in a worker thread or job
+    process (see services.analysis and services.jobs). Streamed profiles call
+    `on_chunk(rows read so far)` after every chunk.
+    """
+    engine = (engine or INGEST_ENGINE).lower()
+    with spool_upload(file) as buffer:
+        if sample_rows:
+            return sample_upload(buffer, file.filename, sample_rows, stratify_by, columns)
+
+        if engine == "arrow":
+            from services.arrow_ingestion import supports_arrow, read_arrow_table, profile_table
+            if supports_arrow(file.filename):
+                return profile_table(read_arrow_table(buffer, file.filename, columns))
+
+        if should_stream(file.filename, len(buffer), mode):
+            return profile_stream(buffer, file.filename, columns=columns, on_chunk=on_chunk)
+
+        df = read_dataframe(buffer, file.filename, columns)
+
+    from services.parallel_profiler import should_parallelize, profile_dataset_parallel
+    if should_parallelize(df):
+        return profile_dataset_parallel(df)
+    return profile_dataset(df)
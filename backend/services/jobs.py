@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import shutil
+import asyncio
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
+from services.cache import LRUCache
+from services.ingestion import profile_cache, copy_upload, ProfilingCancelled
+from services.analysis import ANALYSIS_STAGES, analysis_cache_key, cached_analysis, compute_analysis, finish_analysis
+
+# Background analysis jobs. The CPU-bound stages run in a bounded pool of
+# JOB_WORKERS processes, so a large upload never blocks the event loop; at
+# most JOB_MAX_ACTIVE jobs may be queued or running at once.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_MAX_ACTIVE = int(os.environ.get("JOB_MAX_ACTIVE", 16))
+# Finished jobs (and their results) are kept this long
+JOB_TTL = int(os.environ.get("JOB_TTL", 3600))
+JOB_RESULTS_MAX_MB = int(os.environ.get("JOB_RESULTS_MAX_MB", 256))
+# Uploads are copied here for the worker and removed when the job ends
+JOB_DIR = os.environ.get("JOB_DIR", os.path.join(tempfile.gettempdir(), "finaudit-jobs"))
+
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+
+job_results = LRUCache("job-results", max_entries=256, max_bytes=JOB_RESULTS_MAX_MB * 1024 * 1024, ttl=JOB_TTL)
+_jobs = {}
+_executor = None
+
+
+class JobCancelled(ProfilingCancelled):
+    pass
+
+
+class JobFailed(Exception):
+    """A worker's error, as (status code, detail); HTTPException does not survive pickling."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Lazily started job worker pool."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS, initializer=_init_worker)
+        atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+    return _executor
+
+
+def _init_worker():
+    # Job workers share one column-parallel profiling budget
+    from services.parallel_profiler import share_workers
+    share_workers(JOB_WORKERS)
+
+
+def _cancel_requested(job_dir: str) -> bool:
+    return os.path.exists(os.path.join(job_dir, "cancel"))
+
+
+def _run_job(job_dir: str, filename: str, options: dict, lineage: str) -> dict:
+    """Worker process: compute_analysis() on the job's copy of the upload."""
+    reported = {"stages": {}, "rows": None}
+
+    def progress(stage: str, rows: int = None):
+        # Cancellation is checked as each stage starts and after every streamed chunk
+        if _cancel_requested(job_dir):
+            raise JobCancelled()
+        reported["stages"].setdefault(stage, time.time())
+        if rows is not None:
+            reported["rows"] = rows
+        staging = os.path.join(job_dir, ".progress")
+        with open(staging, "w") as f:
+            json.dump(reported, f)
+        os.replace(staging, os.path.join(job_dir, "progress.json"))
+
+    try:
+        with open(os.path.join(job_dir, "upload"), "rb") as f:
+            return compute_analysis(UploadFile(file=f, filename=filename), options, lineage, progress)
+    except JobCancelled:
+        raise
+    except Exception as e:
+        if _cancel_requested(job_dir):
+            # An error raised after the cancel request (e.g. by a stopped pool) still means cancelled
+            raise JobCancelled()
+        if isinstance(e, HTTPException):
+            raise JobFailed(e.status_code, str(e.detail))
+        raise JobFailed(400, str(e))
+
+
+def _stage_report(job: dict) -> tuple:
+    """(stages with their status, overall progress %) from the job's stage timestamps."""
+    stages, progress = [], 0
+    started = job["stages"]
+    names = list(ANALYSIS_STAGES)
+    current = job["stage"]
+    for pos, name in enumerate(names):
+        if name not in started:
+            status = "pending"
+        elif name == current and job["status"] in ACTIVE_STATUSES:
+            status = "running"
+        elif name == current and job["status"] != "done":
+            status = job["status"]
+        else:
+            status = "done"
+        entry = {"name": name, "status": status}
+        if name in started:
+            finished = started.get(names[pos + 1]) if pos + 1 < len(names) else None
+            end = finished or job.get("finished_at") or time.time()
+            entry["seconds"] = round(end - started[name], 3)
+        if status == "done":
+            progress += ANALYSIS_STAGES[name]
+        stages.append(entry)
+    return stages, progress
+
+
+def _sync_progress(job: dict):
+    # Worker stages are reported through the job directory
+    try:
+        with open(os.path.join(job["dir"], "progress.json")) as f:
+            reported = json.load(f)
+    except (OSError, ValueError):
+        return
+    for stage, at in reported["stages"].items():
+        if stage not in job["stages"]:
+            _enter_stage(job, stage, at)
+    job["rows_profiled"] = reported["rows"]
+
+
+def _enter_stage(job: dict, stage: str, at: float = None):
+    job["stage"] = stage
+    if job["status"] == "queued":
+        job["status"] = "running"
+    job["stages"].setdefault(stage, at or time.time())
+
+
+def _finish(job: dict, status: str, error: str = None, status_code: int = None):
+    job["status"] = status
+    job["finished_at"] = time.time()
+    job["error"] = error
+    job["error_status"] = status_code
+    job.pop("future", None)
+    job.pop("task", None)
+    shutil.rmtree(job["dir"], ignore_errors=True)
+
+
+def _prune():
+    now = time.time()
+    for job_id in [job_id for job_id, job in _jobs.items()
+                   if job["status"] not in ACTIVE_STATUSES and now - job["finished_at"] > JOB_TTL]:
+        del _jobs[job_id]
+
+
+async def _drive(job_id: str, cache_key: str, filename: str, options: dict, lineage: str, defer: bool, use_cache: bool):
+    job = _jobs[job_id]
+    try:
+        computed = cached_analysis(cache_key, lineage)
+        if computed is None:
+            future = get_executor().submit(_run_job, job["dir"], filename, options, lineage)
+            job["future"] = future
+            computed = await asyncio.wrap_future(future)
+            _sync_progress(job)
+            profile_cache.set(cache_key, computed)
+            if _cancel_requested(job["dir"]):
+                raise JobCancelled()
+        else:
+            # Cached profile, rules and scores: those stages are already done
+            now = time.time()
+            for stage in ("profiling", "rules", "scoring"):
+                _enter_stage(job, stage, now)
+        result = await finish_analysis(computed, filename, lambda stage: _enter_stage(job, stage), defer, use_cache)
+        job_results.set(job_id, result)
+        _finish(job, "done")
+        print(f"✅ [Jobs]: {job_id} done in {job['finished_at'] - job['created_at']:.2f}s")
+    except (JobCancelled, asyncio.CancelledError):
+        _finish(job, "cancelled")
+        print(f"🛑 [Jobs]: {job_id} cancelled")
+    except (HTTPException, JobFailed) as e:
+        _finish(job, "failed", str(e.detail), e.status_code)
+        print(f"❌ [Jobs]: {job_id} failed: {e.detail}")
+    except Exception as e:
+        _finish(job, "failed", str(e), 400)
+        print(f"❌ [Jobs]: {job_id} failed: {e}")
+
+
+def _copy_upload(file: UploadFile, job_dir: str):
+    with open(os.path.join(job_dir, "upload"), "wb") as f:
+        copy_upload(file, f)
+
+
+async def submit_job(file: UploadFile, options: dict, lineage: str, defer: bool = False, use_cache: bool = True) -> dict:
+    """Queues an analysis of an upload and returns its status right away."""
+    _prune()
+    if sum(job["status"] in ACTIVE_STATUSES for job in _jobs.values()) >= JOB_MAX_ACTIVE:
+        raise HTTPException(status_code=429, detail="Too many analysis jobs in progress; retry later.")
+
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(JOB_DIR, job_id)
+    os.makedirs(job_dir)
+    # The request's spool file is gone once the response is sent. The copy
+    # hashes the bytes too, so the cache key needs no second pass.
+    try:
+        await run_in_threadpool(_copy_upload, file, job_dir)
+        cache_key = await run_in_threadpool(analysis_cache_key, file, options, lineage)
+    except Exception:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+
+    _jobs[job_id] = {
+        "job_id": job_id,
+        "filename": file.filename,
+        "status": "queued",
+        "stage": None,
+        "stages": {},
+        "created_at": time.time(),
+        "finished_at": None,
+        "error": None,
+        "dir": job_dir
+    }
+    _jobs[job_id]["task"] = asyncio.create_task(_drive(job_id, cache_key, file.filename, options, lineage, defer, use_cache))
+    print(f"🔹 [Jobs]: {job_id} queued for {file.filename}")
+    return job_status(job_id)
+
+
+def _get_job(job_id: str) -> dict:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found or expired.")
+    return job
+
+
+def job_status(job_id: str) -> dict:
+    job = _get_job(job_id)
+    if job["status"] in ACTIVE_STATUSES and job.get("future") is not None:
+        _sync_progress(job)
+    stages, progress = _stage_report(job)
+    return {
+        "job_id": job_id,
+        "filename": job["filename"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": 100 if job["status"] == "done" else progress,
+        "stages": stages,
+        # Rows profiled so far, for streamed uploads
+        "rows_profiled": job.get("rows_profiled"),
+        "error": job["error"]
+    }
+
+
+def job_result(job_id: str) -> dict:
+    job = _get_job(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=job["error_status"] or 400, detail=job["error"])
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job['status']}.")
+    result = job_results.get(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Result of job '{job_id}' expired.")
+    return result
+
+
+def cancel_job(job_id: str) -> dict:
+    """
+    Cancels a job: a queued one never starts, a running one stops at its next
+    stage boundary (in the worker) or at once (during the AI analysis).
+    """
+    job = _get_job(job_id)
+    if job["status"] not in ACTIVE_STATUSES:
+        return job_status(job_id)
+    future = job.get("future")
+    if future is not None and not future.done():
+        if not future.cancel():
+            # Already running in a worker: ask it to stop at the next stage
+            open(os.path.join(job["dir"], "cancel"), "w").close()
+    else:
+        job["task"].cancel()
+    job["status"] = "cancelling"
+    return job_status(job_id)
@@ -0,0 +1,167 @@
+import os
+import gc
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import pandas as pd
+import pyarrow as pa
+from services.ingestion import profile_column
+from services.row_keys import profile_rows
+from services.reference_index import profile_references
+from services.date_profiling import schema_key
+
+# Column-parallel profiling settings. Tables narrower than
+# PROFILE_PARALLEL_MIN_COLUMNS are not worth the IPC export.
+PROFILE_WORKERS = int(os.environ.get("PROFILE_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_COLUMNS = int(os.environ.get("PROFILE_PARALLEL_MIN_COLUMNS", 32))
+# Tasks per worker, so wide and narrow columns balance out across the pool
+TASKS_PER_WORKER = 4
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Lazily started, process-wide profiling pool."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PROFILE_WORKERS)
+        atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+    return _executor
+
+
+def share_workers(processes: int):
+    """
+    Called in each of `processes` worker processes that profile side by side
+    (the job pool): splits PROFILE_WORKERS between them instead of giving each
+    its own full-size pool. A share of 1 profiles columns in-process.
+    """
+    global PROFILE_WORKERS, _executor
+    PROFILE_WORKERS = max(1, PROFILE_WORKERS // processes)
+    # A forked worker must not reuse the parent's pool
+    _executor = None
+
+
+def should_parallelize(df: pd.DataFrame) -> bool:
+    return PROFILE_WORKERS > 1 and len(df.columns) >= PARALLEL_MIN_COLUMNS
+
+
+def _to_arrow(col_series: pd.Series):
+    """
+    Converts a column to Arrow, or returns None when the round trip would not
+    give back the same pandas dtype (e.g. mixed-type object columns).
+    """
+    try:
+        array = pa.array(col_series, from_pandas=True)
+        round_trip = array.type.to_pandas_dtype()
+    except (pa.ArrowException, NotImplementedError, TypeError, ValueError):
+        return None
+    if pa.types.is_null(array.type) or pa.types.is_dictionary(array.type):
+        return array
+    if pd.api.types.pandas_dtype(round_trip) != col_series.dtype:
+        return None
+    return array
+
+
+def _export(df: pd.DataFrame):
+    """
+    Writes the Arrow-representable columns to a shared memory segment in IPC
+    file format. Returns (segment, exported positions, in-process positions).
+    """
+    arrays, names, exported, local = [], [], [], []
+    for pos in range(len(df.columns)):
+        array = _to_arrow(df.iloc[:, pos])
+        if array is None:
+            local.append(pos)
+            continue
+        arrays.append(array)
+        names.append(str(pos))
+        exported.append(pos)
+
+    if not arrays:
+        return None, exported, local
+
+    table = pa.Table.from_arrays(arrays, names=names)
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_file(sizer, table.schema) as writer:
+        writer.write_table(table)
+
+    segment = shared_memory.SharedMemory(create=True, size=max(sizer.size(), 1))
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(segment.buf))
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.close()
+    return segment, exported, local
+
+
+def _profile_shared_columns(segment_name: str, fields: list, schema: str) -> list:
+    """
+    Worker entry point: maps the shared IPC table and profiles the given
+    columns. Numeric buffers are read in place, nothing is pickled but the
+    resulting stats dicts.
+    """
+    # Pool workers share the parent's resource tracker; the parent unlinks.
+    segment = shared_memory.SharedMemory(name=segment_name)
+    try:
+        reader = pa.ipc.open_file(pa.py_buffer(segment.buf))
+        results = []
+        for field in fields:
+            col_series = _read_column(reader, field)
+            results.append((int(field), profile_column(col_series, f"{schema}:{field}")))
+            del col_series
+        del reader
+        gc.collect()
+        return results
+    finally:
+        segment.close()
+
+
+def _read_column(reader, field: str) -> pd.Series:
+    chunks = [reader.get_batch(i).column(field) for i in range(reader.num_record_batches)]
+    return pa.chunked_array(chunks).to_pandas()
+
+
+def profile_dataset_parallel(df: pd.DataFrame, workers: int = None) -> dict:
+    """
+    Column-parallel equivalent of profile_dataset().
+
+    Columns are exported once to an Arrow IPC buffer in shared memory and
+    profiled in batches across the process pool; per-column stats dicts are
+    merged back in the original column order. Columns that Arrow cannot hold
+    without changing their pandas dtype are profiled in this process.
+    """
+    executor = get_executor()
+    workers = workers or PROFILE_WORKERS
+    segment, exported, local = _export(df)
+    schema = schema_key(df.columns)
+
+    columns_stats = {}
+    try:
+        futures = []
+        if segment is not None:
+            batch_size = max(1, len(exported) // (workers * TASKS_PER_WORKER))
+            for i in range(0, len(exported), batch_size):
+                fields = [str(pos) for pos in exported[i:i + batch_size]]
+                futures.append(executor.submit(_profile_shared_columns, segment.name, fields, schema))
+
+        for pos in local:
+            columns_stats[pos] = profile_column(df.iloc[:, pos], f"{schema}:{pos}")
+        # Rows and foreign keys are hashed here while the workers profile columns
+        row_uniqueness = profile_rows(df)
+        referential_integrity = profile_references(df)
+        for future in futures:
+            for pos, stats in future.result():
+                columns_stats[pos] = stats
+    finally:
+        if segment is not None:
+            segment.close()
+            segment.unlink()
+
+    profile = {
+        "total_rows": len(df),
+        "total_columns": len(df.columns),
+        "columns": {df.columns[pos]: columns_stats[pos] for pos in range(len(df.columns))},
+        "row_uniqueness": row_uniqueness
+    }
+    if referential_integrity:
+        profile["referential_integrity"] = referential_integrity
+    return profile
@@ -0,0 +1,332 @@
+import os
+import re
+import json
+import math
+import shutil
+import tempfile
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import xxhash
+from fastapi import UploadFile, HTTPException
+from services.column_stats import percentage
+
+# Registered reference datasets (customer master, merchant list, ...). Each one
+# is kept as a compact key index, never as the table itself: its distinct key
+# hashes sorted in keys.npy plus a Bloom filter in bloom.npy, sized for
+# REFERENCE_BLOOM_FPR false positives. Every registration writes a new version
+# directory; a "current" pointer file names the live one.
+REFERENCE_INDEX_DIR = os.environ.get("REFERENCE_INDEX_DIR", os.path.join(tempfile.gettempdir(), "finaudit-reference-index"))
+REFERENCE_BLOOM_FPR = float(os.environ.get("REFERENCE_BLOOM_FPR", 0.01))
+
+_UINT32 = np.uint64(0xFFFFFFFF)
+_loaded = {}
+
+
+def key_hashes(col_series: pd.Series) -> np.ndarray:
+    """
+    64-bit hash per non-null key value. Keys compare as text so a customer
+    ID matches whether a file parsed it as 1042, 1042.0 or "1042".
+    """
+    values = col_series.dropna()
+    if pd.api.types.is_bool_dtype(values):
+        values = values.astype(str)
+    elif pd.api.types.is_numeric_dtype(values):
+        numbers = values.astype(np.float64)
+        values = numbers.astype(np.int64).astype(str) if (numbers % 1 == 0).all() else numbers.astype(str)
+    else:
+        values = values.astype(str).str.strip()
+    return pd.util.hash_array(values.to_numpy(dtype=object), categorize=True)
+
+
+def _bloom_positions(hashes: np.ndarray, bits: int, probes: int):
+    # Double hashing: probe i of a key is h1 + i*h2 over the two 32-bit halves
+    h1, h2 = hashes & _UINT32, (hashes >> np.uint64(32)) | np.uint64(1)
+    for i in range(probes):
+        yield ((h1 + np.uint64(i) * h2) % np.uint64(bits)).astype(np.int64)
+
+
+def build_bloom(keys: np.ndarray, fpr: float = REFERENCE_BLOOM_FPR) -> tuple:
+    """Bloom filter over `keys`; returns (packed bits, number of probes)."""
+    n = max(len(keys), 1)
+    bits = max(64, int(math.ceil(-n * math.log(fpr) / math.log(2) ** 2 / 64)) * 64)
+    probes = max(1, int(round(bits / n * math.log(2))))
+    bitmap = np.zeros(bits, dtype=bool)
+    for positions in _bloom_positions(keys, bits, probes):
+        bitmap[positions] = True
+    return np.packbits(bitmap), probes
+
+
+class ReferenceIndex:
+    """A registered reference key set, loaded from its index directory."""
+
+    def __init__(self, path: str, manifest: dict):
+        self.manifest = manifest
+        self.name = manifest["name"]
+        # The key file is memory-mapped, so only the pages a lookup touches are read
+        self.keys = np.load(os.path.join(path, "keys.npy"), mmap_mode="r")
+        self.bloom = np.load(os.path.join(path, "bloom.npy"))
+        self.bloom_bits = manifest["bloom_bits"]
+        self.bloom_probes = manifest["bloom_probes"]
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Membership per hash: Bloom filter first, binary search on its positives only."""
+        found = np.ones(len(hashes), dtype=bool)
+        for positions in _bloom_positions(hashes, self.bloom_bits, self.bloom_probes):
+            found &= (self.bloom[positions >> 3] >> (7 - (positions & 7)).astype(np.uint8)) & 1 == 1
+        candidates = np.flatnonzero(found)
+        if len(candidates) and len(self.keys):
+            probe = hashes[candidates]
+            slots = np.minimum(np.searchsorted(self.keys, probe), len(self.keys) - 1)
+            found[candidates] = self.keys[slots] == probe
+        else:
+            found[:] = False
+        return found
+
+
+def _reference_dir(name: str) -> str:
+    # The hash suffix keeps names that sanitise alike ("a b", "a_b") apart
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", name)
+    return os.path.join(REFERENCE_INDEX_DIR, f"{safe}-{xxhash.xxh3_64_hexdigest(name.encode())[:8]}")
+
+
+def _current_version(path: str) -> str:
+    """Name of the live version directory of a reference, or None."""
+    try:
+        with open(os.path.join(path, "current")) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def list_references() -> list:
+    """Manifests of every registered reference dataset."""
+    if not os.path.isdir(REFERENCE_INDEX_DIR):
+        return []
+    manifests = []
+    for entry in sorted(os.listdir(REFERENCE_INDEX_DIR)):
+        path = os.path.join(REFERENCE_INDEX_DIR, entry)
+        version = _current_version(path)
+        if entry.startswith(".") or version is None:
+            continue
+        try:
+            with open(os.path.join(path, version, "manifest.json")) as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    # Indexes of replaced or removed references are not looked up again
+    live = {(m["name"], m["version"]) for m in manifests}
+    for cache_key in [key for key in _loaded if key not in live]:
+        del _loaded[cache_key]
+    return manifests
+
+
+def references_version(manifests: list = None) -> str:
+    """Changes whenever a reference is registered, replaced or removed (part of the profile cache key)."""
+    return xxhash.xxh3_64_hexdigest(json.dumps(
+        [(m["name"], m["created_at"]) for m in (list_references() if manifests is None else manifests)]
+    ))
+
+
+def load_reference(manifest: dict) -> ReferenceIndex:
+    cache_key = (manifest["name"], manifest["version"])
+    if cache_key not in _loaded:
+        _loaded[cache_key] = ReferenceIndex(os.path.join(_reference_dir(manifest["name"]), manifest["version"]), manifest)
+    return _loaded[cache_key]
+
+
+def _reference_keys(chunks, key_column: str) -> tuple:
+    """(sorted distinct key hashes, rows read) over DataFrame chunks."""
+    held, rows = [], 0
+    for chunk in chunks:
+        if key_column not in chunk.columns:
+            raise HTTPException(status_code=400, detail=f"Key column '{key_column}' not found in reference file.")
+        rows += len(chunk)
+        held.append(pd.unique(key_hashes(chunk[key_column])))
+    keys = np.unique(np.concatenate(held)) if held else np.empty(0, dtype=np.uint64)
+    return keys.astype(np.uint64), rows
+
+
+def register_reference(file: UploadFile, name: str, key_column: str, foreign_keys: list = None) -> dict:
+    """
+    Builds and persists the key index of a reference dataset. Profiled files
+    are checked against it on columns named in `foreign_keys` (default: the
+    key column's own name). Registering an existing name replaces it.
+    Blocking; the endpoint runs it in the threadpool.
+    """
+    from services.ingestion import spool_upload, read_dataframe, _read_chunks, STREAMABLE_EXTENSIONS, PROFILE_CHUNK_ROWS
+
+    name = name.strip()
+    if not name or not key_column.strip():
+        raise HTTPException(status_code=400, detail="A reference needs a name and a key column.")
+    print(f"\n📚 [References]: Indexing '{key_column}' of {file.filename} as '{name}'")
+
+    lower = file.filename.lower()
+    with spool_upload(file) as buffer:
+        try:
+            if lower.endswith(STREAMABLE_EXTENSIONS):
+                try:
+                    keys, rows = _reference_keys(_read_chunks(buffer, lower, PROFILE_CHUNK_ROWS, columns=[key_column]), key_column)
+                except UnicodeDecodeError:
+                    buffer.seek(0)
+                    keys, rows = _reference_keys(_read_chunks(buffer, lower, PROFILE_CHUNK_ROWS, encoding='latin1', columns=[key_column]), key_column)
+            else:
+                keys, rows = _reference_keys([read_dataframe(buffer, file.filename, [key_column])], key_column)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error processing reference file: {str(e)}")
+
+    bloom, probes = build_bloom(keys)
+    path = _reference_dir(name)
+    os.makedirs(path, exist_ok=True)
+    version_dir = tempfile.mkdtemp(prefix="v-", dir=path)
+    manifest = {
+        "name": name,
+        "version": os.path.basename(version_dir),
+        "filename": file.filename,
+        "key_column": key_column,
+        "foreign_keys": sorted({fk.strip() for fk in foreign_keys or [] if fk.strip()} or {key_column}),
+        "rows": rows,
+        "distinct_keys": len(keys),
+        "bloom_bits": len(bloom) * 8,
+        "bloom_probes": probes,
+        "index_bytes": keys.nbytes + bloom.nbytes,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+    # Written in full before the pointer names it, so profiling never sees half an index
+    np.save(os.path.join(version_dir, "keys.npy"), keys)
+    np.save(os.path.join(version_dir, "bloom.npy"), bloom)
+    with open(os.path.join(version_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    replaced = _current_version(path)
+    pointer = os.path.join(path, ".current")
+    with open(pointer, "w") as f:
+        f.write(manifest["version"])
+    os.replace(pointer, os.path.join(path, "current"))
+    _remove_versions(path, keep={manifest["version"], replaced})
+    _forget(name)
+    print(f"✅ [References]: '{name}' has {len(keys)} distinct keys from {rows} rows ({manifest['index_bytes']} bytes)")
+    return manifest
+
+
+def _forget(name: str):
+    # Other processes drop their copies on their next list_references()
+    for cache_key in [key for key in _loaded if key[0] == name]:
+        del _loaded[cache_key]
+
+
+def _remove_versions(path: str, keep: set):
+    """
+    Deletes the version directories of a reference except `keep` and the live
+    one. The version just replaced is kept, so a profile that listed it before
+    the swap can still load it.
+    """
+    keep = keep | {_current_version(path)}
+    for entry in os.listdir(path):
+        if entry.startswith("v-") and entry not in keep:
+            shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+
+def delete_reference(name: str):
+    path = _reference_dir(name)
+    if _current_version(path) is None:
+        raise HTTPException(status_code=404, detail=f"Reference '{name}' not found.")
+    # Unlisted as soon as the pointer is gone; the files follow
+    os.remove(os.path.join(path, "current"))
+    shutil.rmtree(path, ignore_errors=True)
+    _forget(name)
+
+
+class ReferenceAccumulator:
+    """
+    Foreign key hit rates over a stream of chunks: every non-null value of a
+    column named in a reference's foreign_keys is looked up in that
+    reference's index.
+    """
+
+    def __init__(self, references: list = None):
+        self.references = list_references() if references is None else references
+        self.counts = {}
+
+    def _matches(self, column) -> list:
+        name = str(column).lower()
+        return [m for m in self.references if name in (fk.lower() for fk in m["foreign_keys"])]
+
+    def update(self, chunk: pd.DataFrame):
+        if not self.references:
+            return
+        for column in chunk.columns:
+            matches = self._matches(column)
+            if not matches:
+                continue
+            hashes = key_hashes(chunk[column])
+            for manifest in matches:
+                counts = self.counts.setdefault((column, manifest["name"]), [0, 0])
+                counts[0] += len(hashes)
+                counts[1] += int(load_reference(manifest).contains(hashes).sum())
+
+    def update_arrow(self, table: pa.Table):
+        if not self.references:
+            return
+        matched = [col for col in table.column_names if self._matches(col)]
+        if matched:
+            self.update(table.select(matched).to_pandas())
+
+    def to_state(self) -> dict:
+        """Counts and the reference versions they were taken against, for stored (incremental) profiles."""
+        return {
+            "version": references_version(self.references),
+            "counts": [[column, reference, values, hits] for (column, reference), (values, hits) in self.counts.items()]
+        }
+
+    def merge_state(self, state: dict) -> bool:
+        """
+        Adds counts from to_state(). Returns False (adding nothing) if the
+        registered references changed since, as the counts no longer compare.
+        """
+        if state["version"] != references_version(self.references):
+            return False
+        for column, reference, values, hits in state["counts"]:
+            counts = self.counts.setdefault((column, reference), [0, 0])
+            counts[0] += values
+            counts[1] += hits
+        return True
+
+    def finalize(self) -> dict:
+        """The `referential_integrity` block of a profile, or None if no column matched a reference."""
+        if not self.counts:
+            return None
+        by_name = {m["name"]: m for m in self.references}
+        foreign_keys = [{
+            "column": column,
+            "reference": reference,
+            "reference_column": by_name[reference]["key_column"],
+            "values": values,
+            "hits": hits,
+            "hit_pct": percentage(hits, values) if values else 100.0
+        } for (column, reference), (values, hits) in self.counts.items()]
+        values = sum(fk["values"] for fk in foreign_keys)
+        hits = sum(fk["hits"] for fk in foreign_keys)
+        return {
+            "values": values,
+            "hits": hits,
+            "hit_pct": percentage(hits, values) if values else 100.0,
+            "foreign_keys": foreign_keys
+        }
+
+
+def profile_references(df: pd.DataFrame) -> dict:
+    """referential_integrity for an in-memory DataFrame."""
+    accumulator = ReferenceAccumulator()
+    accumulator.update(df)
+    return accumulator.finalize()
+
+
+def profile_arrow_references(table: pa.Table) -> dict:
+    """referential_integrity for an Arrow table."""
+    accumulator = ReferenceAccumulator()
+    accumulator.update_arrow(table)
+    return accumulator.finalize()
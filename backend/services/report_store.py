@@ -0,0 +1,75 @@
+import os
+import uuid
+import tempfile
+from fastapi import HTTPException
+from services.cache import LRUCache
+from services.provenance import provenance_service
+from services.scoring import calculate_scores
+from core.rules_engine import RulesEngine
+
+# Analysed reports, so re-evaluate and chat can send a report ID instead of
+# posting the whole metadata back. REPORT_STORE_DIR="" keeps them in memory only.
+REPORT_STORE_ENTRIES = int(os.environ.get("REPORT_STORE_ENTRIES", 256))
+REPORT_STORE_MAX_MB = int(os.environ.get("REPORT_STORE_MAX_MB", 256))
+REPORT_STORE_DISK_MB = int(os.environ.get("REPORT_STORE_DISK_MB", 1024))
+REPORT_STORE_TTL = int(os.environ.get("REPORT_STORE_TTL", 24 * 3600))
+REPORT_STORE_DIR = os.environ.get("REPORT_STORE_DIR", os.path.join(tempfile.gettempdir(), "finaudit-report-store"))
+# Scores per (metadata hash, standard). In memory only: rule packs can change
+# between restarts.
+SCORE_MEMO_ENTRIES = int(os.environ.get("SCORE_MEMO_ENTRIES", 1024))
+
+report_store = LRUCache(
+    "report-store",
+    max_entries=REPORT_STORE_ENTRIES,
+    max_bytes=REPORT_STORE_MAX_MB * 1024 * 1024,
+    ttl=REPORT_STORE_TTL,
+    disk_dir=REPORT_STORE_DIR,
+    disk_max_bytes=REPORT_STORE_DISK_MB * 1024 * 1024
+)
+score_memo = LRUCache("scores", max_entries=SCORE_MEMO_ENTRIES, ttl=REPORT_STORE_TTL)
+
+
+def save_report(metadata: dict, metadata_hash: str, standard_scores: dict, analysis: dict, filename: str = None,
+                advisory: dict = None) -> str:
+    """
+    Stores an analysed report and seeds the score memo with every standard.
+    `advisory` tracks a deferred AI analysis (see services/advisory.py).
+    Returns the report ID.
+    """
+    for standard, scores in standard_scores.items():
+        score_memo.set(f"{metadata_hash}:{standard}", scores)
+    report_id = uuid.uuid4().hex
+    report_store.set(report_id, {
+        "filename": filename,
+        "metadata": metadata,
+        "metadata_hash": metadata_hash,
+        # Latest AI analysis per standard, for chat context
+        "analyses": {"General Transaction": analysis},
+        "advisory": advisory
+    })
+    return report_id
+
+
+def load_report(report_id: str) -> dict:
+    report = report_store.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Report '{report_id}' not found or expired.")
+    return report
+
+
+def save_analysis(report_id: str, report: dict, standard: str, analysis: dict):
+    # Re-read: a deferred advisory may have landed while this one was running
+    report = report_store.get(report_id) or report
+    report["analyses"][standard] = analysis
+    report_store.set(report_id, report)
+
+
+def scores_for(metadata: dict, standard: str, metadata_hash: str = None) -> dict:
+    """calculate_scores() for a standard, memoized on (metadata hash, standard)."""
+    metadata_hash = metadata_hash or provenance_service.compute_fingerprint(metadata)
+    memo_key = f"{metadata_hash}:{standard}"
+    scores = score_memo.get(memo_key)
+    if scores is None:
+        scores = calculate_scores(RulesEngine(metadata).run_compliance(standard))
+        score_memo.set(memo_key, scores)
+    return scores
@@ -0,0 +1,232 @@
+import os
+import shutil
+import tempfile
+from itertools import combinations
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from services.column_stats import percentage
+
+# Whole-row duplicates and candidate keys are found by hashing every row to
+# 64 bits. Each counter keeps up to ROW_HASH_MEMORY_ROWS distinct hashes in
+# memory and then spills them to ROW_HASH_PARTITIONS files, counted one
+# partition at a time.
+ROW_HASH_MEMORY_ROWS = int(os.environ.get("ROW_HASH_MEMORY_ROWS", 5_000_000))
+ROW_HASH_PARTITIONS = int(os.environ.get("ROW_HASH_PARTITIONS", 64))
+# Candidate keys: single columns or combinations of up to KEY_MAX_COLUMNS of
+# the KEY_SEARCH_COLUMNS most distinct columns, at most KEY_MAX_CANDIDATES,
+# chosen on the first KEY_SAMPLE_ROWS rows.
+KEY_MAX_COLUMNS = int(os.environ.get("KEY_MAX_COLUMNS", 3))
+KEY_SEARCH_COLUMNS = int(os.environ.get("KEY_SEARCH_COLUMNS", 6))
+KEY_MAX_CANDIDATES = int(os.environ.get("KEY_MAX_CANDIDATES", 8))
+KEY_SAMPLE_ROWS = int(os.environ.get("KEY_SAMPLE_ROWS", 50_000))
+
+NULL_HASH = np.uint64(0)
+_MIX = np.uint64(0x100000001B3)
+
+
+def column_hashes(col_series: pd.Series) -> np.ndarray:
+    """
+    64-bit hash per value. Numbers hash as float64, so the same value hashes
+    alike in int and float chunks; nulls all hash to NULL_HASH.
+    """
+    nulls = col_series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(col_series) or pd.api.types.is_numeric_dtype(col_series):
+        hashes = pd.util.hash_array(col_series.to_numpy(dtype=np.float64, na_value=np.nan))
+    elif pd.api.types.is_datetime64_any_dtype(col_series):
+        hashes = pd.util.hash_array(col_series.array.asi8)
+    else:
+        try:
+            hashes = pd.util.hash_array(col_series.to_numpy(dtype=object), categorize=True)
+        except TypeError:
+            # Unhashable values (nested NDJSON objects) hash by their text
+            hashes = pd.util.hash_array(col_series.astype(str).to_numpy(dtype=object), categorize=True)
+    hashes[nulls] = NULL_HASH
+    return hashes
+
+
+def arrow_column_hashes(column: pa.ChunkedArray) -> np.ndarray:
+    """column_hashes() for an Arrow column; text is hashed once per distinct value."""
+    if pa.types.is_dictionary(column.type):
+        column = pc.cast(column, column.type.value_type)
+    nulls = column.is_null().to_numpy(zero_copy_only=False)
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type) or pa.types.is_boolean(column.type):
+        hashes = pd.util.hash_array(pc.cast(column, pa.float64(), safe=False).to_numpy(zero_copy_only=False))
+    elif not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type) or pa.types.is_binary(column.type)):
+        return column_hashes(column.to_pandas())
+    else:
+        encoded = pc.dictionary_encode(column).combine_chunks()
+        distinct = pd.util.hash_array(encoded.dictionary.to_numpy(zero_copy_only=False).astype(object))
+        codes = encoded.indices.fill_null(0).to_numpy(zero_copy_only=False)
+        hashes = distinct[codes] if len(distinct) else np.zeros(len(codes), dtype=np.uint64)
+    hashes[nulls] = NULL_HASH
+    return hashes
+
+
+def combine_hashes(hashes: list) -> np.ndarray:
+    """Order-sensitive combination of per-column hashes into one hash per row."""
+    combined = hashes[0].copy()
+    for h in hashes[1:]:
+        combined *= _MIX
+        combined ^= h
+    return combined
+
+
+class HashCounter:
+    """Counts distinct 64-bit hashes in bounded memory, spilling to disk partitions."""
+
+    def __init__(self, memory_rows: int = ROW_HASH_MEMORY_ROWS, partitions: int = ROW_HASH_PARTITIONS):
+        self.memory_rows = memory_rows
+        self.partitions = partitions
+        self.rows = 0
+        self._held = []
+        self._held_rows = 0
+        self._spill_dir = None
+
+    def add(self, hashes: np.ndarray):
+        self.rows += len(hashes)
+        self._held.append(hashes)
+        self._held_rows += len(hashes)
+        if self._held_rows > self.memory_rows:
+            held = pd.unique(np.concatenate(self._held))
+            self._held, self._held_rows = [held], len(held)
+            if len(held) > self.memory_rows // 2:
+                self._spill()
+
+    def _partition_of(self, hashes: np.ndarray) -> np.ndarray:
+        return (hashes % np.uint64(self.partitions)).astype(np.int64)
+
+    def _spill(self):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="finaudit-row-hashes-")
+        held = np.concatenate(self._held)
+        parts = self._partition_of(held)
+        order = np.argsort(parts, kind="stable")
+        bounds = np.searchsorted(parts[order], np.arange(self.partitions + 1))
+        for part in range(self.partitions):
+            chunk = held[order[bounds[part]:bounds[part + 1]]]
+            if len(chunk):
+                with open(os.path.join(self._spill_dir, f"{part}.u64"), "ab") as f:
+                    chunk.tofile(f)
+        self._held, self._held_rows = [], 0
+
+    def distinct(self) -> int:
+        held = np.concatenate(self._held) if self._held else np.empty(0, dtype=np.uint64)
+        if self._spill_dir is None:
+            return len(pd.unique(held))
+        parts = self._partition_of(held)
+        total = 0
+        for part in range(self.partitions):
+            path = os.path.join(self._spill_dir, f"{part}.u64")
+            spilled = np.fromfile(path, dtype=np.uint64) if os.path.exists(path) else np.empty(0, dtype=np.uint64)
+            total += len(pd.unique(np.concatenate([spilled, held[parts == part]])))
+        return total
+
+    def close(self):
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+
+def candidate_keys(hashes: list, row_distinct: int) -> list:
+    """
+    Column positions that tell the rows of a sample apart as well as the
+    whole row does: single columns first, then minimal combinations of the
+    most distinct columns.
+    """
+    if not row_distinct:
+        return []
+    distinct = [len(pd.unique(h)) for h in hashes]
+    ranked = sorted(range(len(hashes)), key=lambda pos: -distinct[pos])[:KEY_SEARCH_COLUMNS]
+    keys = [(pos,) for pos in ranked if distinct[pos] == row_distinct]
+    for size in range(2, KEY_MAX_COLUMNS + 1):
+        for combo in combinations(sorted(ranked), size):
+            if len(keys) >= KEY_MAX_CANDIDATES:
+                return keys
+            if any(set(key) <= set(combo) for key in keys):
+                continue
+            if len(pd.unique(combine_hashes([hashes[pos] for pos in combo]))) == row_distinct:
+                keys.append(combo)
+    return keys[:KEY_MAX_CANDIDATES]
+
+
+class RowKeyAccumulator:
+    """
+    Whole-row duplicates and candidate key uniqueness over a stream of
+    chunks. Candidate keys are chosen on the first chunk and then counted
+    exactly (up to 64-bit hash collisions) over every row.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.keys = None
+        self.rows = HashCounter()
+        self.key_counters = []
+
+    def update_hashes(self, columns: list, hashes: list):
+        if not hashes:
+            return
+        if self.columns is None:
+            self.columns = list(columns)
+        elif list(columns) != self.columns:
+            # Align later chunks to the first chunk's columns; missing ones are null
+            by_name = dict(zip(columns, hashes))
+            hashes = [by_name.get(col, np.full(len(hashes[0]), NULL_HASH)) for col in self.columns]
+
+        row_hashes = combine_hashes(hashes)
+        if self.keys is None:
+            sample = [h[:KEY_SAMPLE_ROWS] for h in hashes]
+            self.keys = candidate_keys(sample, len(pd.unique(row_hashes[:KEY_SAMPLE_ROWS])))
+            self.key_counters = [HashCounter() for _ in self.keys]
+        self.rows.add(row_hashes)
+        for key, counter in zip(self.keys, self.key_counters):
+            counter.add(hashes[key[0]] if len(key) == 1 else combine_hashes([hashes[pos] for pos in key]))
+
+    def update(self, chunk: pd.DataFrame):
+        self.update_hashes(list(chunk.columns), [column_hashes(chunk.iloc[:, pos]) for pos in range(chunk.shape[1])])
+
+    def update_arrow(self, table: pa.Table):
+        self.update_hashes(table.column_names, [arrow_column_hashes(column) for column in table.columns])
+
+    def finalize(self) -> dict:
+        """The `row_uniqueness` block of a profile."""
+        try:
+            rows = self.rows.rows
+            duplicate_rows = rows - self.rows.distinct()
+            keys = []
+            for key, counter in zip(self.keys or [], self.key_counters):
+                distinct = counter.distinct()
+                keys.append({
+                    "columns": [self.columns[pos] for pos in key],
+                    "duplicate_count": rows - distinct,
+                    "uniqueness_pct": percentage(distinct, rows)
+                })
+        finally:
+            self.close()
+        keys.sort(key=lambda k: (-k["uniqueness_pct"], len(k["columns"])))
+        return {
+            "rows": rows,
+            "duplicate_rows": duplicate_rows,
+            "duplicate_row_pct": percentage(duplicate_rows, rows),
+            "candidate_keys": keys
+        }
+
+    def close(self):
+        self.rows.close()
+        for counter in self.key_counters:
+            counter.close()
+
+
+def profile_rows(df: pd.DataFrame) -> dict:
+    """row_uniqueness for an in-memory DataFrame."""
+    accumulator = RowKeyAccumulator()
+    accumulator.update(df)
+    return accumulator.finalize()
+
+
+def profile_arrow_rows(table: pa.Table) -> dict:
+    """row_uniqueness for an Arrow table."""
+    accumulator = RowKeyAccumulator()
+    accumulator.update_arrow(table)
+    return accumulator.finalize()
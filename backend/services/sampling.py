@@ -0,0 +1,196 @@
+import os
+import math
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from services.column_stats import PATTERNS, percentage
+
+# Sampled profiling settings. SAMPLE_SEED makes samples reproducible.
+SAMPLE_CONFIDENCE = float(os.environ.get("SAMPLE_CONFIDENCE", 0.95))
+SAMPLE_SEED = int(os.environ["SAMPLE_SEED"]) if os.environ.get("SAMPLE_SEED") else None
+# Stratified sampling keeps a reservoir per stratum, so the stratum count is capped
+MAX_STRATA = int(os.environ.get("SAMPLE_MAX_STRATA", 1000))
+
+
+def _keep_smallest(keys: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k smallest keys, in their original order."""
+    if len(keys) <= k:
+        return np.arange(len(keys))
+    return np.sort(np.argpartition(keys, k)[:k])
+
+
+def reservoir_sample(chunks, sample_rows: int, seed: int = None):
+    """
+    Uniform sample of `sample_rows` rows from an iterable of DataFrame chunks.
+
+    Every row gets a random key and the rows with the smallest keys are kept,
+    which is equivalent to a reservoir sample but vectorised per chunk.
+    Memory is bounded by sample_rows plus one chunk. Returns (sample, total_rows).
+    """
+    rng = np.random.default_rng(seed)
+    sample, keys, total_rows = None, np.empty(0), 0
+    for chunk in chunks:
+        total_rows += len(chunk)
+        chunk = chunk.reset_index(drop=True)
+        if sample is None:
+            sample, keys = chunk, rng.random(len(chunk))
+        else:
+            sample = pd.concat([sample, chunk], ignore_index=True)
+            keys = np.concatenate([keys, rng.random(len(chunk))])
+        keep = _keep_smallest(keys, sample_rows)
+        sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+
+    if sample is None:
+        sample = pd.DataFrame()
+    return sample, total_rows
+
+
+def stratified_sample(chunks, sample_rows: int, stratify_by: str, seed: int = None):
+    """
+    Proportionally allocated stratified sample over the values of `stratify_by`
+    (nulls form their own stratum). Each stratum gets round(sample_rows * share)
+    rows and at least one, so rare strata are always represented.
+    Returns (sample, total_rows).
+    """
+    rng = np.random.default_rng(seed)
+    sample, keys, total_rows = None, np.empty(0), 0
+    stratum_sizes = pd.Series(dtype="int64")
+    for chunk in chunks:
+        if stratify_by not in chunk.columns:
+            raise HTTPException(status_code=400, detail=f"Stratification column '{stratify_by}' not found.")
+        total_rows += len(chunk)
+        chunk = chunk.reset_index(drop=True)
+        stratum_sizes = stratum_sizes.add(chunk[stratify_by].value_counts(dropna=False), fill_value=0)
+        if len(stratum_sizes) > MAX_STRATA:
+            raise HTTPException(status_code=400, detail=f"Stratification column '{stratify_by}' has more than {MAX_STRATA} distinct values.")
+
+        if sample is None:
+            sample, keys = chunk, rng.random(len(chunk))
+        else:
+            sample = pd.concat([sample, chunk], ignore_index=True)
+            keys = np.concatenate([keys, rng.random(len(chunk))])
+        # No stratum can need more than sample_rows rows
+        keep = np.flatnonzero(_stratum_rank(sample[stratify_by], keys) <= sample_rows)
+        sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+
+    if sample is None:
+        return pd.DataFrame(), 0
+
+    allocation = (stratum_sizes * sample_rows / total_rows).round().clip(lower=1)
+    quota = sample[stratify_by].map(allocation)
+    if sample[stratify_by].isna().any() and stratum_sizes.index.isna().any():
+        quota = quota.fillna(allocation[stratum_sizes.index.isna()].iloc[0])
+    keep = np.flatnonzero(_stratum_rank(sample[stratify_by], keys) <= quota.to_numpy())
+    return sample.iloc[keep].reset_index(drop=True), total_rows
+
+
+def _stratum_rank(strata: pd.Series, keys: np.ndarray) -> np.ndarray:
+    return pd.Series(keys).groupby(strata.to_numpy(), dropna=False).rank(method="first").to_numpy()
+
+
+def wilson_interval(successes: int, n: int, population: int = None, confidence: float = SAMPLE_CONFIDENCE) -> list:
+    """
+    Wilson score interval for a proportion, as [low, high] percentages (2dp).
+    The finite population correction narrows the interval as the sample
+    approaches the whole population.
+    """
+    if not n:
+        return [0.0, 100.0]
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    if population and population > 1:
+        z *= math.sqrt(max(0.0, (population - n) / (population - 1)))
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return [round(max(0.0, centre - margin) * 100, 2), round(min(1.0, centre + margin) * 100, 2)]
+
+
+def _estimate_distinct(col_series: pd.Series, population_rows: int) -> int:
+    """
+    First-order distinct estimate: values seen once in the sample stand for
+    values not yet seen in the rest of the population.
+    """
+    clean_series = col_series.dropna()
+    n = len(clean_series)
+    if not n:
+        return 0
+    frequencies = clean_series.value_counts(sort=False)
+    singletons = int((frequencies == 1).sum())
+    estimate = len(frequencies) + singletons * (population_rows - len(col_series)) / len(col_series)
+    non_null_rows = population_rows * n / len(col_series)
+    return int(round(min(estimate, non_null_rows)))
+
+
+def extrapolate_profile(profile: dict, sample: pd.DataFrame, population_rows: int, method: str, stratify_by: str = None) -> dict:
+    """
+    Turns a profile_dataset() profile of a sample into an estimate for the full
+    file: counts are scaled to population_rows, percentages keep their sample
+    values and gain `<name>_ci` confidence intervals, and distinct counts are
+    flagged approximate so the rules engine applies a tolerance.
+    """
+    n = profile["total_rows"]
+    scale = population_rows / n if n else 0
+    count_error = round(1 / math.sqrt(n), 6) if n else 1.0
+
+    for col, stats in profile["columns"].items():
+        stats["null_percentage_ci"] = wilson_interval(stats["null_count"], n, population_rows)
+        stats["null_count"] = int(round(stats["null_count"] * scale))
+        for pat_name in PATTERNS:
+            count_key = f"{pat_name}_match_count"
+            if count_key in stats:
+                stats[f"{pat_name}_match_percentage_ci"] = wilson_interval(stats[count_key], n, population_rows)
+                stats[count_key] = int(round(stats[count_key] * scale))
+        for count_key in ("negative_count", "zero_count", "date_value_count", "non_iso_date_count", "impossible_date_count"):
+            if count_key in stats:
+                stats[count_key] = int(round(stats[count_key] * scale))
+        if "sum" in stats:
+            stats["sum"] = stats["sum"] * scale
+        for entry in stats.get("top_values", []):
+            entry["count"] = int(round(entry["count"] * scale))
+        if n < population_rows:
+            stats["unique_count"] = _estimate_distinct(sample[col], population_rows)
+            stats["unique_count_approx"] = True
+            stats["unique_count_error"] = max(stats.get("unique_count_error", 0), count_error)
+
+    # Copies of a row rarely land in the same uniform sample, so the sample's
+    # duplicate and key counts say little about the file; leave them out.
+    profile.pop("row_uniqueness", None)
+    profile["unmeasured"] = ["row_uniqueness"]
+    references = profile.get("referential_integrity")
+    if references:
+        # A foreign key hit rate is a proportion like the others: keep it, with an interval
+        for block in [references, *references["foreign_keys"]]:
+            block["hit_pct_ci"] = wilson_interval(block["hits"], block["values"], int(round(block["values"] * scale)))
+            block["values"], block["hits"] = int(round(block["values"] * scale)), int(round(block["hits"] * scale))
+    profile["total_rows"] = population_rows
+    profile["sample"] = {
+        "method": method,
+        "rows": n,
+        "population_rows": population_rows,
+        "fraction": percentage(n, population_rows),
+        "confidence": SAMPLE_CONFIDENCE,
+        "stratify_by": stratify_by
+    }
+    return profile
+
+
+def profile_sample(chunks, sample_rows: int, stratify_by: str = None, seed: int = SAMPLE_SEED) -> dict:
+    """
+    Profiles a reservoir (or stratified, when `stratify_by` is set) sample of
+    `sample_rows` rows from DataFrame chunks and extrapolates it to the full
+    row count. The result has the profile_dataset() shape plus a `sample`
+    block and confidence intervals.
+    """
+    from services.ingestion import profile_dataset
+
+    if sample_rows <= 0:
+        raise HTTPException(status_code=400, detail="sample_rows must be a positive integer.")
+    if stratify_by:
+        sample, total_rows = stratified_sample(chunks, sample_rows, stratify_by, seed)
+        method = "stratified"
+    else:
+        sample, total_rows = reservoir_sample(chunks, sample_rows, seed)
+        method = "reservoir"
+    return extrapolate_profile(profile_dataset(sample), sample, total_rows, method, stratify_by)
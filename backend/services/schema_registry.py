@@ -0,0 +1,291 @@
+import os
+import re
+import json
+import time
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import xxhash
+from fastapi import HTTPException
+from core.rules_engine import COLUMN_ROLES
+from services.column_stats import TOP_K, percentage
+
+# Accepted schema fingerprints per dataset lineage (source system / feed), one
+# JSON file each. A fingerprint keeps what drift is judged on (column names,
+# kinds, null rates and the hashed status codes) so a new profile is compared
+# without touching the old file.
+SCHEMA_REGISTRY_DIR = os.environ.get("SCHEMA_REGISTRY_DIR", os.path.join(tempfile.gettempdir(), "finaudit-schema-registry"))
+# A column's null rate may move this many percentage points before it counts as drift
+SCHEMA_NULL_SHIFT_PCT = float(os.environ.get("SCHEMA_NULL_SHIFT_PCT", 20))
+# Accepted versions listed in a lineage's history
+SCHEMA_HISTORY_VERSIONS = int(os.environ.get("SCHEMA_HISTORY_VERSIONS", 50))
+# A lineage lock older than this is taken to belong to a crashed process
+SCHEMA_LOCK_TIMEOUT = float(os.environ.get("SCHEMA_LOCK_TIMEOUT", 30))
+
+# Stripped from file names used as lineages: download copy markers and
+# dates/timestamps, so "report (1).csv" or "txns_2024-10-17.csv" keep the
+# lineage of "report.csv" and "txns.csv"
+_COPY_MARKER = re.compile(r"(\s*\(\d+\)|[\s_-]+(-\s*)?copy(\s*\d+)?)+$")
+_DATE_STAMP = re.compile(r"(?<![0-9])(19|20)\d{2}[-_.]?\d{2}[-_.]?\d{2}([tT_ -]?\d{2}[-_:.]?\d{2}([-_:.]?\d{2})?)?(?![0-9])")
+
+_STATUS_COLUMN = re.compile(COLUMN_ROLES["status"], re.IGNORECASE)
+_loaded = {}
+
+
+def _column_kind(stats: dict) -> str:
+    # int64 -> float64 when nulls appear, or a different parser, is not drift
+    if stats.get("dtype") == "bool":
+        return "boolean"
+    if "date_format" in stats or str(stats.get("dtype", "")).startswith(("datetime", "timestamp")):
+        return "date"
+    return "numeric" if stats.get("is_numeric") else "text"
+
+
+def schema_fingerprint(metadata: dict) -> dict:
+    """The parts of a profile that schema drift is judged on; no raw values."""
+    columns = {}
+    for col, stats in metadata.get("columns", {}).items():
+        entry = {"kind": _column_kind(stats), "null_percentage": stats.get("null_percentage", 0)}
+        top = stats.get("top_values")
+        if _STATUS_COLUMN.search(col) and top and stats.get("unique_count", TOP_K + 1) <= TOP_K:
+            # Every code of a low-cardinality status column is in top_values
+            entry["status_values"] = sorted(v["hash"] for v in top)
+        columns[col] = entry
+    return {"schema_hash": _structure_hash(columns), "columns": columns}
+
+
+def _structure_hash(columns: dict) -> str:
+    return xxhash.xxh3_64_hexdigest(json.dumps([(col, entry["kind"]) for col, entry in columns.items()]))
+
+
+def _project(fingerprint: dict, columns: list) -> dict:
+    """The fingerprint restricted to the columns a projected profile read."""
+    wanted = set(columns)
+    kept = {col: entry for col, entry in fingerprint["columns"].items() if col in wanted}
+    return {"schema_hash": _structure_hash(kept), "columns": kept}
+
+
+def _fingerprint_hash(fingerprint: dict) -> str:
+    return xxhash.xxh3_64_hexdigest(json.dumps(fingerprint, sort_keys=True))
+
+
+def default_lineage(filename: str) -> str:
+    """Lineage of an upload sent without one: its file name, without extension, copy markers or dates."""
+    name = os.path.basename(filename.replace("\\", "/"))
+    stem = os.path.splitext(name)[0].lower()
+    stem = _COPY_MARKER.sub("", stem)
+    stem = re.sub(r"[\s_.-]+", "_", _DATE_STAMP.sub("", stem)).strip("_")
+    return stem or name
+
+
+def _registry_path(lineage: str) -> str:
+    return os.path.join(SCHEMA_REGISTRY_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", lineage) + ".json")
+
+
+@contextmanager
+def _locked(lineage: str):
+    """
+    Serialises reading and writing a lineage's entry across processes (job
+    workers): an O_EXCL lock file next to it.
+    """
+    os.makedirs(SCHEMA_REGISTRY_DIR, exist_ok=True)
+    lock = _registry_path(lineage) + ".lock"
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > SCHEMA_LOCK_TIMEOUT:
+                    os.remove(lock)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock)
+        except OSError:
+            pass
+
+
+def load_schema(lineage: str) -> dict:
+    """The lineage's registry entry (accepted fingerprint and history), or None."""
+    path = _registry_path(lineage)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    # Every write replaces the file, so a new inode means a new version
+    version = (stat.st_ino, stat.st_mtime_ns)
+    if _loaded.get(path, (None,))[0] != version:
+        with open(path) as f:
+            _loaded[path] = (version, json.load(f))
+    return _loaded[path][1]
+
+
+def get_schema(lineage: str) -> dict:
+    entry = load_schema(lineage)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No accepted schema for lineage '{lineage}'.")
+    return entry
+
+
+def schema_version(lineage: str) -> int:
+    """Accepted version number of a lineage (None before its first profile); part of the profile cache key."""
+    entry = load_schema(lineage) if lineage else None
+    return entry["version"] if entry else None
+
+
+def list_schemas() -> list:
+    if not os.path.isdir(SCHEMA_REGISTRY_DIR):
+        return []
+    summaries = []
+    for entry in sorted(os.listdir(SCHEMA_REGISTRY_DIR)):
+        if entry.startswith(".") or not entry.endswith(".json"):
+            continue
+        with open(os.path.join(SCHEMA_REGISTRY_DIR, entry)) as f:
+            schema = json.load(f)
+        summaries.append({
+            "lineage": schema["lineage"],
+            "version": schema["version"],
+            "accepted_at": schema["accepted_at"],
+            "filename": schema["filename"],
+            "total_columns": len(schema["fingerprint"]["columns"])
+        })
+    return summaries
+
+
+def _is_partial(metadata: dict, columns: list = None) -> bool:
+    # Sampled or column-projected profiles do not describe the whole schema
+    return bool(columns or metadata.get("sample") or (metadata.get("schema_drift") or {}).get("columns"))
+
+
+def accept_schema(lineage: str, metadata: dict, filename: str = None) -> dict:
+    """
+    Makes a profile's fingerprint the lineage's accepted schema (a new
+    version). Sampled and column-projected profiles cannot be accepted.
+    """
+    if _is_partial(metadata):
+        raise HTTPException(status_code=400, detail="Only full profiles (not sampled or column-projected) can be accepted as a schema.")
+    with _locked(lineage):
+        return _accept(lineage, metadata, filename, load_schema(lineage))
+
+
+def _accept(lineage: str, metadata: dict, filename: str, previous: dict) -> dict:
+    # Caller holds the lineage lock and passes the entry it read under it
+    fingerprint = schema_fingerprint(metadata)
+    version = previous["version"] + 1 if previous else 1
+    accepted_at = datetime.now(timezone.utc).isoformat()
+    history = (previous["history"] if previous else []) + [{
+        "version": version, "schema_hash": fingerprint["schema_hash"], "accepted_at": accepted_at, "filename": filename
+    }]
+    entry = {
+        "lineage": lineage,
+        "version": version,
+        "accepted_at": accepted_at,
+        "filename": filename,
+        "fingerprint_hash": _fingerprint_hash(fingerprint),
+        "fingerprint": fingerprint,
+        "history": history[-SCHEMA_HISTORY_VERSIONS:]
+    }
+    fd, staging = tempfile.mkstemp(prefix=".staging-", dir=SCHEMA_REGISTRY_DIR)
+    with os.fdopen(fd, "w") as f:
+        json.dump(entry, f)
+    os.replace(staging, _registry_path(lineage))
+    print(f"📐 [Schema Registry]: '{lineage}' accepted as version {version} ({len(fingerprint['columns'])} columns)")
+    return entry
+
+
+def diff_schema(baseline: dict, fingerprint: dict) -> dict:
+    """
+    Drift of `fingerprint` against an accepted one. Identical schema hashes
+    skip the structural comparison; the rest is one dict lookup per column.
+    """
+    old, new = baseline["columns"], fingerprint["columns"]
+    if baseline["schema_hash"] == fingerprint["schema_hash"]:
+        added, removed, kind_changes = [], [], []
+    else:
+        added = [col for col in new if col not in old]
+        removed = [col for col in old if col not in new]
+        kind_changes = [{"column": col, "from": old[col]["kind"], "to": new[col]["kind"]}
+                        for col in new if col in old and old[col]["kind"] != new[col]["kind"]]
+
+    null_shifts = []
+    for col, entry in new.items():
+        if col not in old:
+            continue
+        shift = entry["null_percentage"] - old[col]["null_percentage"]
+        if abs(shift) > SCHEMA_NULL_SHIFT_PCT:
+            null_shifts.append({"column": col, "from": old[col]["null_percentage"], "to": entry["null_percentage"]})
+
+    drifted = set(added + removed) | {change["column"] for change in kind_changes + null_shifts}
+    return {
+        "added": added,
+        "removed": removed,
+        "kind_changes": kind_changes,
+        "null_shifts": null_shifts,
+        "drifted_columns": len(drifted),
+        "drift_pct": percentage(len(drifted), len(set(old) | set(new))) if old or new else 0.0
+    }
+
+
+def status_mismatch(baseline: dict, metadata: dict) -> float:
+    """
+    % of status values (in status columns known to the baseline) whose code
+    the accepted schema never had, or None if there is nothing to compare.
+    """
+    unknown = total = 0
+    for col, entry in baseline["columns"].items():
+        known = entry.get("status_values")
+        top = metadata.get("columns", {}).get(col, {}).get("top_values")
+        if known is None or not top:
+            continue
+        known = set(known)
+        for value in top:
+            total += value["count"]
+            if value["hash"] not in known:
+                unknown += value["count"]
+    return percentage(unknown, total) if total else None
+
+
+def check_schema(metadata: dict, lineage: str, filename: str = None, columns: list = None) -> dict:
+    """
+    Compares a profile with the lineage's accepted schema and records the
+    result as metadata["schema_drift"]. The first full profile of a lineage
+    becomes its baseline; after that only accept_schema() moves it, so slow
+    drift is always measured against the accepted version. A profile of
+    selected `columns` is compared on those columns only; neither it nor a
+    sampled profile ever becomes the baseline.
+    """
+    fingerprint = schema_fingerprint(metadata)
+    partial = _is_partial(metadata, columns)
+    drift = None
+    baseline = load_schema(lineage)
+    if baseline is None and not partial:
+        with _locked(lineage):
+            # Another analysis may have created the baseline meanwhile
+            baseline = load_schema(lineage)
+            if baseline is None:
+                entry = _accept(lineage, metadata, filename, None)
+                drift = {"lineage": lineage, "status": "baseline", "baseline_version": entry["version"], "drifted_columns": 0}
+
+    if drift is None and baseline is None:
+        drift = {"lineage": lineage, "status": "no_baseline", "baseline_version": None, "drifted_columns": 0}
+    elif drift is None:
+        accepted = _project(baseline["fingerprint"], columns) if columns else baseline["fingerprint"]
+        drift = {
+            "lineage": lineage,
+            "baseline_version": baseline["version"],
+            **diff_schema(accepted, fingerprint),
+            "status_mismatch_pct": status_mismatch(accepted, metadata)
+        }
+        drift["status"] = "drifted" if drift["drifted_columns"] else "unchanged"
+        if drift["drifted_columns"]:
+            print(f"⚠️ [Schema Registry]: '{lineage}' drifted from version {baseline['version']} in {drift['drifted_columns']} columns")
+    if columns:
+        drift["columns"] = list(columns)
+    metadata["schema_drift"] = drift
+    return drift
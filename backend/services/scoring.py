@@ -1,3 +1,5 @@
+import numpy as np
+
 def calculate_scores(rule_results: dict) -> dict:
     dim_scores = {}
     
@@ -39,3 +41,43 @@ def calculate_scores(rule_results: dict) -> dict:
         "dimension_scores": final_dim_scores,
         "rule_results": formatted_results
     }
+
+
+def calculate_scores_by_standard(standard_results: dict) -> dict:
+    """calculate_scores() for each standard of RulesEngine.run_standards()."""
+    return {standard: calculate_scores(rule_results) for standard, rule_results in standard_results.items()}
+
+
+def calculate_scores_batch(rule_results: dict) -> dict:
+    """
+    Column-wise calculate_scores() for a batch of datasets: each rule result
+    carries "passed" as a boolean array (one entry per dataset) and a scalar
+    "weight". Returns overall/health and dimension scores as arrays.
+    """
+    dim_weights = {}
+    for key, res in rule_results.items():
+        dim = key.split('_')[0]
+        total_weight, passed_weight = dim_weights.get(dim, (0, 0))
+        dim_weights[dim] = (total_weight + res["weight"], passed_weight + res["weight"] * np.asarray(res["passed"], dtype=np.int64))
+
+    final_dim_scores = {}
+    total_obtained = 0
+    total_possible = 0
+
+    for dim, (total_weight, passed_weight) in dim_weights.items():
+        if total_weight > 0:
+            score = (passed_weight / total_weight) * 100
+        else:
+            score = np.full(np.shape(passed_weight), 100.0)
+        final_dim_scores[dim] = np.round(score, 2)
+
+        total_obtained = total_obtained + passed_weight
+        total_possible += total_weight
+
+    overall_score = (total_obtained / total_possible * 100) if total_possible > 0 else np.asarray(100.0)
+
+    return {
+        "overall_score": np.round(overall_score, 2),
+        "health_score": np.round(overall_score, 2),
+        "dimension_scores": final_dim_scores
+    }
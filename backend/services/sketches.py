@@ -0,0 +1,186 @@
+import math
+import numpy as np
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-value sketch over 64-bit hashes.
+
+    Memory is 2^precision one-byte registers regardless of how many values are
+    added; the relative standard error is 1.04 / sqrt(2^precision) (about 0.8%
+    at the default precision of 14). Sketches with the same precision merge by
+    taking the register-wise maximum.
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add_hashes(self, hashes: np.ndarray):
+        """Adds a batch of uint64 hashes (see column_stats.hash_values)."""
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+
+        # rank = position of the leftmost 1-bit in the suffix (1-based)
+        rank = (suffix_bits + 1 - _bit_length(suffix)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorised int.bit_length() for uint64 arrays."""
+    _, exponent = np.frexp(values.astype(np.float64))
+    exponent = np.minimum(exponent.astype(np.int64), 64)
+    # float64 rounding can push values just below 2^k up to 2^k; step back
+    positive = exponent > 0
+    shift = np.where(positive, exponent - 1, 0).astype(np.uint64)
+    overshoot = positive & ((np.uint64(1) << shift) > values)
+    return exponent - overshoot
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty) over float values.
+
+    Items live in levels of weight 2^h; a level over its capacity is sorted
+    and every other item is promoted to the level above, so memory stays
+    around 3k items for any stream length. Rank error is roughly 1.7 / k
+    (under 1% at the default k of 200); until the first compaction the
+    sketch holds every value and is exact. Sketches merge level by level.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        # Seeded so identical inputs always give identical sketches
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def add(self, values: np.ndarray):
+        """Adds a batch of values; NaNs are ignored."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind at this level
+                keep, items = (items[:1], items[1:]) if len(items) % 2 else (items[:0], items)
+                offset = int(self._rng.integers(2))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+                self.levels[level] = keep
+                # Adding a level shrinks the capacities below it; start over
+                level = 0
+                continue
+            level += 1
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> list:
+        """Values at the given ranks (inverted-CDF definition, as numpy's "inverted_cdf")."""
+        if not self.n:
+            return [None] * len(qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_h), 2 ** h, dtype=np.float64) for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        targets = np.asarray(qs, dtype=np.float64) * cumulative[-1]
+        positions = np.minimum(np.searchsorted(cumulative, targets, side="left"), len(items) - 1)
+        return [float(items[p]) for p in positions]
+
+
+class HeavyHitters:
+    """
+    Misra-Gries frequent-items summary over 64-bit value hashes.
+
+    Keeps at most `capacity` counters. Reported counts are lower bounds, each
+    at most `error` below the true count (error <= n / (capacity + 1)).
+    Summaries merge by adding counters and pruning back to capacity.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.n = 0
+        self.error = 0
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def add_hashes(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        unique, counts = np.unique(np.asarray(hashes, dtype=np.uint64), return_counts=True)
+        self.n += len(hashes)
+        self._add_counts(unique, counts)
+
+    def _add_counts(self, hashes: np.ndarray, counts: np.ndarray):
+        all_hashes = np.concatenate([self.hashes, hashes])
+        unique, inverse = np.unique(all_hashes, return_inverse=True)
+        summed = np.bincount(inverse, weights=np.concatenate([self.counts, counts]).astype(np.float64))
+        summed = summed.astype(np.int64)
+
+        if len(unique) > self.capacity:
+            order = np.argsort(-summed, kind="stable")
+            cutoff = summed[order[self.capacity]]
+            keep = order[:self.capacity]
+            unique, summed = unique[keep], summed[keep] - cutoff
+            positive = summed > 0
+            unique, summed = unique[positive], summed[positive]
+            self.error += int(cutoff)
+        self.hashes, self.counts = unique, summed
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        self.n += other.n
+        self.error += other.error
+        self._add_counts(other.hashes, other.counts)
+        return self
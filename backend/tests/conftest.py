@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import shutil
+import atexit
+import tempfile
+import pytest
+
+# Add the backend directory to path so tests import modules like the app does
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Stores read their locations at import: keep them out of the shared temp dirs
+_STORE_ROOT = tempfile.mkdtemp(prefix="finaudit-tests-")
+atexit.register(shutil.rmtree, _STORE_ROOT, ignore_errors=True)
+for _var in ("SCHEMA_REGISTRY_DIR", "PROFILE_CACHE_DIR", "REPORT_STORE_DIR", "REFERENCE_INDEX_DIR",
+             "JOB_DIR", "PROFILE_STORE_DIR", "ADVISORY_CACHE_DIR"):
+    os.environ.setdefault(_var, os.path.join(_STORE_ROOT, _var.lower()))
+os.environ.setdefault("VALUE_HASH_KEY", "00" * 32)
+
+
+@pytest.fixture(scope="session")
+def agent():
+    """ai.agent; the LLM client only needs some key to start."""
+    os.environ.setdefault("GOOGLE_API_KEY", "test")
+    import ai.agent
+    return ai.agent
+
+
+@pytest.fixture(scope="session")
+def client(agent):
+    """TestClient for the app."""
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+class StubLLM:
+    """Local stand-in for the Gemini client: records the prompts, answers with `reply`."""
+
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.messages = []
+
+    async def ainvoke(self, messages):
+        from langchain_core.messages import AIMessage
+        self.messages.append(messages)
+        return AIMessage(content=self.reply)
+
+
+@pytest.fixture
+def stub_llm(agent, monkeypatch):
+    stub = StubLLM(json.dumps({
+        "executive_summary": "Stub advisory.",
+        "risk_assessment": "None.",
+        "remediation_steps": [{"issue": "Stub", "action": "None", "priority": "LOW"}]
+    }))
+    monkeypatch.setattr(agent, "llm", stub)
+    monkeypatch.setattr(agent, "llm_limiter", agent.RateLimiter(0, 1))
+    return stub
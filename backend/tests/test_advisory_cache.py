@@ -0,0 +1,70 @@
+import json
+import pytest
+from services.cache import LRUCache
+
+SCORES = {
+    "health_score": 72.4,
+    "dimension_scores": {"completeness": 80.2, "validity": 64.6},
+    "rule_results": {
+        "completeness_kyc_id": {"passed": False},
+        "validity_date_format": {"passed": True},
+        "validity_currency": {"passed": False},
+    }
+}
+METADATA = {"total_rows": 2, "total_columns": 1, "columns": {"amount": {"dtype": "float64", "is_numeric": True}}}
+
+
+@pytest.fixture
+def cache(agent, monkeypatch):
+    cache = LRUCache("advisory-test", max_entries=8)
+    monkeypatch.setattr(agent, "advisory_cache", cache)
+    return cache
+
+
+def scores(**changes) -> dict:
+    return {**json.loads(json.dumps(SCORES)), **changes}
+
+
+def test_signature_ignores_rule_order_and_sub_point_changes(agent):
+    signature = agent.advisory_signature("GDPR", "Transactions", SCORES)
+    reordered = scores(rule_results=dict(reversed(list(SCORES["rule_results"].items()))),
+                       health_score=72.1, dimension_scores={"validity": 64.9, "completeness": 79.8})
+    assert agent.advisory_signature("GDPR", "Transactions", reordered) == signature
+
+    assert agent.advisory_signature("PCI DSS", "Transactions", SCORES) != signature
+    assert agent.advisory_signature("GDPR", "Customers", SCORES) != signature
+    fixed = scores(rule_results={**SCORES["rule_results"], "validity_currency": {"passed": True}})
+    assert agent.advisory_signature("GDPR", "Transactions", fixed) != signature
+
+
+def re_evaluate(client, use_cache: bool = True, **changes) -> dict:
+    response = client.post("/api/analyze/re-evaluate", json={
+        "metadata": {**METADATA, **changes}, "standard": "General Transaction", "advisory_cache": use_cache})
+    assert response.status_code == 200
+    return response.json()["analysis"]
+
+
+def test_known_signature_makes_no_llm_call(client, stub_llm, cache):
+    first = re_evaluate(client)
+    assert re_evaluate(client) == first
+    assert len(stub_llm.messages) == 1
+    assert cache.stats()["hits"] == 1
+
+    # Opting out asks the LLM again, and the fresh plan replaces the cached one
+    stub_llm.reply = json.dumps({**first, "executive_summary": "Fresh advisory."})
+    assert re_evaluate(client, use_cache=False)["executive_summary"] == "Fresh advisory."
+    assert re_evaluate(client)["executive_summary"] == "Fresh advisory."
+    assert len(stub_llm.messages) == 2
+
+
+def test_unparsed_plans_are_not_cached(client, stub_llm, cache):
+    stub_llm.reply = "Not JSON."
+    assert re_evaluate(client)["executive_summary"] == "Error generating advice."
+    re_evaluate(client)
+    assert len(stub_llm.messages) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_stats_endpoint(client, agent):
+    caches = {stats["name"]: stats for stats in client.get("/api/cache/stats").json()["caches"]}
+    assert caches[agent.advisory_cache.name]["entries"] == agent.advisory_cache.stats()["entries"]
@@ -0,0 +1,82 @@
+import json
+import asyncio
+import pytest
+from services import advisory
+from services.provenance import provenance_service
+
+CSV = b"transaction_id,amount,status\nTX1,10.5,settled\nTX2,-3.0,pending\n"
+
+
+def deferred(client) -> dict:
+    response = client.post("/api/analyze", files={"file": ("advisory.csv", CSV, "text/csv")},
+                           data={"defer_analysis": "true", "advisory_cache": "false"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def events(client, url: str) -> list:
+    """(event, data) pairs of an SSE stream."""
+    with client.stream("GET", url) as stream:
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        body = "".join(stream.iter_text())
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        parsed.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return parsed
+
+
+@pytest.fixture
+def slow_advisory(monkeypatch):
+    """Advisories that take a moment, with keepalives well within it."""
+    run_advisory = advisory.run_advisory
+
+    async def slow(*args):
+        await asyncio.sleep(0.3)
+        return await run_advisory(*args)
+
+    monkeypatch.setattr(advisory, "run_advisory", slow)
+    monkeypatch.setattr(advisory, "ADVISORY_KEEPALIVE", 0.05)
+
+
+def test_deferred_analysis_streams_chained_attestation(client, stub_llm, slow_advisory):
+    report = deferred(client)
+    assert report["analysis"] is None
+    assert report["analysis_status"] == "pending"
+    assert report["scores"]["overall_score"] is not None
+
+    stream = events(client, report["analysis_stream"])
+    assert {name for name, _ in stream[:-1]} == {"pending"}
+    name, data = stream[-1]
+    assert name == "analysis"
+    assert data["analysis"]["executive_summary"] == "Stub advisory."
+    # The advisory's attestation names the deterministic one
+    assert data["provenance"]["fingerprint"] == provenance_service.compute_fingerprint({
+        "report_id": report["report_id"],
+        "analysis_summary_hash": provenance_service.compute_fingerprint(data["analysis"]),
+        "previous_fingerprint": report["provenance"]["fingerprint"],
+        "previous_signature": report["provenance"]["signature"]
+    })
+
+    # Once done, a new stream gets the analysis at once
+    assert events(client, report["analysis_stream"]) == [("analysis", data)]
+
+
+def test_failed_advisory_streams_error(client, stub_llm, monkeypatch):
+    async def failing(*args):
+        raise RuntimeError("advisory down")
+
+    monkeypatch.setattr(advisory, "run_advisory", failing)
+    report = deferred(client)
+    assert events(client, report["analysis_stream"])[-1] == (
+        "error", {"report_id": report["report_id"], "detail": "Analysis failed."})
+
+
+def test_stream_times_out(client, stub_llm, slow_advisory, monkeypatch):
+    monkeypatch.setattr(advisory, "ADVISORY_STREAM_TIMEOUT", 0.1)
+    report = deferred(client)
+    assert events(client, report["analysis_stream"])[-1][1]["detail"] == "Analysis timed out."
+
+
+def test_unknown_report_is_404(client):
+    assert client.get("/api/reports/missing/analysis").status_code == 404
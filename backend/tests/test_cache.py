@@ -0,0 +1,122 @@
+import io
+import os
+import time
+import pytest
+from fastapi import UploadFile
+from services import cache as cache_module, schema_registry
+from services.cache import LRUCache
+from services.ingestion import copy_upload, profile_cache, upload_digest
+
+CSV = b"transaction_id,amount,status\nTX1,10.5,settled\nTX2,-3.0,pending\nTX3,7.25,settled\n"
+
+
+def entry(i: int) -> dict:
+    return {"id": i, "payload": "x" * 100}
+
+
+def test_memory_hits_and_misses():
+    cache = LRUCache("test", max_entries=2)
+    assert cache.get("a") is None
+    cache.set("a", entry(1))
+    value = cache.get("a")
+    assert value == entry(1)
+    # Every get returns a fresh copy
+    value["id"] = 99
+    assert cache.get("a") == entry(1)
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 1)
+
+
+def test_memory_bounds_evict_least_recently_used():
+    cache = LRUCache("test", max_entries=2)
+    cache.set("a", entry(1))
+    cache.set("b", entry(2))
+    cache.get("a")
+    cache.set("c", entry(3))
+    assert cache.get("b") is None
+    assert cache.get("a") == entry(1)
+
+    small = LRUCache("test", max_bytes=250)
+    small.set("a", entry(1))
+    small.set("b", entry(2))
+    small.set("c", entry(3))
+    assert small.stats()["bytes"] <= 250
+    assert small.get("a") is None
+
+
+def test_disk_tier_serves_evicted_entries(tmp_path):
+    cache = LRUCache("test", max_entries=1, disk_dir=str(tmp_path))
+    cache.set("a", entry(1))
+    cache.set("b", entry(2))
+    assert cache.get("a") == entry(1)
+    # Another process sharing the directory sees the entries
+    assert LRUCache("test", disk_dir=str(tmp_path)).get("b") == entry(2)
+
+
+def test_ttl_expires_memory_and_disk(tmp_path, monkeypatch):
+    cache = LRUCache("test", ttl=60, disk_dir=str(tmp_path))
+    cache.set("a", entry(1))
+    now = time.time()
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".json")]
+
+
+def test_disk_eviction_trims_to_target(tmp_path):
+    cache = LRUCache("test", max_entries=1, disk_dir=str(tmp_path), disk_max_bytes=1000)
+    for i in range(20):
+        cache.set(str(i), entry(i))
+    sizes = [os.path.getsize(tmp_path / f) for f in os.listdir(tmp_path) if f.endswith(".json")]
+    assert sum(sizes) <= 1000
+    # The most recent entries survive
+    assert cache.get("19") == entry(19)
+    assert LRUCache("test", disk_dir=str(tmp_path)).get("0") is None
+
+
+def upload(data: bytes = CSV, filename: str = "payments.csv") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def test_upload_digest_by_content_and_options(tmp_path):
+    copied = upload()
+    with open(tmp_path / "copy", "wb") as f:
+        copy_upload(copied, f)
+    assert (tmp_path / "copy").read_bytes() == CSV
+    # Hashed while copying or from the spool file: the same address
+    assert upload_digest(copied, mode="auto") == upload_digest(upload(), mode="auto")
+    assert upload_digest(upload(), mode="auto") != upload_digest(upload(), mode="stream")
+    assert upload_digest(upload(), mode="auto") != upload_digest(upload(CSV + b"TX4,1.0,settled\n"), mode="auto")
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_registry, "SCHEMA_REGISTRY_DIR", str(tmp_path))
+    profile_cache.clear()
+
+
+def analyze(client, data: bytes = CSV, **form):
+    return client.post("/api/analyze", files={"file": ("payments.csv", data, "text/csv")},
+                       data={"lineage": "cache_feed", "advisory_cache": "false", **form})
+
+
+def test_analyze_cache_hit_on_retry(client, stub_llm, registry):
+    # The first file of a lineage creates its baseline; the retry still hits
+    first = analyze(client)
+    assert first.headers["X-Profile-Cache"] == "miss"
+    assert first.json()["metadata"]["schema_drift"]["status"] == "baseline"
+    retry = analyze(client)
+    assert retry.headers["X-Profile-Cache"] == "hit"
+    assert retry.json()["scores"] == first.json()["scores"]
+    assert analyze(client, mode="stream").headers["X-Profile-Cache"] == "miss"
+
+
+def test_accepted_schema_invalidates_cached_analyses(client, stub_llm, registry):
+    analyze(client)
+    drifted = CSV.replace(b",status", b",state")
+    report_id = analyze(client, drifted).json()["report_id"]
+    assert analyze(client, drifted).headers["X-Profile-Cache"] == "hit"
+
+    response = client.post("/api/schemas/cache_feed/accept", json={"report_id": report_id})
+    assert response.json()["version"] == 2
+    again = analyze(client, drifted)
+    assert again.headers["X-Profile-Cache"] == "miss"
+    assert again.json()["metadata"]["schema_drift"]["status"] == "unchanged"
@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import pytest
+from concurrent.futures import Future
+from services import jobs
+from services.analysis import ANALYSIS_STAGES
+from services.jobs import JobCancelled, _run_job
+
+CSV = b"transaction_id,amount,date,status\n" + b"".join(
+    f"TX{i},{i * 1.5},2024-02-{i % 28 + 1:02d},settled\n".encode() for i in range(500))
+STREAM = {"mode": "stream", "engine": None, "columns": None, "sample_rows": None, "stratify_by": None}
+
+
+def submit(client, data: bytes = CSV, filename: str = "jobs.csv", **form):
+    response = client.post("/api/jobs/analyze", files={"file": (filename, data, "text/csv")},
+                           data={"advisory_cache": "false", **form})
+    assert response.status_code == 202
+    return response.json()
+
+
+def wait(client, job_id: str, timeout: float = 60) -> dict:
+    deadline = time.time() + timeout
+    while True:
+        status = client.get(f"/api/jobs/{job_id}").json()
+        if status["status"] not in jobs.ACTIVE_STATUSES or time.time() > deadline:
+            return status
+        time.sleep(0.05)
+
+
+def job_dir(tmp_path, data: bytes = CSV) -> str:
+    with open(tmp_path / "upload", "wb") as f:
+        f.write(data)
+    return str(tmp_path)
+
+
+def test_worker_reports_stages_and_rows(tmp_path):
+    computed = _run_job(job_dir(tmp_path), "jobs.csv", STREAM, "jobs_worker")
+    with open(tmp_path / "progress.json") as f:
+        reported = json.load(f)
+    assert list(reported["stages"]) == ["profiling", "rules", "scoring"]
+    assert reported["rows"] == 500
+    assert computed["metadata"]["total_rows"] == 500
+
+
+def test_worker_stops_on_cancel_request(tmp_path):
+    path = job_dir(tmp_path)
+    open(os.path.join(path, "cancel"), "w").close()
+    with pytest.raises(JobCancelled):
+        _run_job(path, "jobs.csv", STREAM, "jobs_worker")
+
+
+def test_job_runs_to_done(client, stub_llm):
+    queued = submit(client, mode="stream", lineage="jobs_done")
+    assert queued["status"] in ("queued", "running")
+    status = wait(client, queued["job_id"])
+    assert status["status"] == "done"
+    assert status["progress"] == 100
+    assert [stage["name"] for stage in status["stages"]] == list(ANALYSIS_STAGES)
+    assert all(stage["status"] == "done" for stage in status["stages"])
+    assert status["rows_profiled"] == 500
+
+    result = client.get(f"/api/jobs/{queued['job_id']}/result").json()
+    direct = client.post("/api/analyze", files={"file": ("jobs.csv", CSV, "text/csv")},
+                         data={"mode": "stream", "lineage": "jobs_done", "advisory_cache": "false"}).json()
+    assert result["scores"] == direct["scores"]
+
+
+def test_cancel_queued_job(client, stub_llm, monkeypatch):
+    class Stalled:
+        """Executor whose jobs never leave the queue."""
+
+        def submit(self, *args):
+            return Future()
+
+    monkeypatch.setattr(jobs, "get_executor", lambda: Stalled())
+    queued = submit(client, lineage="jobs_cancel")
+    time.sleep(0.1)
+    assert client.delete(f"/api/jobs/{queued['job_id']}").json()["status"] in ("cancelling", "cancelled")
+    status = wait(client, queued["job_id"])
+    assert status["status"] == "cancelled"
+    assert client.get(f"/api/jobs/{queued['job_id']}/result").status_code == 409
+    # Cancelling a finished job changes nothing
+    assert client.delete(f"/api/jobs/{queued['job_id']}").json()["status"] == "cancelled"
+
+
+def test_failed_job_reports_error(client, stub_llm):
+    queued = submit(client, b"not parquet", "jobs.parquet")
+    status = wait(client, queued["job_id"])
+    assert status["status"] == "failed"
+    assert status["error"]
+    assert client.get(f"/api/jobs/{queued['job_id']}/result").status_code == 400
+    assert client.get("/api/jobs/missing").status_code == 404
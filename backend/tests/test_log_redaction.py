@@ -0,0 +1,29 @@
+import json
+
+SECRET_KEY = "AIzaSyD-test-secret-key-0123456789abcd"
+MARKER = "acct-7731-confidential"
+
+
+def test_local_key_is_not_logged(agent, tmp_path, capfd):
+    env = tmp_path / ".env"
+    env.write_text(f"OTHER_TOKEN=sk-other-secret-value\nGOOGLE_API_KEY='{SECRET_KEY}'\n")
+
+    assert agent.get_local_key(str(env)) == SECRET_KEY
+    out = capfd.readouterr().out
+    assert SECRET_KEY[:20] not in out
+    assert "sk-other-secret" not in out
+    assert SECRET_KEY[-4:] in out
+
+
+def test_chat_logs_no_request_content(client, stub_llm, capfd):
+    context = {"metadata": {"total_rows": 3, "columns": {MARKER: {}}}, "scores": {"health_score": 80}}
+    response = client.post("/api/chat", json={"question": f"What about {MARKER}?", "context": context})
+
+    assert response.status_code == 200
+    assert response.json()["response"] == stub_llm.reply
+    # The LLM still gets the content; the log only has its size
+    sent = json.dumps([m.content for m in stub_llm.messages[0]])
+    assert MARKER in sent
+    out = capfd.readouterr().out
+    assert MARKER not in out
+    assert "inline context" in out
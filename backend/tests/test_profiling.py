@@ -0,0 +1,150 @@
+import io
+import os
+import pytest
+import pandas as pd
+from fastapi import HTTPException
+from conftest import FIXTURES
+from services import column_stats
+from services.ingestion import ProfilingCancelled, profile_dataset, profile_stream, read_dataframe
+from services.arrow_ingestion import read_arrow_table, profile_table
+
+FILENAME = "transactions.csv"
+# Small chunks so the streamed profile is merged from several accumulators
+CHUNK_ROWS = 17
+
+# Stats each profiler reports its own way: dtype names differ per engine,
+# and only the streaming path sketches quantiles and top values.
+ENGINE_KEYS = {"dtype", "top_values", "top_values_approx", "top_values_error", "quantiles_approx", "date_quantiles_approx"}
+
+
+@pytest.fixture(scope="module")
+def data():
+    with open(os.path.join(FIXTURES, FILENAME), "rb") as fh:
+        return fh.read()
+
+
+@pytest.fixture(scope="module")
+def pandas_profile(data):
+    return profile_dataset(read_dataframe(io.BytesIO(data), FILENAME))
+
+
+def assert_same_columns(expected: dict, actual: dict):
+    assert list(actual["columns"]) == list(expected["columns"])
+    for col, stats in expected["columns"].items():
+        other = actual["columns"][col]
+        assert set(other) - ENGINE_KEYS == set(stats) - ENGINE_KEYS, col
+        for key, value in stats.items():
+            if key in ENGINE_KEYS:
+                continue
+            if isinstance(value, float):
+                assert other[key] == pytest.approx(value, rel=1e-9), (col, key)
+            else:
+                assert other[key] == value, (col, key)
+
+
+def test_stream_matches_dataset(data, pandas_profile):
+    streamed = profile_stream(io.BytesIO(data), FILENAME, chunk_rows=CHUNK_ROWS)
+
+    assert streamed["total_rows"] == pandas_profile["total_rows"]
+    assert streamed["total_columns"] == pandas_profile["total_columns"]
+    assert_same_columns(pandas_profile, streamed)
+    # Candidate keys are picked on the first chunk; the row counts are exact
+    for key in ("rows", "duplicate_rows", "duplicate_row_pct"):
+        assert streamed["row_uniqueness"][key] == pandas_profile["row_uniqueness"][key]
+
+
+def test_stream_top_values_within_error(data, pandas_profile):
+    streamed = profile_stream(io.BytesIO(data), FILENAME, chunk_rows=CHUNK_ROWS)
+
+    for col, stats in pandas_profile["columns"].items():
+        if "top_values" not in stats:
+            continue
+        exact = {top["hash"]: top["count"] for top in stats["top_values"]}
+        error = streamed["columns"][col].get("top_values_error", 0)
+        for top in streamed["columns"][col]["top_values"]:
+            # Misra-Gries counts are lower bounds, at most `error` below the true count
+            if top["hash"] in exact:
+                assert exact[top["hash"]] - error <= top["count"] <= exact[top["hash"]], col
+
+
+def test_stream_top_values_exact_without_pruning(data, pandas_profile, monkeypatch):
+    monkeypatch.setattr(column_stats, "HEAVY_HITTER_CAPACITY", 1000)
+    streamed = profile_stream(io.BytesIO(data), FILENAME, chunk_rows=CHUNK_ROWS)
+
+    for col, stats in pandas_profile["columns"].items():
+        assert streamed["columns"][col].get("top_values") == stats.get("top_values"), col
+        assert "top_values_approx" not in streamed["columns"][col]
+
+
+def test_table_matches_dataset(data, pandas_profile):
+    profile = profile_table(read_arrow_table(data, FILENAME))
+
+    assert profile["total_rows"] == pandas_profile["total_rows"]
+    assert profile["total_columns"] == pandas_profile["total_columns"]
+    assert_same_columns(pandas_profile, profile)
+    for col, stats in pandas_profile["columns"].items():
+        assert profile["columns"][col].get("top_values") == stats.get("top_values"), col
+    assert profile["row_uniqueness"] == pandas_profile["row_uniqueness"]
+
+
+def test_fixture_exercises_checks(pandas_profile):
+    columns = pandas_profile["columns"]
+    assert pandas_profile["row_uniqueness"]["candidate_keys"]
+    assert columns["transaction_id"]["unique_count"] < pandas_profile["total_rows"]
+    assert columns["amount"]["negative_count"] > 0
+    assert columns["date"]["non_iso_date_count"] > 0
+    assert columns["date"]["impossible_date_count"] > 0
+    assert 0 < columns["customer_email"]["email_match_percentage"] < 100
+    assert columns["notes"]["null_percentage"] == 100
+
+
+def test_stream_passes_cancellation_through(data):
+    def cancel(rows):
+        if rows > CHUNK_ROWS:
+            raise ProfilingCancelled()
+
+    with pytest.raises(ProfilingCancelled):
+        profile_stream(io.BytesIO(data), FILENAME, chunk_rows=CHUNK_ROWS, on_chunk=cancel)
+
+
+def test_stream_errors_are_wrapped_once(data):
+    def too_large(rows):
+        raise HTTPException(status_code=413, detail="Too many rows.")
+
+    with pytest.raises(HTTPException) as e:
+        profile_stream(io.BytesIO(data), FILENAME, chunk_rows=CHUNK_ROWS, on_chunk=too_large)
+    assert (e.value.status_code, e.value.detail) == (413, "Too many rows.")
+
+    with pytest.raises(HTTPException) as e:
+        profile_stream(io.BytesIO(data), FILENAME, columns=["no_such_column"])
+    assert e.value.status_code == 400
+    assert e.value.detail.count("Error processing file") == 1
+
+
+def test_stream_mixed_column_matches_dataset():
+    # Early chunks of `ref` parse as floats, later ones as text: the column is text
+    rows = [f"{i},{i % 7 + 0.5}" for i in range(60)] + [f"{i},GBP" if i % 2 else f"{i},ref-{i % 5}" for i in range(60, 100)]
+    data = ("id,ref\n" + "\n".join(rows) + "\n").encode()
+    expected = profile_dataset(read_dataframe(io.BytesIO(data), "mixed.csv"))["columns"]["ref"]
+    streamed = profile_stream(io.BytesIO(data), "mixed.csv", chunk_rows=CHUNK_ROWS)["columns"]["ref"]
+
+    assert not streamed["is_numeric"]
+    assert streamed["currency_code_match_count"] == expected["currency_code_match_count"] == 20
+    for key, value in expected.items():
+        if key not in ENGINE_KEYS:
+            assert streamed[key] == value, key
+    assert streamed["top_values"] == expected["top_values"]
+
+    # Stored states keep what the text view of the float chunks needs
+    merged = column_stats.ColumnAccumulator()
+    for chunk in pd.read_csv(io.BytesIO(data), chunksize=CHUNK_ROWS):
+        acc = column_stats.ColumnAccumulator()
+        acc.update(chunk["ref"])
+        merged.merge(column_stats.ColumnAccumulator.from_state(acc.to_state()))
+    restored = merged.finalize(100)
+    assert (restored["unique_count"], restored["top_values"]) == (expected["unique_count"], expected["top_values"])
+
+
+def test_float_strings_match_no_pattern():
+    floats = column_stats.as_strings(pd.Series([1.5, -0.0, 1e20, 1e-7, float("inf"), 123456789012.0, 2024.0101]))
+    assert not any(column_stats.count_pattern_matches(floats).values())
@@ -0,0 +1,97 @@
+import io
+import pytest
+import pandas as pd
+from fastapi import HTTPException, UploadFile
+from services import reference_index
+from services.reference_index import (ReferenceAccumulator, delete_reference, key_hashes, list_references, load_reference,
+                                      register_reference)
+from core.rules_engine import RulesEngine
+
+# Customer master with IDs 0-99; every tenth ID is missing
+CUSTOMERS = pd.DataFrame({"id": [i for i in range(100) if i % 10], "name": "x"})
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(reference_index, "REFERENCE_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(reference_index, "_loaded", {})
+
+
+def register(name: str = "customers", customers: pd.DataFrame = CUSTOMERS, foreign_keys: list = None) -> dict:
+    upload = UploadFile(file=io.BytesIO(customers.to_csv(index=False).encode()), filename="customers.csv")
+    return register_reference(upload, name, "id", foreign_keys or ["customer_id", "cust_id"])
+
+
+def transactions(rows: int = 200) -> pd.DataFrame:
+    # customer_id 0-99 twice over, with a null every 50 rows
+    return pd.DataFrame({
+        "transaction_id": [f"TX{i}" for i in range(rows)],
+        "customer_id": [None if i % 50 == 0 else i % 100 for i in range(rows)],
+        "amount": [float(i) for i in range(rows)],
+    })
+
+
+def test_keys_match_as_text():
+    hashes = key_hashes(pd.Series([1042, None]))
+    assert list(hashes) == list(key_hashes(pd.Series([1042.0])))
+    assert list(hashes) == list(key_hashes(pd.Series([" 1042"])))
+
+
+def test_index_has_no_false_negatives():
+    manifest = register()
+    assert manifest["distinct_keys"] == len(CUSTOMERS)
+    index = load_reference(manifest)
+    assert index.contains(key_hashes(CUSTOMERS["id"])).all()
+    assert index.contains(key_hashes(pd.Series(range(1000, 2000)))).mean() < 0.05
+
+
+@pytest.mark.parametrize("mode, engine", [("full", None), ("stream", None), ("full", "arrow")])
+def test_hit_rate_is_scored(client, stub_llm, mode, engine):
+    register()
+    df = transactions()
+    data = {"mode": mode, "advisory_cache": "false", **({"ingest_engine": engine} if engine else {})}
+    response = client.post("/api/analyze", files={"file": ("references.csv", df.to_csv(index=False), "text/csv")}, data=data)
+    metadata = response.json()["metadata"]
+
+    values = df["customer_id"].dropna()
+    expected = round(100 * (values % 10 != 0).mean(), 2)
+    integrity = metadata["referential_integrity"]
+    assert (integrity["values"], integrity["hit_pct"]) == (len(values), expected)
+    assert integrity["foreign_keys"][0]["reference_column"] == "id"
+    results = RulesEngine(metadata).run_compliance("General Transaction")
+    assert results["integrity_referential"]["score"] == expected
+
+
+def test_replace_and_delete():
+    first = register()
+    second = register(customers=CUSTOMERS.head(10))
+    assert first["version"] != second["version"]
+    assert [m["distinct_keys"] for m in list_references()] == [10]
+
+    accumulator = ReferenceAccumulator()
+    accumulator.update(transactions())
+    state = accumulator.to_state()
+    delete_reference("customers")
+    assert list_references() == []
+    with pytest.raises(HTTPException) as e:
+        delete_reference("customers")
+    assert e.value.status_code == 404
+    # Counts taken against other references are not merged
+    assert not ReferenceAccumulator().merge_state(state)
+
+
+def test_missing_key_column_rejected():
+    upload = UploadFile(file=io.BytesIO(CUSTOMERS.to_csv(index=False).encode()), filename="customers.csv")
+    with pytest.raises(HTTPException) as e:
+        register_reference(upload, "customers", "nope")
+    assert e.value.status_code == 400
+    assert list_references() == []
+
+
+def test_reference_endpoints(client):
+    response = client.post("/api/references", files={"file": ("customers.csv", CUSTOMERS.to_csv(index=False), "text/csv")},
+                           data={"name": "customers", "key_column": "id", "foreign_keys": "customer_id, cust_id"})
+    assert response.json()["foreign_keys"] == ["cust_id", "customer_id"]
+    assert [m["name"] for m in client.get("/api/references").json()["references"]] == ["customers"]
+    assert client.delete("/api/references/customers").json() == {"deleted": "customers"}
+    assert client.delete("/api/references/customers").status_code == 404
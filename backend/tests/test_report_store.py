@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+from services import report_store
+from services.report_store import load_report, save_report, scores_for
+from core.rules_engine import STANDARDS
+
+CSV = b"transaction_id,amount,date,customer_email\nTX1,10.5,2024-01-02,a@example.com\nTX2,-3.0,2024-01-03,b@example.com\n"
+
+
+@pytest.fixture
+def report(client, stub_llm):
+    response = client.post("/api/analyze", files={"file": ("report_store.csv", CSV, "text/csv")},
+                           data={"advisory_cache": "false"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_re_evaluate_by_report_id_matches_inline_metadata(client, report):
+    by_id = client.post("/api/analyze/re-evaluate", json={"report_id": report["report_id"], "standard": "GDPR"})
+    inline = client.post("/api/analyze/re-evaluate", json={"metadata": report["metadata"], "standard": "GDPR"})
+    assert by_id.status_code == inline.status_code == 200
+    assert by_id.json()["scores"] == inline.json()["scores"]
+
+    all_standards = client.post("/api/analyze/re-evaluate", json={"report_id": report["report_id"], "standards": []})
+    assert list(all_standards.json()["standard_scores"]) == STANDARDS
+    assert all_standards.json()["standard_scores"]["GDPR"] == by_id.json()["scores"]
+
+
+def test_re_evaluated_analysis_is_kept_for_chat(client, report, stub_llm):
+    stub_llm.reply = '{"executive_summary": "GDPR plan.", "risk_assessment": "GDPR risk.", "remediation_steps": []}'
+    client.post("/api/analyze/re-evaluate", json={"report_id": report["report_id"], "standard": "GDPR", "advisory_cache": False})
+    assert load_report(report["report_id"])["analyses"]["GDPR"]["risk_assessment"] == "GDPR risk."
+
+    stub_llm.reply = "Answer."
+    response = client.post("/api/chat", json={"question": "Why?", "report_id": report["report_id"], "standard": "GDPR"})
+    assert response.json() == {"response": "Answer."}
+    assert "GDPR risk." in str(stub_llm.messages[-1])
+
+
+def test_unknown_report_is_404(client, stub_llm):
+    assert client.post("/api/analyze/re-evaluate", json={"report_id": "missing"}).status_code == 404
+    assert client.post("/api/chat", json={"question": "Why?", "report_id": "missing"}).status_code == 404
+    assert client.post("/api/chat", json={"question": "Why?"}).status_code == 400
+    with pytest.raises(HTTPException):
+        load_report("missing")
+
+
+def test_scores_are_memoized_per_metadata_and_standard(monkeypatch):
+    runs = []
+    original = report_store.calculate_scores
+    monkeypatch.setattr(report_store, "calculate_scores", lambda results: runs.append(1) or original(results))
+    metadata = {"total_rows": 1, "total_columns": 1, "columns": {"amount": {"dtype": "float64", "null_count": 0,
+                                                                            "null_percentage": 0.0, "unique_count": 1, "is_numeric": True}}}
+    seeded = {"General Transaction": {"overall_score": 1}}
+    report_id = save_report(metadata, "memo-hash", seeded, {}, "memo.csv")
+
+    assert scores_for(metadata, "General Transaction", "memo-hash") == {"overall_score": 1}
+    first = scores_for(metadata, "GDPR", "memo-hash")
+    assert scores_for(metadata, "GDPR", "memo-hash") == first
+    assert len(runs) == 1
+    assert load_report(report_id)["filename"] == "memo.csv"
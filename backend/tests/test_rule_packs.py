@@ -0,0 +1,83 @@
+import os
+import copy
+import json
+import pytest
+from conftest import FIXTURES
+from core import rule_plans
+from core.rule_plans import load_rule_packs
+from core.rules_engine import COLUMN_ROLES, RulesEngine, build_column_index
+
+MERCHANT = {
+    "standard": "Merchant Onboarding",
+    "include": ["completeness", "security"],
+    "skip": ["completeness_enhanced_data"],
+    "roles": {"merchant": "merchant|mcc"},
+    "features": {"merchant_columns": {"op": "columns", "roles": ["merchant"]}},
+    "rules": [
+        {"key": "completeness_merchant_id",
+         "score": {"fn": "if", "of": {"op": "count", "of": "merchant_columns"}, "then": 100, "else": 0},
+         "weight": 4, "pass": {"op": "==", "value": 100}, "details": "Merchant identifier present"}
+    ]
+}
+
+
+@pytest.fixture(autouse=True)
+def registries():
+    """Packs add to the module-level plan registries: restore them afterwards."""
+    saved = [(registry, copy.deepcopy(registry)) for registry in (
+        rule_plans.RULE_PLANS, rule_plans.STANDARD_PLANS, rule_plans.STANDARD_SKIPS, rule_plans.FEATURES, rule_plans._compiled)]
+    yield
+    for registry, contents in saved:
+        registry.clear()
+        registry.update(contents)
+
+
+def write_packs(directory, **packs):
+    for name, pack in packs.items():
+        with open(os.path.join(directory, f"{name}.json"), "w") as fh:
+            fh.write(pack if isinstance(pack, str) else json.dumps(pack))
+
+
+def test_loads_valid_packs_and_skips_invalid(tmp_path):
+    write_packs(tmp_path,
+                a_broken={"standard": "Broken", "rules": [{"key": "x_y", "score": {"fn": "nope"}, "weight": 1, "pass": None}]},
+                b_duplicate={"standard": "GDPR", "include": ["gdpr"]},
+                c_bad_role={"standard": "Bad Role", "roles": {"email": "mail"}, "include": ["gdpr"]},
+                d_unknown_role={"standard": "Unknown", "features": {"x": {"op": "columns", "roles": ["nowhere"]}},
+                                "rules": [{**MERCHANT["rules"][0], "score": {"fn": "if", "of": {"op": "count", "of": "x"}, "then": 1, "else": 0}}]},
+                e_not_json="{",
+                merchant=MERCHANT)
+    roles = dict(COLUMN_ROLES)
+
+    assert load_rule_packs(roles, str(tmp_path)) == ["Merchant Onboarding"]
+    assert roles["merchant"] == "merchant|mcc"
+    assert rule_plans.STANDARD_PLANS["Merchant Onboarding"] == ["completeness", "security", "Merchant Onboarding"]
+    # A failed pack leaves nothing behind
+    assert "Broken" not in rule_plans.RULE_PLANS and "Unknown" not in rule_plans.RULE_PLANS
+    assert "x" not in rule_plans.FEATURES
+
+
+def test_missing_directory_loads_nothing(tmp_path):
+    assert load_rule_packs(dict(COLUMN_ROLES), str(tmp_path / "missing")) == []
+
+
+def test_pack_standard_runs_like_a_builtin(tmp_path):
+    write_packs(tmp_path, merchant=MERCHANT)
+    roles = dict(COLUMN_ROLES)
+    load_rule_packs(roles, str(tmp_path))
+    with open(os.path.join(FIXTURES, "profiles.json")) as fh:
+        metadata = json.load(fh)["transactions"]
+
+    def run(metadata):
+        index = build_column_index(metadata["columns"])
+        index["merchant"] = [col for col in metadata["columns"] if "merchant" in col]
+        return RulesEngine(metadata, column_index=index).run_compliance("Merchant Onboarding")
+
+    results = run(metadata)
+    assert not results["completeness_merchant_id"]["passed"]
+    assert "completeness_enhanced_data" not in results
+    builtin = RulesEngine(metadata).run_compliance("General Transaction")
+    assert {key for key in results if key.startswith("security_")} == {key for key in builtin if key.startswith("security_")}
+
+    metadata["columns"]["merchant_id"] = metadata["columns"]["transaction_id"]
+    assert run(metadata)["completeness_merchant_id"]["passed"]
@@ -0,0 +1,120 @@
+import io
+import pytest
+import pandas as pd
+from fastapi import HTTPException, UploadFile
+from services import schema_registry
+from services.schema_registry import accept_schema, check_schema, default_lineage, schema_version
+from services.ingestion import profile_dataset
+from services.analysis import compute_analysis
+
+LINEAGE = "payments_feed"
+
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_registry, "SCHEMA_REGISTRY_DIR", str(tmp_path))
+
+
+def frame(rows: int = 40, amount_nulls: int = 0, status=("settled", "pending")) -> pd.DataFrame:
+    return pd.DataFrame({
+        "transaction_id": [f"TX{i}" for i in range(rows)],
+        "amount": [None if i < amount_nulls else float(i) for i in range(rows)],
+        "date": [f"2024-01-{i % 28 + 1:02d}" for i in range(rows)],
+        "status": [status[i % len(status)] for i in range(rows)],
+    })
+
+
+def options(columns: list = None, sample_rows: int = None) -> dict:
+    return {"mode": "full", "engine": None, "columns": columns, "sample_rows": sample_rows, "stratify_by": None}
+
+
+def analyse(df: pd.DataFrame, **opts) -> dict:
+    upload = UploadFile(file=io.BytesIO(df.to_csv(index=False).encode()), filename="payments.csv")
+    return compute_analysis(upload, options(**opts), LINEAGE)["metadata"]["schema_drift"]
+
+
+def test_first_profile_becomes_baseline():
+    drift = check_schema(profile_dataset(frame()), LINEAGE, "payments.csv")
+    assert drift["status"] == "baseline"
+    assert schema_version(LINEAGE) == 1
+
+
+def test_clean_profile_does_not_move_baseline():
+    check_schema(profile_dataset(frame()), LINEAGE)
+    # Small null-rate moves stay under the threshold and must not be accepted
+    for nulls in (2, 4, 6):
+        drift = check_schema(profile_dataset(frame(amount_nulls=nulls)), LINEAGE)
+        assert drift["status"] == "unchanged"
+        assert drift["baseline_version"] == 1
+    assert schema_version(LINEAGE) == 1
+
+
+def test_null_creep_is_drift_against_accepted_version():
+    check_schema(profile_dataset(frame()), LINEAGE)
+    check_schema(profile_dataset(frame(amount_nulls=6)), LINEAGE)
+    drift = check_schema(profile_dataset(frame(amount_nulls=12)), LINEAGE)
+    assert drift["status"] == "drifted"
+    assert drift["null_shifts"] == [{"column": "amount", "from": 0.0, "to": 30.0}]
+
+
+def test_structural_drift_and_status_mismatch():
+    check_schema(profile_dataset(frame()), LINEAGE)
+    drifted = frame(status=("settled", "chargeback")).drop(columns=["date"]).assign(channel="web")
+    drift = check_schema(profile_dataset(drifted), LINEAGE)
+    assert drift["status"] == "drifted"
+    assert drift["added"] == ["channel"]
+    assert drift["removed"] == ["date"]
+    assert drift["status_mismatch_pct"] == 50.0
+    assert schema_version(LINEAGE) == 1
+
+
+def test_accept_schema_moves_baseline():
+    check_schema(profile_dataset(frame()), LINEAGE)
+    metadata = profile_dataset(frame().drop(columns=["date"]))
+    entry = accept_schema(LINEAGE, metadata, "payments.csv")
+    assert entry["version"] == 2
+    assert check_schema(profile_dataset(frame().drop(columns=["date"])), LINEAGE)["status"] == "unchanged"
+    assert [h["version"] for h in schema_registry.get_schema(LINEAGE)["history"]] == [1, 2]
+
+
+def test_projected_profile_compares_selected_columns_only():
+    analyse(frame())
+    drift = analyse(frame(), columns=["amount", "date"])
+    assert drift["status"] == "unchanged"
+    assert drift["removed"] == []
+    assert drift["columns"] == ["amount", "date"]
+    assert schema_version(LINEAGE) == 1
+
+
+def test_projected_and_sampled_profiles_never_become_baselines():
+    assert analyse(frame(), columns=["amount"])["status"] == "no_baseline"
+    assert analyse(frame(), sample_rows=10)["status"] == "no_baseline"
+    assert schema_version(LINEAGE) is None
+
+    analyse(frame())
+    analyse(frame(amount_nulls=5), sample_rows=10)
+    assert schema_version(LINEAGE) == 1
+
+
+def test_accept_rejects_partial_profiles():
+    sampled = profile_dataset(frame())
+    sampled["sample"] = {"rows": 10}
+    with pytest.raises(HTTPException) as e:
+        accept_schema(LINEAGE, sampled)
+    assert e.value.status_code == 400
+
+    projected = profile_dataset(frame()[["amount"]])
+    check_schema(projected, LINEAGE, columns=["amount"])
+    with pytest.raises(HTTPException):
+        accept_schema(LINEAGE, projected)
+    assert schema_version(LINEAGE) is None
+
+
+@pytest.mark.parametrize("filename, lineage", [
+    ("report.csv", "report"),
+    ("Report (1).csv", "report"),
+    ("report - Copy.csv", "report"),
+    ("txns_2024-10-17.csv", "txns"),
+])
+def test_default_lineage(filename, lineage):
+    assert default_lineage(filename) == lineage
@@ -0,0 +1,58 @@
+import os
+import pytest
+import pandas as pd
+from core.template_rules import TEMPLATE_RULES, score_template_rows
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                        "metadata_only_payment_template_with_row.csv")
+
+
+@pytest.fixture(scope="module")
+def rows() -> pd.DataFrame:
+    template = pd.read_csv(TEMPLATE)
+    batch = pd.concat([template] * 4, ignore_index=True)
+    batch["dataset_id"] = [f"DS_{i}" for i in range(len(batch))]
+    # Row 1 fails the date format check, row 2 has a non-numeric metric, row 3 is empty
+    batch["date_format_compliance_pct"] = batch["date_format_compliance_pct"].astype(object)
+    batch.loc[1, "date_format_compliance_pct"] = 50
+    batch.loc[2, "date_format_compliance_pct"] = "n/a"
+    batch.loc[3, [metric for _, metric, *_ in TEMPLATE_RULES]] = None
+    return batch
+
+
+def test_batch_matches_row_by_row(rows):
+    batch = score_template_rows(rows)
+    assert batch["total_datasets"] == len(rows)
+    assert [d["dataset_id"] for d in batch["datasets"]] == rows["dataset_id"].tolist()
+    for i, dataset in enumerate(batch["datasets"]):
+        alone = score_template_rows(rows.iloc[[i]].reset_index(drop=True))["datasets"][0]
+        assert dataset == alone
+
+
+def test_failed_rules_and_pass_rates(rows):
+    batch = score_template_rows(rows)
+    failed = [set(d["failed_rules"]) for d in batch["datasets"]]
+    assert "validity_date_format" not in failed[0]
+    assert "validity_date_format" in failed[1]
+    # Missing or non-numeric metrics fail
+    assert "validity_date_format" in failed[2]
+    assert len(failed[3]) > len(failed[0])
+    assert batch["datasets"][0]["overall_score"] > batch["datasets"][3]["overall_score"]
+    assert batch["rule_pass_rates"]["validity_date_format"] == 25.0
+    assert batch["average_overall_score"] == pytest.approx(
+        sum(d["overall_score"] for d in batch["datasets"]) / len(rows), abs=0.01)
+
+
+def test_missing_metric_columns_rejected(rows):
+    with pytest.raises(ValueError, match="date_format_compliance_pct"):
+        score_template_rows(rows.drop(columns=["date_format_compliance_pct"]))
+
+
+def test_bulk_endpoint(client, rows):
+    response = client.post("/api/analyze/bulk", files={"file": ("templates.csv", rows.to_csv(index=False), "text/csv")})
+    assert response.status_code == 200
+    assert response.json()["total_datasets"] == len(rows)
+
+    response = client.post("/api/analyze/bulk", files={"file": ("templates.csv", "dataset_id\nDS_1\n", "text/csv")})
+    assert response.status_code == 400
+    assert "missing metric columns" in response.json()["detail"]
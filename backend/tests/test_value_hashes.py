@@ -0,0 +1,51 @@
+import json
+import pytest
+import pandas as pd
+from services import column_stats, schema_registry
+from services.ingestion import profile_dataset
+
+
+@pytest.fixture
+def fresh_key(tmp_path, monkeypatch):
+    """No VALUE_HASH_KEY and no key loaded yet, with an empty registry in tmp_path."""
+    monkeypatch.delenv("VALUE_HASH_KEY", raising=False)
+    monkeypatch.setattr(column_stats, "_value_hash_key", None)
+    monkeypatch.setattr(column_stats, "VALUE_HASH_KEY_PATH", None)
+    monkeypatch.setattr(schema_registry, "SCHEMA_REGISTRY_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_key_is_kept_with_the_registry(fresh_key, monkeypatch):
+    key = column_stats.value_hash_key()
+    assert (fresh_key / ".value_hash.key").read_bytes() == key
+    # A restarted process reads the same key back
+    monkeypatch.setattr(column_stats, "_value_hash_key", None)
+    assert column_stats.value_hash_key() == key
+    assert schema_registry.list_schemas() == []
+
+
+def test_key_path_override(fresh_key, tmp_path_factory, monkeypatch):
+    path = tmp_path_factory.mktemp("keys") / "value_hash.key"
+    monkeypatch.setattr(column_stats, "VALUE_HASH_KEY_PATH", str(path))
+    assert column_stats.value_hash_key() == path.read_bytes()
+    assert not (fresh_key / ".value_hash.key").exists()
+
+
+def test_missing_key_with_accepted_schemas_fails(fresh_key, monkeypatch):
+    df = pd.DataFrame({"status": ["settled", "pending"] * 5})
+    schema_registry.check_schema(profile_dataset(df), "feed")
+    (fresh_key / ".value_hash.key").unlink()
+    monkeypatch.setattr(column_stats, "_value_hash_key", None)
+
+    with pytest.raises(RuntimeError, match="accepted schemas"):
+        column_stats.value_hash_key()
+
+
+def test_hashes_are_keyed(fresh_key, monkeypatch):
+    df = pd.DataFrame({"status": ["settled", "pending"] * 5})
+    first = profile_dataset(df)["columns"]["status"]["top_values"]
+    monkeypatch.setattr(column_stats, "_value_hash_key", b"\x01" * 32)
+    second = profile_dataset(df)["columns"]["status"]["top_values"]
+    assert [v["count"] for v in first] == [v["count"] for v in second]
+    assert {v["hash"] for v in first}.isdisjoint(v["hash"] for v in second)
+    assert "settled" not in json.dumps(first)
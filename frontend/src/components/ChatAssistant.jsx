@@ -1,7 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import ReactMarkdown from 'react-markdown';
 
-const ChatAssistant = ({ context }) => {
+const ChatAssistant = ({ context, reportId, standard }) => {
     const [messages, setMessages] = useState([
         { role: 'assistant', text: "Hi! I'm your Data Compliance Assistant. Ask me anything about this file's health report." }
     ]);
@@ -26,11 +26,16 @@ const ChatAssistant = ({ context }) => {
         setIsLoading(true);
 
         try {
-            const response = await fetch('/api/chat', {
+            // Send the report ID rather than the whole report; fall back if it has expired
+            const ask = (payload) => fetch('/api/chat', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ question: userMsg, context: context })
+                body: JSON.stringify({ question: userMsg, ...payload })
             });
+            let response = reportId ? await ask({ report_id: reportId, standard }) : null;
+            if (!response || response.status === 404) {
+                response = await ask({ context: context });
+            }
 
             if (!response.ok) throw new Error("Network response was not ok");
 
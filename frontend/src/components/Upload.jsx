@@ -22,6 +22,8 @@ const Upload = ({ onAnalysisComplete }) => {
 
         const formData = new FormData();
         formData.append('file', file);
+        // Scores come back first; the AI advisory streams in on the dashboard
+        formData.append('defer_analysis', 'true');
 
         try {
             const response = await fetch('/api/analyze', {
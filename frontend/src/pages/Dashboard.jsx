@@ -1,5 +1,5 @@
 import ChatAssistant from '../components/ChatAssistant';
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { PieChart, Pie, Cell, ResponsiveContainer, BarChart, Bar, XAxis, YAxis, Tooltip } from 'recharts';
 
 // Premium Palette Colors
@@ -27,48 +27,94 @@ const Dashboard = ({ data, onReset }) => {
     const [dashboardData, setDashboardData] = useState(data);
     const [currentStandard, setCurrentStandard] = useState("General Transaction");
     const [isReanalyzing, setIsReanalyzing] = useState(false);
+    const [isRefreshingAdvisory, setIsRefreshingAdvisory] = useState(false);
     const [isChatOpen, setIsChatOpen] = useState(false);
+    // Last selected standard, so a slow advisory response cannot overwrite a newer selection
+    const latestStandard = useRef("General Transaction");
 
     useEffect(() => {
         setDashboardData(data);
         setCurrentStandard("General Transaction");
+        latestStandard.current = "General Transaction";
+    }, [data]);
+
+    // Deferred advisory: the analysis and its attestation arrive over SSE
+    useEffect(() => {
+        if (data.analysis_status !== 'pending' || !data.analysis_stream) return;
+        const source = new EventSource(data.analysis_stream);
+        source.addEventListener('analysis', (event) => {
+            const result = JSON.parse(event.data);
+            source.close();
+            if (latestStandard.current !== "General Transaction") return;
+            setDashboardData(prev => ({
+                ...prev,
+                analysis: result.analysis,
+                analysis_status: 'done',
+                advisory_provenance: result.provenance
+            }));
+        });
+        source.addEventListener('error', () => {
+            source.close();
+            setDashboardData(prev => ({ ...prev, analysis_status: 'failed' }));
+        });
+        return () => source.close();
     }, [data]);
 
     const handleStandardChange = async (e) => {
         const newStandard = e.target.value;
         setCurrentStandard(newStandard);
-        setIsReanalyzing(true);
+        latestStandard.current = newStandard;
+
+        // Scores for every standard arrive with the analysis, so switching is local;
+        // only the standard-specific AI advisory is fetched again.
+        const precomputed = dashboardData.standard_scores?.[newStandard];
+        if (precomputed) {
+            setDashboardData(prev => ({ ...prev, scores: precomputed }));
+            setIsRefreshingAdvisory(true);
+        } else {
+            setIsReanalyzing(true);
+        }
 
         try {
-            const response = await fetch('/api/analyze/re-evaluate', {
+            // The server keeps the report; the metadata is only re-sent if it has expired
+            const reEvaluate = (payload) => fetch('/api/analyze/re-evaluate', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    metadata: dashboardData.metadata,
-                    standard: newStandard
-                })
+                body: JSON.stringify({ ...payload, standard: newStandard })
             });
+            let response = dashboardData.report_id
+                ? await reEvaluate({ report_id: dashboardData.report_id })
+                : null;
+            if (!response || response.status === 404) {
+                response = await reEvaluate({ metadata: dashboardData.metadata });
+            }
 
             if (!response.ok) throw new Error("Re-evaluation failed");
 
             const result = await response.json();
+            if (latestStandard.current !== newStandard) return;
 
             // Merge new scores and analysis into dashboard data
             setDashboardData(prev => ({
                 ...prev,
                 scores: result.scores,
-                analysis: result.analysis
+                analysis: result.analysis,
+                analysis_status: 'done'
             }));
 
         } catch (error) {
             console.error("Error switching standard:", error);
             alert("Failed to update compliance standard. See console.");
         } finally {
-            setIsReanalyzing(false);
+            if (latestStandard.current === newStandard) {
+                setIsReanalyzing(false);
+                setIsRefreshingAdvisory(false);
+            }
         }
     };
 
-    const { scores, metadata, analysis, provenance } = dashboardData;
+    const { scores, metadata, provenance, advisory_provenance, analysis_status } = dashboardData;
+    const analysis = dashboardData.analysis || {};
 
     // Transform dimension scores for chart
     const dimData = Object.keys(scores.dimension_scores).map(key => ({
@@ -116,6 +162,9 @@ const Dashboard = ({ data, onReset }) => {
                                     <option key={s} value={s}>{s}</option>
                                 ))}
                             </select>
+                            {isRefreshingAdvisory && (
+                                <span style={{ fontSize: '0.8rem', color: '#64748b' }}>Updating AI advisory...</span>
+                            )}
                         </div>
 
                         <button onClick={onReset} className="btn btn-outline" style={{ background: 'white', padding: '0.5rem 1rem', fontSize: '0.9rem' }}>
@@ -157,6 +206,7 @@ const Dashboard = ({ data, onReset }) => {
                                 <h3 style={{ margin: 0, color: '#064e3b', fontSize: '1rem', fontWeight: 700 }}>VERIFIED AUDIT RECORD</h3>
                                 <p style={{ margin: 0, color: '#065f46', fontSize: '0.9rem' }}>
                                     Hash Signed: {new Date(provenance.timestamp).toLocaleDateString()} {new Date(provenance.timestamp).toLocaleTimeString()}
+                                    {advisory_provenance && ' · AI advisory attested'}
                                 </p>
                             </div>
                         </div>
@@ -236,6 +286,11 @@ const Dashboard = ({ data, onReset }) => {
                                 </div>
                             </div>
                         </div>
+                    ) : analysis_status === 'pending' ? (
+                        <div style={{ padding: '2rem', textAlign: 'center', color: '#94a3b8' }}>
+                            <div style={{ fontSize: '1.5rem', marginBottom: '0.5rem' }} className="animate-spin">🔄</div>
+                            <p>Generating AI advisory...</p>
+                        </div>
                     ) : (
                         <div style={{ padding: '2rem', textAlign: 'center', color: '#94a3b8' }}>
                             <p>Analysis unavailable for this standard.</p>
@@ -422,7 +477,7 @@ const Dashboard = ({ data, onReset }) => {
                         </div>
 
                         <div style={{ flex: 1, overflow: 'hidden', padding: '1rem' }}>
-                            <ChatAssistant context={dashboardData} />
+                            <ChatAssistant context={dashboardData} reportId={dashboardData.report_id} standard={currentStandard} />
                         </div>
                     </div>
                 )}